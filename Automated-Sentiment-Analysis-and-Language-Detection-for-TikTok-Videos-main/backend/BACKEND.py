@@ -1,104 +1,328 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
 from datetime import datetime
 import os
+import time
+import logging
 from dotenv import load_dotenv
-from app import save_tiktok, fetch_tiktok_video_urls, organize_data_from_csv, save_to_mongodb, keep_header_only
+from mongo import get_collection
+from persistence import ensure_indexes
+from result_cache import get_result_cache
+from rollups import ROLLUPS_COLLECTION, ensure_rollup_indexes, query_rollups
+from video_queries import CountCache, build_video_filter, fetch_page, parse_limit
+from search import MAX_SEARCH_OFFSET, search_videos
+from export import parse_fields, stream_export
+from jobs import Job, JobQueue, stream_events
+from crawler import CRAWL_ENABLED, DEFAULT_SEARCH_QUERY, CrawlScheduler
+from metrics import HTTP_SECONDS, render as render_metrics, tracer
+from profiler import profiler
 from typing import Dict, Any
 
 # Load environment variables from .env file
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# The read API must start without the scraping / ML stack (selenium, pyktok, whisper, torch,
+# openai): those modules are only imported by the ingestion worker, on its first job.
+# benchmarks/import_time.py checks this.
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that writes the native datetimes stored in MongoDB as ISO 8601 strings.
+    """
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
 # Flask app setup
 app = Flask(__name__)
+app.json = MongoJSONProvider(app)
 CORS(app)
 
 # MongoDB connection setup
-MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
-if not MONGODB_CONNECTION_STRING:
-    raise ValueError("MONGODB_CONNECTION_STRING is not set in the .env file.")
+tiktoks_collection = get_collection()
+ensure_indexes(tiktoks_collection)
+rollups_collection = get_collection(ROLLUPS_COLLECTION)
+ensure_rollup_indexes(rollups_collection)
+video_counts = CountCache()
+job_queue = JobQueue()
 
-client = MongoClient(MONGODB_CONNECTION_STRING)
-db = client["tiktok_database"]
-tiktoks_collection = db["tiktoks"]
+@app.before_request
+def start_timer() -> None:
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response: Response) -> Response:
+    """
+    Record the duration of every request in the per-route histogram.
+
+    The duration is taken once the body has been sent, so streamed responses (/export,
+    job events) are measured until their last chunk rather than until their headers.
+    """
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The request context is gone by the time the response is closed
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: HTTP_SECONDS.observe(
+            time.perf_counter() - started, method=method, route=route, status=status
+        ))
+    return response
+
+def run_ingestion_job(job: Job) -> Dict[str, Any]:
+    """
+    Job entry point: loads the ingestion stack lazily, inside the job worker thread.
+
+    Args:
+        job (Job): The queued /process job.
+
+    Returns:
+        Dict[str, Any]: The job summary.
+    """
+    from ingestion import process_job
+    return process_job(job)
+
+# Incremental crawls of the CRAWL_TAGS, queued on the same job queue as /process
+crawl_scheduler = CrawlScheduler(lambda **params: job_queue.submit(run_ingestion_job, **params))
+# `python BACKEND.py` runs the debug reloader, which imports this module in a watcher process
+# and again in the serving child: only the child (WERKZEUG_RUN_MAIN) schedules crawls
+if CRAWL_ENABLED and (__name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+    crawl_scheduler.start()
 
 @app.route('/process', methods=['POST'])
 def process_videos() -> Any:
     """
-    Endpoint to process TikTok videos. It fetches video URLs, processes metadata,
-    and saves the data to MongoDB.
+    Endpoint to process TikTok videos. It enqueues a job that fetches video URLs,
+    processes metadata, and saves the data to MongoDB, and returns immediately.
 
     Returns:
-        JSON response indicating success or failure.
+        JSON response with the job id, to be followed through /jobs/<job_id>.
     """
-    data = request.json
+    data = request.json or {}
     count = data.get('count', 1)  # Default to 1 video if not specified
-    count = min(max(1, count), 100)  # Restrict to range 1–100
-    
-    try:
-        # Step 1: Fetch TikTok video URLs
-        video_urls = fetch_tiktok_video_urls(search_query="raiffeisen", num_links=count)
-        
-        # Step 2: Save each TikTok video and its metadata
-        for url in video_urls:
-            save_tiktok(url)
-            
-        # Step 3: Organize data from CSV and process language, transcription, sentiment
-        processed_videos = organize_data_from_csv()
-
-        # Step 4: Save processed videos to MongoDB
-        save_to_mongodb(processed_videos)
-        
-        # Step 5: Empty data.csv
-        keep_header_only('data.csv')
-        
-        return jsonify({"message": f"{count} videos processed and stored"}), 200
+    if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+        return jsonify({"error": "'count' must be a positive integer."}), 400
+    count = min(count, 100)  # Restrict to range 1–100
+    search_query = data.get('search_query', DEFAULT_SEARCH_QUERY)
 
+    try:
+        job = job_queue.submit(run_ingestion_job, count=count, search_query=search_query)
+        return jsonify({"message": f"Processing of {count} videos queued", "job_id": job.id}), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str) -> Any:
+    """
+    Endpoint to fetch the status of a processing job.
+
+    Args:
+        job_id (str): The id returned by /process.
+
+    Returns:
+        JSON response containing the job status or an error message if not found.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id: str) -> Any:
+    """
+    Endpoint streaming the per-video stage progress of a job as Server-Sent Events.
+    Reconnecting clients resume after the Last-Event-ID they received.
+
+    Args:
+        job_id (str): The id returned by /process.
+
+    Returns:
+        A text/event-stream response that ends when the job finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    return Response(
+        stream_with_context(stream_events(job, since)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route('/crawler', methods=['GET'])
+def get_crawler() -> Any:
+    """
+    Endpoint to fetch the crawl schedule: every tag with its interval, next run and last job.
+
+    Returns:
+        JSON response with the scheduler status.
+    """
+    return jsonify(crawl_scheduler.status()), 200
+
+
 @app.route('/videos', methods=['GET'])
 def get_processed_videos() -> Any:
     """
-    Endpoint to fetch processed TikTok videos from MongoDB.
+    Endpoint to fetch processed TikTok videos from MongoDB, one page at a time.
+
+    Query parameters:
+        limit: Page size (default 50, at most 500).
+        cursor: The `next_cursor` of the previous page.
+        order: "desc" (newest first, default) or "asc".
+        language, date_from, date_to, sentiment, min_score, max_score: Optional filters.
+
+    Responses carry an ETag, so polling clients sending If-None-Match get a 304
+    when nothing changed.
 
     Returns:
-        JSON response containing the list of processed videos.
+        JSON response containing a page of processed videos and the cursor of the next page.
     """
     try:
-        print("Fetching videos from MongoDB...")
-        videos = list(tiktoks_collection.find({}, {
-            "_id": 0,                     # Exclude MongoDB ID from the response
-            "video_id": 1,                # Include video_id
-            "video_file": 1,              # Include video_file
-            "author_name": 1,             # Include author_name
-            "author_username": 1,         # Include author_username
-            "video_playcount": 1,         # Include video_playcount
-            "sentiment_score": 1,         # Include sentiment_score
-            "language": 1,                # Include language
-            "video_timestamp": 1          # Include video_timestamp for sorting
-        }))
-
-        # Deduplicate by `video_id` and sort by timestamp
-        unique_videos = sorted(
-            {video["video_id"]: video for video in videos}.values(),
-            key=lambda x: x["video_timestamp"]  # Sort by timestamp (ascending)
+        query = build_video_filter(request.args)
+        limit = parse_limit(request.args.get('limit'))
+        ascending = request.args.get('order', 'desc') == 'asc'
+
+        videos, next_cursor = fetch_page(
+            tiktoks_collection,
+            query,
+            {
+                "_id": 0,                     # Exclude MongoDB ID from the response
+                "video_id": 1,                # Include video_id
+                "video_file": 1,              # Include video_file
+                "author_name": 1,             # Include author_name
+                "author_username": 1,         # Include author_username
+                "video_playcount": 1,         # Include video_playcount
+                "sentiment_score": 1,         # Include sentiment_score
+                "language": 1,                # Include language
+                "video_timestamp": 1          # Include video_timestamp for sorting
+            },
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            ascending=ascending
         )
 
-        response = {
-            "total_videos": len(unique_videos),  # Total count of unique videos
-            "processed_videos": list(unique_videos)  # Deduplicated and sorted videos
-        }
+        response = jsonify({
+            "total_videos": video_counts.count(tiktoks_collection, query),  # Cached count of matching videos
+            "processed_videos": videos,
+            "next_cursor": next_cursor
+        })
+        response.add_etag()
+        return response.make_conditional(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in /videos")
+        return jsonify({"error": str(e)}), 500
 
-        print(f"Fetched {len(response['processed_videos'])} unique videos.")
-        return jsonify(response), 200
+
+@app.route('/search', methods=['GET'])
+def search() -> Any:
+    """
+    Endpoint to search the translations and original transcriptions, best matches first.
+
+    Query parameters:
+        q: The search string: words, "quoted phrases" and -excluded words.
+        limit: Page size (default 50, at most 500).
+        offset: Number of results to skip (default 0, at most 1000).
+        language, date_from, date_to, sentiment, min_score, max_score: Optional filters.
+
+    Returns:
+        JSON response containing the matching videos with their relevance score and
+        highlighted snippets, and the offset of the next page.
+    """
+    try:
+        text = request.args.get('q', '')
+        query = build_video_filter(request.args)
+        limit = parse_limit(request.args.get('limit'))
+        offset = request.args.get('offset', '0')
+        if not offset.isdigit():
+            raise ValueError("'offset' must be a non-negative integer.")
+        offset = int(offset)
+
+        results = search_videos(
+            tiktoks_collection,
+            text,
+            query,
+            {
+                "_id": 0,
+                "video_id": 1,
+                "video_file": 1,
+                "author_name": 1,
+                "author_username": 1,
+                "video_playcount": 1,
+                "sentiment_score": 1,
+                "language": 1,
+                "video_timestamp": 1,
+            },
+            limit=limit,
+            offset=offset
+        )
+        total = video_counts.count(tiktoks_collection, dict(query, **{"$text": {"$search": text}}))
+        next_offset = offset + len(results)
+
+        response = jsonify({
+            "query": text,
+            "total_results": total,
+            "results": results,
+            "next_offset": next_offset if next_offset < total and next_offset <= MAX_SEARCH_OFFSET else None
+        })
+        response.add_etag()
+        return response.make_conditional(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in /videos: {str(e)}")
+        logger.exception("Error in /search")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/export', methods=['GET'])
+def export_videos() -> Any:
+    """
+    Endpoint streaming every matching video straight from a MongoDB cursor, for BI jobs
+    pulling the full corpus. Memory use doesn't depend on the number of exported videos.
+
+    Query parameters:
+        format: "ndjson" (default) or "csv".
+        fields: Comma separated fields (default: every field of the format).
+        gzip: "true" to download a gzipped file.
+        language, date_from, date_to, sentiment, min_score, max_score: Optional filters.
+
+    Returns:
+        A streamed attachment, oldest videos first.
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        fields = parse_fields(request.args.get('fields'), export_format)
+        query = build_video_filter(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+    filename = f"videos.{export_format}" + (".gz" if compress else "")
+    mimetype = "application/gzip" if compress else (
+        "application/x-ndjson" if export_format == "ndjson" else "text/csv; charset=utf-8"
+    )
+    return Response(
+        stream_with_context(stream_export(tiktoks_collection, query, export_format, fields, compress)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/video/<video_id>', methods=['GET'])
 def get_video_details(video_id: str) -> Any:
     """
@@ -130,7 +354,10 @@ def get_video_details(video_id: str) -> Any:
                 "author_verified": 1,
                 "language": 1,
                 "sentence": 1,
+                "transcription": 1,
+                "segments": 1,
                 "sentiment_score": 1,
+                "sentiment_source": 1,
             }
         )
 
@@ -143,9 +370,106 @@ def get_video_details(video_id: str) -> Any:
 
     except Exception as e:
         # Catch and return any errors
-        print(f"Error in /video/{video_id} endpoint: {e}")
+        logger.exception("Error in /video/%s", video_id)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/analytics', methods=['GET'])
+def get_analytics() -> Any:
+    """
+    Endpoint to fetch aggregated sentiment, served from the pre-aggregated rollups so the
+    latency doesn't depend on the number of stored videos.
+
+    Query parameters:
+        group_by: Comma separated dimensions among day, language and author (default: day).
+        date_from, date_to, language, author: Optional filters.
+        top_negative: Also return the N most negative videos (default 0).
+
+    Returns:
+        JSON response containing the aggregated rows.
+    """
+    try:
+        group_by = [dimension for dimension in request.args.get('group_by', 'day').split(',') if dimension]
+        response: Dict[str, Any] = {
+            "group_by": group_by,
+            "rows": query_rollups(rollups_collection, group_by, request.args),
+        }
+
+        top_negative = min(max(0, int(request.args.get('top_negative', 0))), 100)
+        if top_negative:
+            response["top_negative"] = list(
+                tiktoks_collection.find(
+                    {"sentiment_score": {"$type": "number"}},
+                    {"_id": 0, "video_id": 1, "author_username": 1, "language": 1,
+                     "video_timestamp": 1, "sentiment_score": 1}
+                ).sort("sentiment_score", 1).limit(top_negative)
+            )
+
+        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in /analytics")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats() -> Any:
+    """
+    Endpoint to report how often the result cache saved a Whisper run or an LLM call.
+
+    Returns:
+        JSON response with hits, misses and stored entries per cache layer.
+    """
+    try:
+        return jsonify(get_result_cache().stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics() -> Any:
+    """
+    Endpoint exposing the stage, route and LLM metrics in the Prometheus text format.
+    Ingestion runs started through /process report into this process.
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/traces/<video_id>', methods=['GET'])
+def get_trace(video_id: str) -> Any:
+    """
+    Endpoint to fetch the stage spans (download, decode, whisper, llm, mongo_write) recorded
+    for a recently processed video.
+
+    Args:
+        video_id (str): The ID of the video.
+
+    Returns:
+        JSON response with the spans, or 404 when the video isn't in the recent traces.
+    """
+    spans = tracer.get(video_id)
+    if spans is None:
+        return jsonify({"error": "No trace for this video"}), 404
+    return jsonify({"video_id": video_id, "spans": spans}), 200
+
+@app.route('/profiling', methods=['GET', 'POST', 'DELETE'])
+def profiling() -> Any:
+    """
+    Runtime switch of the sampling profiler.
+
+    POST starts it (optional `interval` query parameter, in seconds), DELETE stops it and
+    GET returns its status, or the collapsed stacks with `?format=collapsed` (optionally
+    `&limit=N`), ready for a flamegraph tool.
+    """
+    if request.method == 'POST':
+        try:
+            profiler.start(interval=float(request.args.get('interval', 0)) or None)
+        except ValueError:
+            return jsonify({"error": "interval must be a number"}), 400
+    elif request.method == 'DELETE':
+        profiler.stop()
+    elif request.args.get('format') == 'collapsed':
+        limit = request.args.get('limit')
+        return Response(profiler.collapsed(int(limit) if limit and limit.isdigit() else None), mimetype='text/plain')
+    return jsonify(profiler.status()), 200
+
 # For displaying video on DetailsPage.tsx
 @app.route('/video-files/<filename>')
 def serve_video_file(filename: str) -> Any:
@@ -161,4 +485,4 @@ def serve_video_file(filename: str) -> Any:
     return send_from_directory('database', filename)
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
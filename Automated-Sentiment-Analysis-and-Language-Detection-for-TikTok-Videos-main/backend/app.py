@@ -1,190 +1,215 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.edge.service import Service
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-import time
-import pyktok as pyk
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 import os
-import shutil
 import csv
-import json
-from pymongo import MongoClient
+import logging
 from dotenv import load_dotenv
-from translate_and_sentiment import translate_text, get_sentiment
-from transcribe_and_detect_language import transcriere_si_detectie_limbaj
-from typing import List, Dict, Optional
+from browser_pool import get_browser_pool
+from downloader import VideoDownloader, read_records
+from ledger import get_ledger
+from tiktok_urls import VIDEO_LINKS_XPATH, extract_video_id, tiktok_search_url
+from crawler import DEFAULT_SEARCH_QUERY
+from mongo import get_collection
+from persistence import ensure_indexes
+from export import iter_ndjson
+from rollups import ROLLUPS_COLLECTION, upsert_with_rollups
+from pipeline import IngestionPipeline
+from typing import Callable, Iterator, List, Dict, Optional, Set
 
 # Load environment variables
 load_dotenv()
-MONGODB_CONNECTION_STRING = os.getenv("MONGODB_CONNECTION_STRING")
-if not MONGODB_CONNECTION_STRING:
-    raise ValueError("MongoDB connection string is missing from the .env file.")
+
+logger = logging.getLogger(__name__)
 
 # Connect to MongoDB
-mongo_client = MongoClient(MONGODB_CONNECTION_STRING)
-db = mongo_client["tiktok_database"]
-collection = db["tiktoks"]
+collection = get_collection()
+rollups_collection = get_collection(ROLLUPS_COLLECTION)
+ensure_indexes(collection)
 
-search_query = "raiffeisen"
+search_query = DEFAULT_SEARCH_QUERY  # The first of CRAWL_TAGS
 linkNumbers = 2
+records_file = 'data.jsonl'  # Metadata record stream written by the downloader
 
 generate_Data = False
 create_Json = True
 
-def save_tiktok(link: str, output_dir: str = 'database', datafile: str = 'data.csv') -> None:
-    """
-    Download a TikTok video and move it to the specified directory.
-
-    Args:
-        link (str): The TikTok video URL.
-        output_dir (str): The directory to save the video. Defaults to 'database'.
-        datafile (str): The path to the CSV file to save metadata. Defaults to 'data.csv'.
-    """
-    # Download the video and data
-    pyk.save_tiktok(link, True, datafile)
-    video_filename = link.replace('https://www.tiktok.com/', '').replace('/', '_') + '.mp4'  # Get video name
-
-    # Create the 'output_dir' directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Move video to the directory
-    video_path = os.path.join(output_dir, video_filename)
-    shutil.move(video_filename, video_path)
-
 def fetch_tiktok_video_urls(
     search_query: str,
     num_links: int = 10,
     file_path: str = 'links.txt',
-    create_file: bool = True
+    create_file: bool = True,
+    base_url: Optional[str] = None,
+    wait_timeout: float = 15.0,
+    max_idle_scrolls: int = 3,
+    is_known: Optional[Callable[[str], bool]] = None,
+    stop_after_known: int = 0
 ) -> List[str]:
     """
     Fetch TikTok video URLs based on a search query.
 
+    The page is loaded in a pooled headless browser and scrolled only until `num_links`
+    distinct videos are collected or scrolling stops revealing new ones. Every wait is
+    condition based (links present / more links loaded) instead of a fixed sleep.
+
+    With `is_known`, videos that are already stored are dropped as they are discovered and
+    don't count towards `num_links`; with `stop_after_known` as well, scrolling stops at a run
+    of known videos, i.e. once the crawl has caught up with the previous one.
+
     Args:
         search_query (str): The search query.
         num_links (int): The number of video links to fetch. Defaults to 10.
         file_path (str): The file path to save the URLs. Defaults to 'links.txt'.
         create_file (bool): Whether to create a file with the URLs. Defaults to True.
+        base_url (Optional[str]): Page to scrape instead of TikTok, e.g. a local HTML fixture.
+        wait_timeout (float): Seconds to wait for the first links and for every scroll to load more.
+        max_idle_scrolls (int): Stop after this many scrolls in a row without new videos.
+        is_known (Optional[Callable[[str], bool]]): Tells whether a video id is already stored.
+        stop_after_known (int): Stop after this many known videos in a row (0: never).
 
     Returns:
-        List[str]: A list of video URLs.
+        List[str]: A list of video URLs, deduplicated by video id.
     """
-    base_url = f"https://www.tiktok.com/tag/{search_query}"
-
-    edge_options = webdriver.EdgeOptions()
-    edge_options.add_argument("--disable-webrtc")
-    edge_options.add_argument("--lang=ro")  # Set browser language to Romanian
-    edge_options.add_argument("--accept-lang=ro-RO,ro;q=0.9")
-    edge_options.add_argument("--default-search-engine=Google")
-    edge_options.add_argument("--default-search-engine-url=https://www.google.ro")
-
-    driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()), options=edge_options)
-    driver.get(base_url)
-
-    # Wait for the page to load
-    time.sleep(20)
-
-    # Scroll to load more videos
-    for _ in range(num_links // 15):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(5)
+    page_url = base_url or tiktok_search_url(search_query)
+    video_urls: Dict[str, str] = {}  # video id -> URL, in discovery order
+    seen: Set[str] = set()
+    known_run = 0  # Known videos in a row, in discovery order
+
+    def collect(driver) -> int:
+        nonlocal known_run
+        for element in driver.find_elements(By.XPATH, VIDEO_LINKS_XPATH):
+            try:
+                url = element.get_attribute('href')
+            except StaleElementReferenceException:
+                continue  # Re-rendered while scrolling; picked up on the next pass
+            video_id = extract_video_id(url or '')
+            if not video_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            if is_known is not None and is_known(video_id):
+                known_run += 1
+                if stop_after_known and known_run >= stop_after_known:
+                    break
+                continue
+            known_run = 0
+            video_urls[video_id] = url.split('?')[0]
+        return len(video_urls)
+
+    def caught_up() -> bool:
+        return bool(stop_after_known) and known_run >= stop_after_known
+
+    with get_browser_pool().session() as driver:
+        driver.get(page_url)
+
+        # Wait for the first video links to be rendered
+        try:
+            WebDriverWait(driver, wait_timeout).until(
+                EC.presence_of_element_located((By.XPATH, VIDEO_LINKS_XPATH))
+            )
+        except TimeoutException:
+            logger.warning("No videos found on %s.", page_url)
+
+        # Scroll to load more videos, until enough are collected or nothing new appears
+        idle_scrolls = 0
+        while collect(driver) < num_links and idle_scrolls < max_idle_scrolls and not caught_up():
+            links_before = len(driver.find_elements(By.XPATH, VIDEO_LINKS_XPATH))
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            try:
+                WebDriverWait(driver, wait_timeout).until(
+                    lambda d: len(d.find_elements(By.XPATH, VIDEO_LINKS_XPATH)) > links_before
+                )
+                idle_scrolls = 0
+            except TimeoutException:
+                idle_scrolls += 1
 
-    # Find video links
-    video_elements = driver.find_elements(By.XPATH, '//a[contains(@href, "/video/")]')
-    video_urls = [element.get_attribute('href') for element in video_elements[:2 * num_links]]
-    video_urls = [url for i, url in enumerate(video_urls) if i % 2 == 0]
+    if caught_up():
+        logger.info("Reached %d known videos in a row on %s, stopped scrolling.", known_run, page_url)
+    video_urls_list = list(video_urls.values())[:num_links]
 
     if create_file:
         with open(file_path, 'w') as file:
-            for url in video_urls:
+            for url in video_urls_list:
                 file.write(url + '\n')
 
-    driver.quit()
-    return video_urls
+    return video_urls_list
+
+def iter_processed_videos(
+    datafile: str = 'data.csv',
+    output_dir: str = 'database',
+    persist: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+    progress: Optional[Callable[[str, str, str], None]] = None
+) -> Iterator[Dict[str, str]]:
+    """
+    Stream the rows of a metadata file through the staged ingestion pipeline
+    (transcription, translation, sentiment analysis, persistence). Progress is recorded
+    in the ingestion ledger, so stages a video already completed are not run again.
+
+    Args:
+        datafile (str): The CSV file, or the JSON-lines record stream written by the
+            downloader, containing the data. Defaults to 'data.csv'.
+        output_dir (str): The directory containing video files. Defaults to 'database'.
+        persist (Optional[Callable]): Called with every finished document, e.g. `save_to_mongodb`.
+            Defaults to None.
+        progress (Optional[Callable]): Called with (video_id, stage, status) as videos move
+            through the stages. Defaults to None.
+
+    Yields:
+        Dict[str, str]: Every processed video data dictionary, as soon as it is ready.
+    """
+    pipeline = IngestionPipeline(persist=persist, progress=progress, ledger=get_ledger())
+    if datafile.endswith('.jsonl'):
+        yield from pipeline.run(read_records(datafile), output_dir=output_dir)
+        return
+    with open(datafile, mode='r', encoding='utf-8') as file:
+        csv_reader = csv.DictReader(file)
+        yield from pipeline.run(csv_reader, output_dir=output_dir)
 
 def organize_data_from_csv(
     datafile: str = 'data.csv',
     output_dir: str = 'database'
 ) -> List[Dict[str, str]]:
     """
-    Process data from a CSV file, adding translations, transcriptions, and sentiment analysis.
+    Process data from a CSV file (or a downloader record stream), adding translations,
+    transcriptions, and sentiment analysis.
 
     Args:
-        datafile (str): The CSV file path containing the data. Defaults to 'data.csv'.
+        datafile (str): The CSV or JSON-lines file path containing the data. Defaults to 'data.csv'.
         output_dir (str): The directory containing video files. Defaults to 'database'.
 
     Returns:
         List[Dict[str, str]]: A list of processed video data dictionaries.
     """    
-    data = []
-    with open(datafile, mode='r', encoding='utf-8') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            # Add the video_file field
-            file_name = f"@{row['author_username']}_video_{row['video_id']}.mp4"
-            video_path = os.path.join(output_dir, file_name)
-            print(video_path)
-            language, transcription = transcriere_si_detectie_limbaj(file_name)  # Language detected and transcription
-            print(f"Detected language: {language}, transcription: {transcription}")
-            print(row)
-            print('AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAa')
-            # Add translation, sentiment, and other fields
-            if transcription is not None:
-                sentence = translate_text(transcription, language)
-                score = get_sentiment(transcription, language)
-
-                row['language'] = language
-                row['sentence'] = sentence
-                row['sentiment_score'] = score
-                row['video_file'] = video_path
-
-                # Remove useless columns from the row
-                del row['video_diggcount']
-                del row['video_description']
-                del row['video_stickers']
-                del row['author_diggcount']
-                del row['poi_name']
-                del row['poi_address']
-                del row['poi_city']
-
-                # Append to data list
-                data.append(row)
-
-    return data  # Return the data as a list of dictionaries
-
-
-def save_to_mongodb(data: List[Dict[str, str]]) -> None:
+    return list(iter_processed_videos(datafile, output_dir))  # Return the data as a list of dictionaries
+
+
+def save_to_mongodb(data: List[Dict[str, str]], raise_errors: bool = False) -> None:
     """
     Save processed video data to MongoDB.
 
+    Documents are upserted by video_id through unordered bulk writes, with counts,
+    scores and timestamps converted to native types. The sentiment rollups are
+    updated with the difference between the old and the new version of every video
+    that was actually written.
+
     Args:
         data (List[Dict[str, str]]): A list of processed video data dictionaries.
+        raise_errors (bool): Re-raise database errors, and raise if some videos couldn't be
+            written, instead of only logging them, so the caller knows the data isn't saved.
+            Defaults to False.
     """
     try:
         if isinstance(data, list):
-            replaced_count = 0
-            new_count = 0
-
-            for document in data:
-                # Perform an upsert to replace existing documents or insert new ones
-                result = collection.update_one(
-                    {"video_id": document["video_id"]},  # Match by video_id
-                    {"$set": document},                 # Replace with the new data
-                    upsert=True                         # Insert if no document matches
-                )
-
-                # Track updates vs inserts
-                if result.matched_count > 0:
-                    replaced_count += 1  # Document was replaced
-                else:
-                    new_count += 1  # New document was inserted
-
-            print(f"Replaced {replaced_count} existing documents.")
-            print(f"Inserted {new_count} new documents.")
+            result = upsert_with_rollups(collection, rollups_collection, data)
+            logger.info("Replaced %d existing documents, inserted %d new documents.", result["replaced"], result["inserted"])
+            if result["failed"]:
+                raise RuntimeError(f"{len(result['failed'])} videos could not be saved: {', '.join(result['failed'])}")
         else:
-            print("Data is not in the correct format for MongoDB.")
+            logger.error("Data is not in the correct format for MongoDB.")
     except Exception as e:
-        print(f"An error occurred while saving to MongoDB: {e}")
+        logger.error("An error occurred while saving to MongoDB: %s", e)
+        if raise_errors:
+            raise
 
 # Use this method to delete everything from the data.csv file, except the first row
 def keep_header_only(file_path: str) -> None:
@@ -205,26 +230,22 @@ def keep_header_only(file_path: str) -> None:
             writer = csv.writer(file)
             writer.writerow(header)  # Write the header back
 
-        print(f"All rows except the header have been deleted from '{file_path}'.")
+        logger.info("All rows except the header have been deleted from '%s'.", file_path)
 
     except FileNotFoundError:
-        print(f"The file '{file_path}' does not exist.")
+        logger.error("The file '%s' does not exist.", file_path)
     except Exception as e:
-        print(f"An error occurred: {e}")
-
-# Example usage
-keep_header_only('data.csv')
-
+        logger.error("An error occurred: %s", e)
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
     if generate_Data:
         urls = fetch_tiktok_video_urls(search_query, num_links=linkNumbers, create_file=False)  # Generate linkNumbers URLs
-        for url in urls:
-            save_tiktok(url)  # Save video files and metadata
+        VideoDownloader().download(urls, records_file)  # Save video files and metadata in parallel
         print(urls)
-    if create_Json:  # Don't run this code without the data.csv file
-        data = organize_data_from_csv()  # Create data with sentiment, transcription, and translation
-        with open('data_json.json', 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4)  # Convert the list to a JSON-formatted string
-        save_to_mongodb(data)  # Save JSON data to MongoDB
+    if create_Json:  # Don't run this code without the data.jsonl file
+        # Add sentiment, transcription, and translation (resumes from the ledger), saving every video
+        # to MongoDB and appending it to the NDJSON dump as soon as it is ready
+        with open('data_json.ndjson', 'w', encoding='utf-8') as file:
+            file.writelines(iter_ndjson(iter_processed_videos(records_file, persist=save_to_mongodb)))
@@ -0,0 +1,121 @@
+"""
+Cold start benchmark of the backend entry points.
+
+Every entry point is imported in a fresh interpreter; the script reports the import time,
+the peak RSS and which heavy scraping / ML modules got loaded, as JSON. It exits with a
+non-zero status when an entry point exceeds its thresholds, so regressions get caught.
+
+Usage (from the backend directory, with the .env of the deployment):
+    python benchmarks/import_time.py [--repeat 3] [--output import_time.json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["whisper", "torch", "selenium", "webdriver_manager", "pyktok", "openai", "numpy", "pandas"]
+
+# Entry point -> thresholds. The read API must not load any heavy module.
+ENTRY_POINTS: Dict[str, Dict[str, Any]] = {
+    "BACKEND": {"max_seconds": 2.0, "max_rss_mb": 150, "forbidden": HEAVY_MODULES},
+    "manage": {"max_seconds": 1.0, "max_rss_mb": 100, "forbidden": HEAVY_MODULES},
+    "ingestion": {"max_seconds": 30.0, "max_rss_mb": 2048, "forbidden": []},
+}
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+except ImportError:  # Windows
+    rss_mb = None
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_mb, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str) -> Dict[str, Any]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Args:
+        module (str): The entry point module.
+
+    Returns:
+        Dict[str, Any]: Import time, peak RSS and the loaded modules.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(repeat: int) -> Dict[str, Any]:
+    """
+    Measure every entry point `repeat` times and check the thresholds.
+
+    Args:
+        repeat (int): Number of cold starts per entry point (the median is reported).
+
+    Returns:
+        Dict[str, Any]: The results per entry point and the list of failures.
+    """
+    results: Dict[str, Any] = {}
+    failures: List[str] = []
+    for module, limits in ENTRY_POINTS.items():
+        try:
+            samples = [measure(module) for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            results[module] = {"error": e.stderr.strip().splitlines()[-1] if e.stderr else str(e)}
+            failures.append(f"{module}: import failed")
+            continue
+
+        seconds = statistics.median(sample["seconds"] for sample in samples)
+        rss = [sample["rss_mb"] for sample in samples if sample["rss_mb"] is not None]
+        rss_mb = statistics.median(rss) if rss else None
+        loaded = set(samples[0]["modules"])
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        results[module] = {
+            "seconds": round(seconds, 4),
+            "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+            "heavy_modules": heavy,
+            "module_count": len(loaded),
+        }
+
+        if seconds > limits["max_seconds"]:
+            failures.append(f"{module}: import took {seconds:.2f}s (limit {limits['max_seconds']}s)")
+        if rss_mb is not None and rss_mb > limits["max_rss_mb"]:
+            failures.append(f"{module}: peak RSS {rss_mb:.0f} MB (limit {limits['max_rss_mb']} MB)")
+        forbidden = [name for name in heavy if name in limits["forbidden"]]
+        if forbidden:
+            failures.append(f"{module}: imports {', '.join(forbidden)}")
+
+    return {"entry_points": results, "failures": failures}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold start time and RSS of the backend entry points.")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per entry point.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    report = run(max(1, args.repeat))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
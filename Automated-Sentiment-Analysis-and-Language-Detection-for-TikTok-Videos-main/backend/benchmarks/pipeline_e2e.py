@@ -0,0 +1,374 @@
+"""
+End-to-end benchmark of the ingestion pipeline and the read API, fully offline.
+
+For every corpus size the script generates synthetic mp4 clips with ffmpeg (tones, silence
+and speech-like audio: flite TTS when ffmpeg has it, syllable-rate modulated harmonics
+otherwise), starts a stub OpenAI-compatible LLM server and stores into an in-process
+mongomock database (or the MongoDB server given in BENCH_MONGODB). It then times every
+stage on its own (audio extraction, transcription, LLM, persistence), the whole staged
+pipeline, and the /videos and /video/<id> endpoints.
+
+Every corpus size runs in a fresh interpreter with its own ledger, result cache and
+database, so nothing is answered from a previous run. The report is JSON: per stage and
+corpus size the total and per-video time, and how the per-video time grows from the
+smallest to the largest corpus. It exits with a non-zero status when a stage exceeds its
+threshold.
+
+Needs ffmpeg, Whisper and the optional mongomock package. Usage (from the backend directory):
+    python benchmarks/pipeline_e2e.py [--sizes 4,16,64] [--whisper-model tiny] \
+        [--llm-latency 0.2] [--thresholds thresholds.json] [--output pipeline_e2e.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLIP_KINDS = ["speech", "tone", "silence"]
+CLIP_SECONDS = 8
+SPEECH_TEXT = "Raiffeisen Bank opened a new branch in the city centre and customers are happy with the app"
+
+# Stage -> limit on the mean seconds per video (the API stages: per request, at the 95th percentile)
+THRESHOLDS: Dict[str, float] = {
+    "extraction": 0.5,
+    "transcription": 15.0,
+    "llm": 2.0,
+    "persistence": 0.1,
+    "pipeline": 15.0,
+    "api_videos": 0.25,
+    "api_video": 0.1,
+}
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers OpenAI chat completions in the JSON-mode format `llm_client` expects: every
+    text comes back as its own translation, with a score derived from its length.
+    """
+
+    latency = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        texts = json.loads(payload["messages"][-1]["content"])["texts"]
+        time.sleep(self.latency)
+        with StubLLMHandler.lock:
+            StubLLMHandler.requests += 1
+        results = [{"id": t["id"], "translation": t["text"], "score": len(t["text"]) % 101} for t in texts]
+        body = json.dumps({"choices": [{"message": {"content": json.dumps({"results": results})}}]}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub_llm(latency: float) -> ThreadingHTTPServer:
+    """
+    Start the stub LLM server on a free local port, in a daemon thread.
+    """
+    StubLLMHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _audio_source(kind: str, seconds: float) -> List[str]:
+    """
+    Returns:
+        List[str]: The ffmpeg input arguments of one synthetic audio kind.
+    """
+    if kind == "tone":
+        return ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=16000:duration={seconds}"]
+    if kind == "silence":
+        return ["-f", "lavfi", "-t", str(seconds), "-i", "anullsrc=r=16000:cl=mono"]
+    if has_flite():
+        return ["-f", "lavfi", "-i", f"flite=text='{SPEECH_TEXT}',apad=whole_dur={seconds}"]
+    # Harmonics of a 150 Hz voice with a 4 Hz syllable envelope, enough for the VAD and the timing
+    voice = "+".join(f"{0.4 / k}*sin(2*PI*{150 * k}*t)" for k in range(1, 9))
+    return ["-f", "lavfi", "-i", f"aevalsrc='({voice})*pow(sin(2*PI*2*t),2)':s=16000:d={seconds}"]
+
+
+_flite: Optional[bool] = None
+
+
+def has_flite() -> bool:
+    """
+    Returns:
+        bool: Whether this ffmpeg build has the flite text-to-speech source.
+    """
+    global _flite
+    if _flite is None:
+        filters = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True).stdout
+        _flite = " flite " in filters
+    return _flite
+
+
+def generate_corpus(directory: str, count: int) -> List[Dict[str, str]]:
+    """
+    Write `count` synthetic clips named the way the downloader names them.
+
+    Args:
+        directory (str): The video directory.
+        count (int): The number of clips; the kinds alternate.
+
+    Returns:
+        List[Dict[str, str]]: A pyktok-like metadata row per clip.
+    """
+    os.makedirs(directory, exist_ok=True)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        kind = CLIP_KINDS[i % len(CLIP_KINDS)]
+        video_id = str(7300000000000000000 + i)
+        author = f"bench_{kind}"
+        path = os.path.join(directory, f"@{author}_video_{video_id}.mp4")
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+             "-f", "lavfi", "-i", f"color=c=black:s=160x120:r=10:d={CLIP_SECONDS}",
+             *_audio_source(kind, CLIP_SECONDS),
+             "-c:v", "mpeg4", "-c:a", "aac", "-shortest", path],
+            check=True
+        )
+        rows.append({
+            "video_id": video_id,
+            "video_timestamp": (started + timedelta(hours=i)).isoformat(),
+            "video_duration": str(CLIP_SECONDS),
+            "video_locationcreated": "RO",
+            "video_sharecount": str(i),
+            "video_commentcount": str(i * 2),
+            "video_playcount": str(i * 100),
+            "video_is_ad": "False",
+            "author_username": author,
+            "author_name": author,
+            "author_followercount": "1000",
+            "author_followingcount": "10",
+            "author_heartcount": "5000",
+            "author_videocount": "42",
+            "author_verified": "False",
+        })
+    return rows
+
+
+def _timed(items: List[Any], work: Callable[[Any], Any], workers: int = 1) -> Dict[str, Any]:
+    """
+    Apply `work` to every item, on `workers` threads, timing each call and the whole stage.
+
+    Returns:
+        Dict[str, Any]: The results, the wall time and the per-call latencies.
+    """
+    def call(item: Any) -> Any:
+        started = time.perf_counter()
+        result = work(item)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        outcomes = list(pool.map(call, items))
+    return {
+        "results": [result for result, _ in outcomes],
+        "seconds": time.perf_counter() - started,
+        "latencies": [latency for _, latency in outcomes],
+    }
+
+
+def _summary(timing: Dict[str, Any], count: int) -> Dict[str, Any]:
+    latencies = sorted(timing["latencies"])
+    return {
+        "seconds": round(timing["seconds"], 4),
+        "per_video": round(timing["seconds"] / count, 5) if count else None,
+        "p50": round(statistics.median(latencies), 5) if latencies else None,
+        "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 5) if latencies else None,
+    }
+
+
+def run_corpus(count: int, workdir: str, whisper_model: str, llm_latency: float, api_requests: int) -> Dict[str, Any]:
+    """
+    Benchmark every stage on a fresh corpus, inside the current (fresh) process.
+
+    Returns:
+        Dict[str, Any]: The per-stage timings.
+    """
+    server = start_stub_llm(llm_latency)
+    # The backend modules read their settings at import time
+    os.environ.update({
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}",
+        "MONGODB_CONNECTION_STRING": os.environ.get("BENCH_MONGODB", "mongomock://"),
+        "SENTIMENT_ESCALATION_THRESHOLD": "1.1",  # Every text reaches the (stub) LLM
+        "LEDGER_PATH": os.path.join(workdir, "ledger.sqlite3"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "cache", "results.sqlite3"),
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "WHISPER_MODEL_SIZES": whisper_model,
+        "WHISPER_DEFAULT_MODEL": whisper_model,
+        "WHISPER_IDLE_TIMEOUT": "0",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    video_dir = os.path.join(workdir, "database")
+    started = time.perf_counter()
+    rows = generate_corpus(video_dir, count)
+    report: Dict[str, Any] = {"videos": count, "generate_seconds": round(time.perf_counter() - started, 3), "stages": {}}
+    stages = report["stages"]
+    paths = [os.path.join(video_dir, f"@{row['author_username']}_video_{row['video_id']}.mp4") for row in rows]
+
+    from conversion import load_audio
+    from model_manager import get_model_manager
+    from translate_and_sentiment import score_text
+    from pipeline import PIPELINE_LLM_WORKERS, IngestionPipeline, build_document
+    from ledger import get_ledger
+    from app import save_to_mongodb
+
+    extraction = _timed(paths, load_audio)
+    stages["extraction"] = _summary(extraction, count)
+
+    manager = get_model_manager()
+    started = time.perf_counter()
+    manager.warm_up()
+    report["model_load_seconds"] = round(time.perf_counter() - started, 3)
+    transcription = _timed(extraction["results"], manager.transcribe_speech)
+    stages["transcription"] = _summary(transcription, count)
+
+    # Silent clips have no text, which never reaches the LLM; give every clip one to time the LLM stage
+    texts = [result["text"].strip() or f"{SPEECH_TEXT} ({i})" for i, result in enumerate(transcription["results"])]
+    before = StubLLMHandler.requests
+    llm = _timed(texts, lambda text: score_text(text, "en"), workers=PIPELINE_LLM_WORKERS)
+    stages["llm"] = dict(_summary(llm, count), requests=StubLLMHandler.requests - before)
+
+    documents = [
+        build_document(dict(row), "en", translation, score, path, text, [], source)
+        for row, path, text, (translation, score, source) in zip(rows, paths, texts, llm["results"])
+    ]
+    persistence = _timed(documents, lambda document: save_to_mongodb([document], raise_errors=True))
+    stages["persistence"] = _summary(persistence, count)
+
+    pipeline = IngestionPipeline(persist=lambda docs: save_to_mongodb(docs, raise_errors=True), ledger=get_ledger())
+    started = time.perf_counter()
+    processed = sum(1 for _ in pipeline.run([dict(row) for row in rows], output_dir=video_dir))
+    seconds = time.perf_counter() - started
+    stages["pipeline"] = {
+        "seconds": round(seconds, 4),
+        "per_video": round(seconds / count, 5) if count else None,
+        "processed": processed,
+        "errors": len(pipeline.errors),
+    }
+
+    from BACKEND import app
+    client = app.test_client()
+    video_ids = [row["video_id"] for row in rows]
+    api_videos = _timed(list(range(api_requests)), lambda _: client.get("/videos?limit=50").status_code)
+    stages["api_videos"] = dict(_summary(api_videos, api_requests), errors=sum(code != 200 for code in api_videos["results"]))
+    api_video = _timed(
+        [video_ids[i % count] for i in range(api_requests)], lambda video_id: client.get(f"/video/{video_id}").status_code
+    )
+    stages["api_video"] = dict(_summary(api_video, api_requests), errors=sum(code != 200 for code in api_video["results"]))
+
+    server.shutdown()
+    return report
+
+
+def measure(count: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run one corpus size in a fresh interpreter and a scratch directory.
+    """
+    workdir = tempfile.mkdtemp(prefix="pipeline_e2e_")
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-corpus", str(count), "--workdir", workdir,
+             "--whisper-model", args.whisper_model, "--llm-latency", str(args.llm_latency),
+             "--api-requests", str(args.api_requests)],
+            cwd=workdir, capture_output=True, text=True, check=True
+        )
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(sizes: List[int], args: argparse.Namespace, thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Benchmark every corpus size and check the thresholds.
+
+    Returns:
+        Dict[str, Any]: The runs per corpus size, the per-stage growth and the failures.
+    """
+    runs: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    for count in sizes:
+        try:
+            result = measure(count, args)
+        except subprocess.CalledProcessError as e:
+            runs.append({"videos": count, "error": e.stderr.strip().splitlines()[-1] if e.stderr else str(e)})
+            failures.append(f"{count} videos: run failed")
+            continue
+        runs.append(result)
+        for stage, limit in thresholds.items():
+            timing = result["stages"].get(stage)
+            if timing is None:
+                continue
+            value = timing["p95"] if stage.startswith("api_") else timing["per_video"]
+            if value is not None and value > limit:
+                failures.append(f"{count} videos: {stage} took {value:.3f}s (limit {limit}s)")
+            if timing.get("errors"):
+                failures.append(f"{count} videos: {stage} had {timing['errors']} errors")
+
+    # How the per-video (per-request) cost moves from the smallest to the largest corpus
+    growth: Dict[str, Optional[float]] = {}
+    finished = [result for result in runs if "stages" in result]
+    if len(finished) > 1:
+        for stage in finished[0]["stages"]:
+            key = "p95" if stage.startswith("api_") else "per_video"
+            first, last = finished[0]["stages"][stage][key], finished[-1]["stages"][stage][key]
+            growth[stage] = round(last / first, 3) if first else None
+
+    return {"runs": runs, "growth": growth, "thresholds": thresholds, "failures": failures}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the ingestion pipeline and the read API.")
+    parser.add_argument("--run-corpus", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--sizes", default="4,16,64", help="Comma separated corpus sizes.")
+    parser.add_argument("--whisper-model", default="tiny", help="Whisper size used by the benchmark.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds the stub LLM waits per request.")
+    parser.add_argument("--api-requests", type=int, default=200, help="Requests per API endpoint.")
+    parser.add_argument("--thresholds", help="JSON file overriding the per-stage limits.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    if args.run_corpus is not None:
+        print(json.dumps(run_corpus(args.run_corpus, args.workdir, args.whisper_model, args.llm_latency, args.api_requests)))
+        return
+
+    thresholds = dict(THRESHOLDS)
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as file:
+            thresholds.update(json.load(file))
+    sizes = sorted({int(value) for value in args.sizes.split(",") if value.strip()})
+
+    report = run(sizes, args, thresholds)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
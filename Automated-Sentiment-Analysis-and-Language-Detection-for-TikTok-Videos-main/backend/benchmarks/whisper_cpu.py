@@ -0,0 +1,225 @@
+"""
+CPU inference benchmark of the Whisper settings.
+
+Every setting (model size or the "auto" size policy, quantization, torch threads) runs in a
+fresh interpreter, since torch thread pools can only be sized once per process. The script
+transcribes a fixture set and reports, as JSON, the real-time factor (processing time /
+audio duration) and the WER drift against the baseline setting (the first size, fp32, the
+most threads). Fixtures with a reference transcript (`<name>.txt` next to the media file)
+also get their absolute WER. It exits with a non-zero status when a setting exceeds the
+thresholds.
+
+Usage (from the backend directory):
+    python benchmarks/whisper_cpu.py --fixtures fixtures/speech \
+        [--sizes base,auto] [--quantize none,int8] [--threads 1,2,4] \
+        [--max-rtf 0.5] [--max-wer-drift 0.05] [--output whisper_cpu.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIA_EXTENSIONS = (".mp4", ".wav", ".mp3", ".m4a")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level edit distance between two transcriptions, normalized by the reference length.
+
+    Args:
+        reference (str): The reference transcription.
+        hypothesis (str): The transcription to score.
+
+    Returns:
+        float: The WER (0 is identical).
+    """
+    ref = re.findall(r"\w+", reference.lower())
+    hyp = re.findall(r"\w+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, other in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_setting(setting: Dict[str, Any], files: List[str]) -> Dict[str, Any]:
+    """
+    Transcribe the fixtures with one setting, inside the current (fresh) process.
+
+    Args:
+        setting (Dict[str, Any]): {"size", "quantize", "threads"}; size "auto" enables the
+            model size policy.
+        files (List[str]): The media files.
+
+    Returns:
+        Dict[str, Any]: The model load time and, per file, its duration, the processing
+        time, the chosen model size and the transcription.
+    """
+    sys.path.insert(0, BACKEND_DIR)
+    from conversion import SAMPLE_RATE, load_audio
+    from model_manager import WhisperModelManager, configure_threads
+
+    configure_threads(setting["threads"], 1)
+    auto = setting["size"] == "auto"
+    manager = WhisperModelManager(
+        model_sizes=[] if auto else [setting["size"]],
+        default_size="base" if auto else setting["size"],
+        device="cpu",
+        idle_timeout=0,
+        quantize=setting["quantize"],
+        size_policy="auto" if auto else "fixed",
+    )
+    started = time.perf_counter()
+    manager.warm_up()
+    load_seconds = time.perf_counter() - started
+
+    results = []
+    for path in files:
+        audio = load_audio(path)
+        started = time.perf_counter()
+        result = manager.transcribe_speech(audio)
+        results.append({
+            "file": os.path.basename(path),
+            "duration": len(audio) / SAMPLE_RATE,
+            "seconds": time.perf_counter() - started,
+            "model_size": result["model_size"],
+            "text": result["text"].strip(),
+        })
+    return {"load_seconds": load_seconds, "files": results}
+
+
+def measure(setting: Dict[str, Any], files: List[str]) -> Dict[str, Any]:
+    """
+    Run one setting in a fresh interpreter.
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-setting", json.dumps(setting), *files],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def find_fixtures(directory: str) -> List[str]:
+    """
+    Returns:
+        List[str]: The media files of the fixture directory, sorted.
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(MEDIA_EXTENSIONS)
+    )
+
+
+def reference_for(path: str) -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: The reference transcript stored next to a fixture, if any.
+    """
+    reference = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(reference):
+        return None
+    with open(reference, encoding="utf-8") as file:
+        return file.read()
+
+
+def run(files: List[str], settings: List[Dict[str, Any]], max_rtf: Optional[float], max_wer_drift: Optional[float]) -> Dict[str, Any]:
+    """
+    Benchmark every setting and compare it with the first one.
+
+    Returns:
+        Dict[str, Any]: The results per setting and the list of failures.
+    """
+    references = {os.path.basename(path): reference_for(path) for path in files}
+    results: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    baseline: Optional[Dict[str, str]] = None
+
+    for setting in settings:
+        name = f"{setting['size']}/{setting['quantize']}/{setting['threads']}t"
+        try:
+            measured = measure(setting, files)
+        except subprocess.CalledProcessError as e:
+            results.append(dict(setting, name=name, error=e.stderr.strip().splitlines()[-1] if e.stderr else str(e)))
+            failures.append(f"{name}: run failed")
+            continue
+
+        texts = {entry["file"]: entry["text"] for entry in measured["files"]}
+        if baseline is None:
+            baseline = texts
+        audio_seconds = sum(entry["duration"] for entry in measured["files"])
+        processing_seconds = sum(entry["seconds"] for entry in measured["files"])
+        rtf = processing_seconds / audio_seconds if audio_seconds else None
+        drift = statistics.mean(word_error_rate(baseline[file], text) for file, text in texts.items())
+        scored = [(references[file], text) for file, text in texts.items() if references[file] is not None]
+
+        row = dict(
+            setting,
+            name=name,
+            load_seconds=round(measured["load_seconds"], 3),
+            audio_seconds=round(audio_seconds, 2),
+            processing_seconds=round(processing_seconds, 3),
+            rtf=round(rtf, 4) if rtf is not None else None,
+            median_file_rtf=round(statistics.median(e["seconds"] / e["duration"] for e in measured["files"] if e["duration"]), 4),
+            wer_drift=round(drift, 4),
+            wer=round(statistics.mean(word_error_rate(ref, text) for ref, text in scored), 4) if scored else None,
+            model_sizes=sorted({entry["model_size"] or "-" for entry in measured["files"]}),
+        )
+        results.append(row)
+
+        if max_rtf is not None and rtf is not None and rtf > max_rtf:
+            failures.append(f"{name}: real-time factor {rtf:.3f} (limit {max_rtf})")
+        if max_wer_drift is not None and drift > max_wer_drift:
+            failures.append(f"{name}: WER drift {drift:.3f} (limit {max_wer_drift})")
+
+    return {"fixtures": len(files), "settings": results, "failures": failures}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Real-time factor and WER drift of the Whisper CPU settings.")
+    parser.add_argument("--run-setting", help=argparse.SUPPRESS)
+    parser.add_argument("files", nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures", default=os.path.join(BACKEND_DIR, "fixtures", "speech"), help="Directory of media fixtures.")
+    parser.add_argument("--sizes", default="base", help="Comma separated model sizes, 'auto' for the size policy.")
+    parser.add_argument("--quantize", default="none,int8", help="Comma separated quantization modes.")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 1), help="Comma separated torch thread counts.")
+    parser.add_argument("--max-rtf", type=float, help="Fail when a setting is slower than this real-time factor.")
+    parser.add_argument("--max-wer-drift", type=float, help="Fail when a setting drifts more than this from the baseline.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    if args.run_setting:
+        print(json.dumps(run_setting(json.loads(args.run_setting), args.files)))
+        return
+
+    files = find_fixtures(args.fixtures)
+    if not files:
+        parser.error(f"no media fixtures in {args.fixtures}")
+    threads = sorted({int(value) for value in args.threads.split(",") if value.strip()}, reverse=True)
+    settings = [
+        {"size": size.strip(), "quantize": quantize.strip(), "threads": count}
+        for size in args.sizes.split(",") if size.strip()
+        for quantize in args.quantize.split(",") if quantize.strip()
+        for count in threads
+    ]
+
+    report = run(files, settings, args.max_rtf, args.max_wer_drift)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import atexit
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from dotenv import load_dotenv
+from typing import Any, Iterator, List, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() == "true"
+
+
+class BrowserPool:
+    """
+    Pool of Edge sessions reused across scraping calls, so the driver binary is resolved once
+    and a browser isn't started (and torn down) for every call.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, headless: bool = BROWSER_HEADLESS) -> None:
+        """
+        Args:
+            size (int): Maximum number of browser sessions.
+            headless (bool): Run the browsers without a window.
+        """
+        self.size = max(1, size)
+        self.headless = headless
+        self._idle: List[Any] = []  # Most recently returned last
+        self._created = 0
+        self._lock = threading.Lock()
+        # Signalled when a session is returned or a slot frees up (a dead session was discarded)
+        self._available = threading.Condition(self._lock)
+        self._driver_path: Optional[str] = None
+        self._all: List[Any] = []
+
+    def _options(self) -> webdriver.EdgeOptions:
+        edge_options = webdriver.EdgeOptions()
+        if self.headless:
+            edge_options.add_argument("--headless=new")
+            edge_options.add_argument("--window-size=1280,2000")
+        edge_options.add_argument("--disable-webrtc")
+        edge_options.add_argument("--lang=ro")  # Set browser language to Romanian
+        edge_options.add_argument("--accept-lang=ro-RO,ro;q=0.9")
+        edge_options.add_argument("--default-search-engine=Google")
+        edge_options.add_argument("--default-search-engine-url=https://www.google.ro")
+        return edge_options
+
+    def _create(self) -> Any:
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = EdgeChromiumDriverManager().install()
+        driver = webdriver.Edge(service=Service(self._driver_path), options=self._options())
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    @staticmethod
+    def _is_alive(driver: Any) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver: Any) -> None:
+        with self._available:
+            self._created -= 1
+            if driver in self._all:
+                self._all.remove(driver)
+            self._available.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def session(self) -> Iterator[Any]:
+        """
+        Borrow a browser session, starting one if the pool isn't full yet and waiting otherwise.
+        A session that crashed while borrowed is replaced instead of being returned to the pool.
+
+        Yields:
+            Any: A selenium WebDriver.
+        """
+        driver = None
+        while driver is None:
+            with self._available:
+                self._available.wait_for(lambda: self._idle or self._created < self.size)
+                if self._idle:
+                    driver = self._idle.pop()
+                    create = False
+                else:
+                    self._created += 1
+                    create = True
+            if create:
+                try:
+                    driver = self._create()
+                except Exception:
+                    with self._available:
+                        self._created -= 1
+                        self._available.notify()
+                    raise
+            if not self._is_alive(driver):
+                self._discard(driver)
+                driver = None
+
+        try:
+            yield driver
+        except Exception:
+            if not self._is_alive(driver):
+                self._discard(driver)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                with self._available:
+                    self._idle.append(driver)
+                    self._available.notify()
+
+    def close(self) -> None:
+        """
+        Quit every browser of the pool.
+        """
+        with self._available:
+            drivers, self._all = self._all, []
+            self._created = 0
+            self._idle.clear()
+            self._available.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Returns:
+        BrowserPool: The process-wide browser pool, closed automatically at exit.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,168 @@
+import os
+import re
+import numpy as np
+from concurrent.futures import Executor
+from dotenv import load_dotenv
+from conversion import SAMPLE_RATE, load_audio
+from model_manager import get_model_manager
+from vad import HOP_SECONDS, frame_features
+from typing import Any, Dict, List, Optional, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+# Clips longer than this (seconds) are split and transcribed in parallel (0 disables chunking)
+TRANSCRIBE_CHUNK_THRESHOLD = float(os.getenv("TRANSCRIBE_CHUNK_THRESHOLD", "90"))
+# Target chunk length; cuts are moved back to the quietest point of the last CHUNK_SEARCH seconds
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "30"))
+TRANSCRIBE_CHUNK_OVERLAP = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP", "1.5"))
+CHUNK_SEARCH_SECONDS = 5.0
+
+Segment = Dict[str, Any]
+
+
+def compact_segments(segments: List[Dict[str, Any]], offset: float = 0.0) -> List[Segment]:
+    """
+    Keep only the start, end and text of Whisper segments.
+
+    Args:
+        segments (List[Dict[str, Any]]): The `segments` of a Whisper result.
+        offset (float): Seconds added to every timestamp. Defaults to 0.
+
+    Returns:
+        List[Segment]: {"start", "end", "text"} dicts, timestamps rounded to 10 ms.
+    """
+    return [
+        {
+            "start": round(float(segment["start"]) + offset, 2),
+            "end": round(float(segment["end"]) + offset, 2),
+            "text": segment["text"].strip(),
+        }
+        for segment in segments
+        if segment["text"].strip()
+    ]
+
+
+def plan_chunks(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS,
+    overlap: float = TRANSCRIBE_CHUNK_OVERLAP
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Split a clip into overlapping windows that are cut at pauses.
+
+    Every cut is placed on the quietest 200 ms of the last few seconds before the target
+    length, so words are rarely split; the windows extend `overlap` seconds past each cut
+    to catch the ones that are.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio of the whole clip.
+        sample_rate (int): The sample rate. Defaults to 16000.
+        chunk_seconds (float): The target window length.
+        overlap (float): Seconds shared by neighbouring windows on each side of a cut.
+
+    Returns:
+        List[Tuple[float, float, float, float]]: (start, end, own_from, own_to) seconds per
+        window; [own_from, own_to) is the stretch between its cuts, which the window owns
+        when the results are stitched.
+    """
+    duration = len(audio) / sample_rate
+    energy_db = frame_features(audio, sample_rate)[0]
+    smoothed = np.convolve(energy_db, np.ones(20) / 20, mode="same")
+
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds:
+        target = cuts[-1] + chunk_seconds
+        lo = int(max(cuts[-1] + chunk_seconds / 2, target - CHUNK_SEARCH_SECONDS) / HOP_SECONDS)
+        hi = min(int(target / HOP_SECONDS), len(smoothed))
+        cut = (lo + int(np.argmin(smoothed[lo:hi]))) * HOP_SECONDS if hi > lo else target
+        cuts.append(cut)
+    cuts.append(duration)
+
+    return [
+        (max(0.0, own_from - overlap), min(duration, own_to + overlap), own_from, own_to)
+        for own_from, own_to in zip(cuts, cuts[1:])
+    ]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text).strip().lower()
+
+
+def stitch(pieces: List[Tuple[float, float, List[Segment]]]) -> Tuple[str, List[Segment]]:
+    """
+    Merge the transcriptions of overlapping windows into one.
+
+    A segment is kept by the window owning its midpoint, so text heard in an overlap is
+    only kept once; a segment repeating the previous one word for word is also dropped.
+
+    Args:
+        pieces (List[Tuple[float, float, List[Segment]]]): (own_from, own_to, segments) per
+            window, in order, with segment timestamps on the clip's timeline.
+
+    Returns:
+        Tuple[str, List[Segment]]: The full transcription and its segments.
+    """
+    segments: List[Segment] = []
+    for index, (own_from, own_to, window) in enumerate(pieces):
+        last = index == len(pieces) - 1
+        for segment in window:
+            middle = (segment["start"] + segment["end"]) / 2
+            if middle < own_from or (middle >= own_to and not last):
+                continue
+            if segments and _normalize(segment["text"]) == _normalize(segments[-1]["text"]):
+                continue
+            segments.append(segment)
+    return " ".join(segment["text"] for segment in segments), segments
+
+
+def transcribe_chunk(
+    video_path: str,
+    start: float,
+    end: float,
+    language: Optional[str],
+    size: Optional[str] = None
+) -> List[Segment]:
+    """
+    Decode and transcribe one window of a video inside a pool worker.
+
+    Args:
+        video_path (str): The path to the video file.
+        start (float): The window start in seconds.
+        end (float): The window end in seconds.
+        language (Optional[str]): The language detected on the whole clip.
+        size (Optional[str]): The model size chosen for the whole clip.
+
+    Returns:
+        List[Segment]: The segments of the window, on the clip's timeline.
+    """
+    audio = load_audio(video_path, start=start, duration=end - start)
+    options = {"language": language} if language else {}
+    result = get_model_manager().transcribe_speech(audio, size=size, **options)
+    return compact_segments(result.get("segments", []), offset=start)
+
+
+def transcribe_chunks(
+    executor: Executor,
+    video_path: str,
+    plan: List[Tuple[float, float, float, float]],
+    language: Optional[str],
+    size: Optional[str] = None
+) -> Tuple[str, List[Segment]]:
+    """
+    Transcribe the windows of a clip in parallel and stitch the results.
+
+    Args:
+        executor (Executor): The pool running `transcribe_chunk`, e.g. one initialized
+            with `warm_up_worker`.
+        video_path (str): The path to the video file.
+        plan (List[Tuple[float, float, float, float]]): The windows from `plan_chunks`.
+        language (Optional[str]): The language of the clip.
+        size (Optional[str]): The model size for every window.
+
+    Returns:
+        Tuple[str, List[Segment]]: The full transcription and its segments.
+    """
+    futures = [executor.submit(transcribe_chunk, video_path, start, end, language, size) for start, end, _, _ in plan]
+    return stitch([(own_from, own_to, future.result()) for (_, _, own_from, own_to), future in zip(plan, futures)])
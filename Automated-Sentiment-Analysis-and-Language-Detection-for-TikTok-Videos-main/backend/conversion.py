@@ -1,7 +1,104 @@
-from moviepy.video.io.VideoFileClip import VideoFileClip
+import os
+import subprocess
+import tempfile
+import numpy as np
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
-def convert_mp4_to_wav(mp4_file_path, wav_file_path = 'output.wav'):
-    video_clip = VideoFileClip(mp4_file_path)
-    audio_clip = video_clip.audio
-    audio_clip.write_audiofile(wav_file_path)
+# Whisper works on 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+def load_audio(
+    mp4_file_path: str,
+    sample_rate: int = SAMPLE_RATE,
+    start: Optional[float] = None,
+    duration: Optional[float] = None
+) -> np.ndarray:
+    """
+    Decode only the audio track of a video straight into memory.
+
+    ffmpeg skips the video stream (-vn), resamples to `sample_rate` mono and pipes raw
+    16-bit PCM to stdout, so no intermediate file is written and every call gets its
+    own private buffer.
+
+    Args:
+        mp4_file_path (str): The path to the video file.
+        sample_rate (int): The output sample rate. Defaults to 16000.
+        start (Optional[float]): Seconds to seek before decoding. Defaults to the beginning.
+        duration (Optional[float]): Seconds to decode. Defaults to the rest of the file.
+
+    Returns:
+        np.ndarray: The audio as a 1-D float32 array in [-1, 1].
+    """
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if start is not None:
+        cmd += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-i", mp4_file_path,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio from {mp4_file_path}: {e.stderr.decode(errors='ignore')}") from e
+
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+def convert_mp4_to_wav(mp4_file_path: str, wav_file_path: Optional[str] = None) -> str:
+    """
+    Extract the audio track of a video into a 16 kHz mono WAV file.
+
+    Args:
+        mp4_file_path (str): The path to the video file.
+        wav_file_path (Optional[str]): Where to write the WAV. Defaults to a new private temp file.
+
+    Returns:
+        str: The path of the written WAV file.
+    """
+    temporary = wav_file_path is None
+    if temporary:
+        fd, wav_file_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+    cmd = [
+        "ffmpeg", "-nostdin", "-y",
+        "-i", mp4_file_path,
+        "-vn", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        wav_file_path
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except BaseException:
+        # Nobody gets the path of a temp file that failed, so nobody else would remove it
+        if temporary:
+            try:
+                os.remove(wav_file_path)
+            except OSError:
+                pass
+        raise
     return wav_file_path
+
+@contextmanager
+def temporary_wav(mp4_file_path: str) -> Iterator[str]:
+    """
+    Per-job temporary WAV file for callers that need a path instead of a buffer.
+    The file is removed when the context exits.
+
+    Args:
+        mp4_file_path (str): The path to the video file.
+
+    Yields:
+        str: The path of the temporary WAV file.
+    """
+    wav_file_path = convert_mp4_to_wav(mp4_file_path)
+    try:
+        yield wav_file_path
+    finally:
+        try:
+            os.remove(wav_file_path)
+        except OSError:
+            pass
@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+from jobs import Job
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+# Crawled tags / queries with their interval in seconds: "raiffeisen:3600,#raiffeisenbank:21600"
+CRAWL_TAGS = os.getenv("CRAWL_TAGS", "raiffeisen:3600")
+CRAWL_ENABLED = os.getenv("CRAWL_ENABLED", "false").lower() == "true"  # Run the scheduler in the API process
+CRAWL_MAX_VIDEOS = int(os.getenv("CRAWL_MAX_VIDEOS", "50"))  # New videos ingested per crawl at most
+CRAWL_STOP_AFTER_KNOWN = int(os.getenv("CRAWL_STOP_AFTER_KNOWN", "20"))  # Stop scrolling after this many known videos in a row
+CRAWL_TICK = 10.0  # Seconds between two checks for due crawls
+
+DEFAULT_INTERVAL = 3600.0
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tags(value: str) -> List[Tuple[str, float]]:
+    """
+    Args:
+        value (str): Comma separated "query[:interval seconds]" entries.
+
+    Returns:
+        List[Tuple[str, float]]: The queries and their crawl intervals.
+
+    Raises:
+        ValueError: If an entry has no query or its interval isn't a positive number.
+    """
+    tags = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        query, separator, interval = entry.rpartition(":")
+        if not separator:
+            query, interval = entry, ""
+        try:
+            seconds = float(interval) if interval else DEFAULT_INTERVAL
+        except ValueError:
+            seconds = 0
+        if seconds <= 0 or not query.strip():
+            raise ValueError(f"Invalid crawl tag '{entry}', expected 'query[:interval seconds]'.")
+        tags.append((query.strip(), seconds))
+    return tags
+
+
+# The query of /process requests and script runs that don't name one
+DEFAULT_SEARCH_QUERY = (parse_tags(CRAWL_TAGS) or [("raiffeisen", DEFAULT_INTERVAL)])[0][0]
+
+
+class CrawlTarget:
+    """
+    A crawled tag or search query and the state of its schedule.
+    """
+
+    def __init__(self, query: str, interval: float) -> None:
+        self.query = query
+        self.interval = interval
+        self.next_run = 0.0  # Due immediately
+        self.runs = 0
+        self.job: Optional[Job] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        job = self.job
+        return {
+            "query": self.query,
+            "interval": self.interval,
+            "next_run": self.next_run,
+            "runs": self.runs,
+            "last_job": job.to_dict() if job is not None else None,
+        }
+
+
+class CrawlScheduler:
+    """
+    Periodically submits an incremental ingestion job for every crawled tag.
+
+    A crawl drops the videos that are already stored while scraping, before any download
+    or inference, and stops scrolling once it meets a run of known videos, so its cost
+    follows the amount of new content rather than the size of the tag page.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[..., Job],
+        tags: Optional[List[Tuple[str, float]]] = None,
+        max_videos: int = CRAWL_MAX_VIDEOS,
+        stop_after_known: int = CRAWL_STOP_AFTER_KNOWN,
+        tick: float = CRAWL_TICK
+    ) -> None:
+        """
+        Args:
+            submit (Callable[..., Job]): Enqueues an ingestion job with the given parameters,
+                e.g. a `JobQueue.submit` bound to the ingestion entry point.
+            tags (Optional[List[Tuple[str, float]]]): The queries and their intervals in
+                seconds. Defaults to CRAWL_TAGS.
+            max_videos (int): New videos ingested per crawl at most.
+            stop_after_known (int): Known videos in a row after which a crawl stops scrolling.
+            tick (float): Seconds between two checks for due crawls.
+        """
+        self.submit = submit
+        self.targets = [CrawlTarget(query, interval) for query, interval in (tags if tags is not None else parse_tags(CRAWL_TAGS))]
+        self.max_videos = max_videos
+        self.stop_after_known = stop_after_known
+        self.tick = tick
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def run_pending(self, now: Optional[float] = None) -> List[Job]:
+        """
+        Submit the crawls that are due. A tag whose previous crawl is still queued or
+        running is skipped until that one finishes.
+
+        Args:
+            now (Optional[float]): The current time. Defaults to time.time().
+
+        Returns:
+            List[Job]: The submitted jobs.
+        """
+        now = time.time() if now is None else now
+        submitted = []
+        with self._lock:
+            for target in self.targets:
+                if target.next_run > now or (target.job is not None and not target.job.finished):
+                    continue
+                target.job = self.submit(
+                    search_query=target.query,
+                    count=self.max_videos,
+                    stop_after_known=self.stop_after_known
+                )
+                target.runs += 1
+                target.next_run = now + target.interval
+                submitted.append(target.job)
+                logger.info("Crawl of '%s' queued as job %s.", target.query, target.job.id)
+        return submitted
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Could not schedule the crawls")
+            self._stop.wait(self.tick)
+
+    def start(self) -> None:
+        """
+        Start the scheduling thread (no-op when already running).
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="crawl-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop scheduling; queued and running crawls still finish.
+        """
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Whether the scheduler runs, and the schedule of every tag.
+        """
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "max_videos": self.max_videos,
+                "stop_after_known": self.stop_after_known,
+                "targets": [target.to_dict() for target in self.targets],
+            }
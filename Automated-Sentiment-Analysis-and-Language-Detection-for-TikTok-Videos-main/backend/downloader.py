@@ -0,0 +1,227 @@
+import os
+import csv
+import glob
+import json
+import time
+import shutil
+import logging
+import tempfile
+import pyktok as pyk
+import metrics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+from ledger import Ledger
+from tiktok_urls import extract_video_id
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Load environment variables from .env
+load_dotenv()
+
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_BACKOFF = float(os.getenv("DOWNLOAD_BACKOFF", "2"))
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_PREFIX = ".partial-"  # Worker scratch space, inside the output directory so moves are atomic
+
+
+def video_file_name(url: str) -> str:
+    """
+    Args:
+        url (str): A TikTok video URL.
+
+    Returns:
+        str: The file name pyktok gives the video, e.g. "@user_video_123.mp4".
+    """
+    return url.split('?')[0].replace('https://www.tiktok.com/', '').replace('/', '_') + '.mp4'
+
+
+def find_downloaded(output_dir: str, video_id: str) -> Optional[str]:
+    """
+    Args:
+        output_dir (str): The video directory.
+        video_id (str): The TikTok video id.
+
+    Returns:
+        Optional[str]: The path of the already downloaded video, if any.
+    """
+    matches = glob.glob(os.path.join(glob.escape(output_dir), f"*_video_{video_id}.mp4"))
+    return matches[0] if matches else None
+
+
+def _init_worker(scratch_root: str) -> None:
+    """
+    Pool initializer: pyktok writes videos into the current working directory, so every
+    worker process moves into its own scratch directory.
+    """
+    os.chdir(tempfile.mkdtemp(dir=scratch_root))
+
+
+def _download(url: str, save_video: bool, retries: int, backoff: float) -> Dict[str, Any]:
+    """
+    Download one video and its metadata inside a worker's scratch directory, retrying with
+    exponential backoff.
+
+    Returns:
+        Dict[str, Any]: The metadata rows, the absolute path of the downloaded file (if any),
+        its size, the number of attempts and the elapsed time.
+    """
+    metadata_fn = 'metadata.csv'
+    started = time.monotonic()
+    for attempt in range(1, retries + 2):
+        for leftover in (metadata_fn, video_file_name(url)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        try:
+            pyk.save_tiktok(url, save_video, metadata_fn)
+            with open(metadata_fn, mode='r', encoding='utf-8') as file:
+                rows = list(csv.DictReader(file))
+            if not rows:
+                raise RuntimeError("no metadata returned")
+            video_path = None
+            if save_video:
+                video_path = os.path.abspath(video_file_name(url))
+                if not os.path.exists(video_path) or os.path.getsize(video_path) == 0:
+                    raise RuntimeError("no video file written")
+            return {
+                "rows": rows,
+                "video_path": video_path,
+                "bytes": os.path.getsize(video_path) if video_path else 0,
+                "attempts": attempt,
+                "seconds": time.monotonic() - started,
+            }
+        except Exception as e:
+            if attempt > retries:
+                raise RuntimeError(f"{e} (after {attempt} attempts)") from e
+            time.sleep(backoff * (2 ** (attempt - 1)))
+    raise RuntimeError("download failed")  # Not reached
+
+
+class VideoDownloader:
+    """
+    Parallel TikTok downloader.
+
+    Videos whose id is already stored (`skip_ids`) are not downloaded at all, videos already
+    present in the output directory only have their metadata fetched. Every worker writes into
+    its own scratch directory and finished files are moved into place atomically. Metadata rows
+    are appended, by this process only, to a per-job JSON-lines record stream.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = 'database',
+        workers: int = DOWNLOAD_WORKERS,
+        retries: int = DOWNLOAD_RETRIES,
+        backoff: float = DOWNLOAD_BACKOFF,
+        ledger: Optional[Ledger] = None
+    ) -> None:
+        """
+        Args:
+            output_dir (str): The directory the videos end up in. Defaults to 'database'.
+            workers (int): The number of parallel downloads.
+            retries (int): Retries of a failed download.
+            backoff (float): First retry delay in seconds, doubled on every retry.
+            ledger (Optional[Ledger]): Records every finished download. Defaults to None.
+        """
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.ledger = ledger
+
+    def download(
+        self,
+        urls: Iterable[str],
+        records_path: str,
+        skip_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Download the videos and stream their metadata to `records_path`.
+
+        Args:
+            urls (Iterable[str]): TikTok video URLs.
+            records_path (str): The JSON-lines file receiving one metadata row per video.
+            skip_ids (Optional[Set[str]]): Video ids that are already processed.
+
+        Returns:
+            List[Dict[str, Any]]: One report per URL with its status ("downloaded",
+            "metadata_only", "skipped" or "failed"), timing and byte count.
+        """
+        skip_ids = skip_ids or set()
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Per call, so concurrent jobs sharing the output directory never remove each other's scratch space
+        scratch_root = tempfile.mkdtemp(dir=self.output_dir, prefix=PARTIAL_PREFIX)
+
+        reports: List[Dict[str, Any]] = []
+        jobs = []
+        for url in dict.fromkeys(urls):  # Drop repeated URLs, keep the order
+            video_id = extract_video_id(url)
+            if video_id in skip_ids:
+                reports.append({"url": url, "video_id": video_id, "status": "skipped", "seconds": 0.0, "bytes": 0})
+                continue
+            jobs.append((url, video_id, find_downloaded(self.output_dir, video_id) is None if video_id else True))
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(scratch_root,)
+            ) as pool, open(records_path, 'a', encoding='utf-8') as records:
+                futures = {
+                    pool.submit(_download, url, save_video, self.retries, self.backoff): (url, video_id, save_video)
+                    for url, video_id, save_video in jobs
+                }
+                for future in as_completed(futures):
+                    url, video_id, save_video = futures[future]
+                    report: Dict[str, Any] = {"url": url, "video_id": video_id}
+                    try:
+                        result = future.result()
+                        destination = find_downloaded(self.output_dir, video_id) if video_id else None
+                        if result["video_path"]:
+                            destination = os.path.join(self.output_dir, os.path.basename(result["video_path"]))
+                            os.replace(result["video_path"], destination)  # Atomic: same filesystem
+                        for row in result["rows"]:
+                            records.write(json.dumps(row, ensure_ascii=False) + '\n')
+                            if self.ledger is not None:
+                                self.ledger.record_download(row, destination)
+                        records.flush()
+                        metrics.record(
+                            "download", result["seconds"], video_id,
+                            bytes=result["bytes"], attempts=result["attempts"], video=save_video
+                        )
+                        report.update(
+                            status="downloaded" if save_video else "metadata_only",
+                            seconds=round(result["seconds"], 3),
+                            bytes=result["bytes"],
+                            attempts=result["attempts"],
+                        )
+                    except Exception as e:
+                        logger.error("Error downloading %s: %s", url, e)
+                        metrics.record("download", None, video_id, error=str(e))
+                        report.update(status="failed", error=str(e), seconds=0.0, bytes=0)
+                    reports.append(report)
+        finally:
+            shutil.rmtree(scratch_root, ignore_errors=True)
+
+        downloaded = [report for report in reports if report["status"] == "downloaded"]
+        logger.info(
+            "Downloaded %d videos (%d bytes), skipped %d, failed %d.",
+            len(downloaded), sum(r['bytes'] for r in downloaded),
+            sum(r['status'] == 'skipped' for r in reports), sum(r['status'] == 'failed' for r in reports)
+        )
+        return reports
+
+
+def read_records(path: str) -> Iterable[Dict[str, str]]:
+    """
+    Read a metadata record stream written by `VideoDownloader.download`.
+
+    Args:
+        path (str): The JSON-lines file.
+
+    Yields:
+        Dict[str, str]: One metadata row per video.
+    """
+    with open(path, mode='r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,176 @@
+import io
+import csv
+import json
+import zlib
+from datetime import datetime
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from video_queries import SORT_FIELDS
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+EXPORT_BATCH_SIZE = 500  # Documents per MongoDB round trip
+EXPORT_CHUNK_BYTES = 64 * 1024  # Output is flushed in chunks of about this size
+FORMATS = ("ndjson", "csv")
+
+# Exported fields, in CSV column order. `segments` is a list, so NDJSON only.
+EXPORT_FIELDS = [
+    "video_id",
+    "video_timestamp",
+    "video_duration",
+    "video_locationcreated",
+    "video_playcount",
+    "video_sharecount",
+    "video_commentcount",
+    "video_is_ad",
+    "author_username",
+    "author_name",
+    "author_followercount",
+    "author_followingcount",
+    "author_heartcount",
+    "author_videocount",
+    "author_verified",
+    "language",
+    "transcription",
+    "sentence",
+    "sentiment_score",
+    "sentiment_source",
+    "video_file",
+]
+NESTED_FIELDS = ["segments"]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_fields(value: Optional[str], export_format: str) -> List[str]:
+    """
+    Args:
+        value (Optional[str]): Comma separated field names, or None for every field.
+        export_format (str): "ndjson" or "csv".
+
+    Returns:
+        List[str]: The exported fields.
+
+    Raises:
+        ValueError: If the format or a field is unknown.
+    """
+    if export_format not in FORMATS:
+        raise ValueError(f"'format' must be one of {', '.join(FORMATS)}.")
+    available = EXPORT_FIELDS + (NESTED_FIELDS if export_format == "ndjson" else [])
+    if not value:
+        return available
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown {export_format} export fields: {', '.join(unknown)}.")
+    return fields
+
+
+def iter_documents(collection: Collection, query: Dict[str, Any], fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the matching documents, oldest first, one cursor batch at a time.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        query (Dict[str, Any]): The filter, e.g. from `build_video_filter`.
+        fields (Sequence[str]): The exported fields.
+
+    Yields:
+        Dict[str, Any]: The documents, with only `fields`.
+    """
+    projection = dict({field: 1 for field in fields}, _id=0)
+    yield from (
+        collection.find(query, projection)
+        .sort([(field, ASCENDING) for field in SORT_FIELDS])  # The (video_timestamp, video_id) index
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+
+def iter_ndjson(documents: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Yields:
+        str: One JSON document per line, datetimes as ISO 8601 strings.
+    """
+    for document in documents:
+        yield json.dumps(document, ensure_ascii=False, default=_default) + "\n"
+
+
+def iter_csv(documents: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[str]:
+    """
+    Yields:
+        str: The header row, then one row per document; missing fields are left empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values: Iterable[Any]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield row(fields)
+    for document in documents:
+        yield row(
+            _default(value) if isinstance(value, datetime) else value
+            for value in (document.get(field) for field in fields)
+        )
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    parts: List[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(
+    collection: Collection,
+    query: Dict[str, Any],
+    export_format: str = "ndjson",
+    fields: Optional[Sequence[str]] = None,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Serialize the matching videos straight from a MongoDB cursor.
+
+    Only one cursor batch and one output chunk are held at a time, so memory stays constant
+    whatever the number of exported videos.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        query (Dict[str, Any]): The filter, e.g. from `build_video_filter`.
+        export_format (str): "ndjson" or "csv". Defaults to "ndjson".
+        fields (Optional[Sequence[str]]): The exported fields. Defaults to every field of the format.
+        compress (bool): Gzip the output. Defaults to False.
+
+    Returns:
+        Iterator[bytes]: The encoded output, in chunks of about EXPORT_CHUNK_BYTES.
+
+    Raises:
+        ValueError: If the format or a field is unknown.
+    """
+    fields = parse_fields(",".join(fields) if fields else None, export_format)
+    documents = iter_documents(collection, query, fields)
+    lines = iter_ndjson(documents) if export_format == "ndjson" else iter_csv(documents, fields)
+    chunks = _chunked(lines)
+    return _gzipped(chunks) if compress else chunks
@@ -0,0 +1,72 @@
+import os
+from jobs import Job
+from app import collection, fetch_tiktok_video_urls, iter_processed_videos, save_to_mongodb
+from downloader import VideoDownloader
+from known_ids import get_known_ids
+from ledger import get_ledger
+from tiktok_urls import extract_video_id
+from typing import Any, Dict, List
+
+def process_job(job: Job) -> Dict[str, Any]:
+    """
+    Run a /process job: fetch TikTok video URLs, download the videos, process language,
+    transcription and sentiment, and save every video to MongoDB as it finishes.
+
+    The scraped links and the metadata record stream live in the job's own working directory,
+    so concurrent jobs never share them. Videos are moved to the shared 'database' directory,
+    from which the API serves them. Videos already stored in MongoDB are dropped while
+    scraping, so `count` new videos are fetched and nothing is downloaded twice.
+
+    Args:
+        job (Job): The job; `job.params` holds `count`, `search_query` and optionally
+            `stop_after_known` (stop scrolling after that many stored videos in a row).
+
+    Returns:
+        Dict[str, Any]: A summary with the number of fetched, skipped and processed videos.
+    """
+    count = job.params["count"]
+    datafile = os.path.join(job.workdir, 'records.jsonl')
+    stored = get_known_ids()
+    skipped = 0
+
+    def is_known(video_id: str) -> bool:
+        nonlocal skipped
+        known = video_id in stored
+        skipped += known
+        return known
+
+    def persist(documents: List[Dict[str, Any]]) -> None:
+        save_to_mongodb(documents, raise_errors=True)
+        stored.add_many(document["video_id"] for document in documents)
+
+    # Step 1: Fetch the URLs of new TikTok videos
+    job.emit("scrape", "started")
+    video_urls = fetch_tiktok_video_urls(
+        search_query=job.params["search_query"],
+        num_links=count,
+        file_path=os.path.join(job.workdir, 'links.txt'),
+        is_known=is_known,
+        stop_after_known=job.params.get("stop_after_known", 0)
+    )
+    job.emit("scrape", "done", urls=len(video_urls), known=skipped)
+
+    # Step 2: Download the new TikTok videos and their metadata in parallel. The known ids
+    # are this process's view; videos stored by another process since are caught here.
+    video_ids = [video_id for video_id in map(extract_video_id, video_urls) if video_id]
+    known_ids = {document["video_id"] for document in collection.find({"video_id": {"$in": video_ids}}, {"video_id": 1})}
+    stored.add_many(known_ids)
+    for report in VideoDownloader(ledger=get_ledger()).download(video_urls, datafile, skip_ids=known_ids):
+        job.emit("download", report.pop("status"), **report)
+
+    if not os.path.exists(datafile):
+        return {"fetched": len(video_urls), "known": skipped, "new": 0, "processed": 0}
+
+    # Step 3: Process language, transcription and sentiment, saving every video to MongoDB as it finishes
+    processed = 0
+    for _ in iter_processed_videos(
+        datafile=datafile,
+        persist=persist,
+        progress=lambda video_id, stage, status: job.emit(stage, status, video_id=video_id)
+    ):
+        processed += 1
+    return {"fetched": len(video_urls), "known": skipped, "new": len(video_ids) - len(known_ids), "processed": processed}
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+JOBS_MAX_CONCURRENT = int(os.getenv("JOBS_MAX_CONCURRENT", "1"))
+JOBS_HISTORY = int(os.getenv("JOBS_HISTORY", "100"))  # Finished jobs kept for /jobs/<id>
+JOBS_KEEP_WORKDIRS = os.getenv("JOBS_KEEP_WORKDIRS", "false").lower() == "true"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    A background ingestion job with its own working directory and an append-only event log.
+    """
+
+    def __init__(self, params: Dict[str, Any], root: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.workdir = os.path.join(root, self.id)
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def emit(self, stage: str, status: str, video_id: Optional[str] = None, **details: Any) -> None:
+        """
+        Append a progress event and wake up the event streams.
+
+        Args:
+            stage (str): The stage, e.g. "scrape", "download", "transcribe", "llm", "persist".
+            status (str): The stage status, e.g. "started", "done", "failed".
+            video_id (Optional[str]): The video the event is about, if any.
+            **details: Extra JSON-serializable fields.
+        """
+        with self._changed:
+            event = {"id": len(self.events), "time": time.time(), "stage": stage, "status": status}
+            if video_id is not None:
+                event["video_id"] = video_id
+            event.update(details)
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def _set_status(self, status: str, error: Optional[str] = None) -> None:
+        with self._changed:
+            self.status = status
+            self.error = error
+            if status == RUNNING:
+                self.started_at = time.time()
+            elif status in (SUCCEEDED, FAILED):
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def wait_events(self, since: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """
+        Block until there are events after `since` or the job finished.
+
+        Args:
+            since (int): The number of events the caller already has.
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            List[Dict[str, Any]]: The new events (possibly empty on timeout).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > since or self.finished, timeout=timeout)
+            return self.events[since:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: The job status without the full event log.
+        """
+        with self._changed:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "params": self.params,
+                "error": self.error,
+                "result": self.result,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "events": len(self.events),
+                "last_event": self.events[-1] if self.events else None,
+            }
+
+
+class JobQueue:
+    """
+    Runs jobs on a local worker pool, at most `max_concurrent` at a time. Every job gets an
+    isolated working directory that is removed once it succeeds.
+    """
+
+    def __init__(self, max_concurrent: int = JOBS_MAX_CONCURRENT, root: str = JOBS_DIR, history: int = JOBS_HISTORY) -> None:
+        """
+        Args:
+            max_concurrent (int): The number of jobs running at the same time.
+            root (str): The directory holding the per-job working directories.
+            history (int): The number of finished jobs remembered for status queries.
+        """
+        self.root = root
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, target: Callable[[Job], Dict[str, Any]], **params: Any) -> Job:
+        """
+        Enqueue a job.
+
+        Args:
+            target (Callable[[Job], Dict[str, Any]]): Runs the job; reads `job.params`, works inside
+                `job.workdir`, reports progress through `job.emit` and returns a result summary.
+            **params: JSON-serializable job parameters.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(params, self.root)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job, target)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Job]: The job, or None if unknown.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, target: Callable[[Job], Dict[str, Any]]) -> None:
+        job._set_status(RUNNING)
+        job.emit("job", "started")
+        try:
+            # Inside the try, so a workdir that can't be created fails the job instead of
+            # leaving it queued (and its event stream open) forever
+            os.makedirs(job.workdir, exist_ok=True)
+            job.result = target(job) or {}
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.emit("job", "failed", error=str(e))
+            job._set_status(FAILED, str(e))
+            return
+        job.emit("job", "done", **job.result)
+        job._set_status(SUCCEEDED)
+        if not JOBS_KEEP_WORKDIRS:
+            shutil.rmtree(job.workdir, ignore_errors=True)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+
+def stream_events(job: Job, since: int = 0) -> Iterator[str]:
+    """
+    Format the events of a job as a Server-Sent-Events stream, until the job finishes.
+
+    Args:
+        job (Job): The job to follow.
+        since (int): The number of events the client already received (Last-Event-ID + 1).
+
+    Yields:
+        str: SSE messages (with keep-alive comments while nothing happens).
+    """
+    while True:
+        events = job.wait_events(since)
+        for event in events:
+            yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+        since += len(events)
+        if job.finished and since >= len(job.events):
+            return
+        if not events:
+            yield ": keep-alive\n\n"
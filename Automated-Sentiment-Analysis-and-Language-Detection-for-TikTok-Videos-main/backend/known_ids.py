@@ -0,0 +1,126 @@
+import heapq
+import bisect
+import logging
+import threading
+from array import array
+from pymongo.collection import Collection
+from typing import Iterable, Optional, Set
+
+# Ids added since the last merge into the sorted array
+KNOWN_IDS_MERGE_THRESHOLD = 4096
+
+logger = logging.getLogger(__name__)
+
+
+class KnownVideoIds:
+    """
+    Compact, thread-safe set of the ids of the videos already stored.
+
+    TikTok video ids are 64-bit integers, so they are kept in a sorted `array('q')`
+    (8 bytes per video instead of ~100 for a set of strings) and looked up by binary search.
+    Ids added at runtime go to a small set that is merged into the array once it grows.
+    """
+
+    def __init__(self, ids: Iterable[str] = ()) -> None:
+        """
+        Args:
+            ids (Iterable[str]): The initially known video ids.
+        """
+        self._recent: Set[int] = set()
+        self._other: Set[str] = set()  # Ids that aren't 64-bit integers, should any show up
+        self._lock = threading.Lock()
+        numbers = array('q')
+        for video_id in ids:
+            number = self._number(str(video_id))
+            if number is None:
+                self._other.add(str(video_id))
+            else:
+                numbers.append(number)
+        self._sorted = array('q', sorted(set(numbers)))
+
+    @staticmethod
+    def _number(video_id: str) -> Optional[int]:
+        if video_id.isdigit():
+            number = int(video_id)
+            if number < 2 ** 63:
+                return number
+        return None
+
+    def _in_sorted(self, number: int) -> bool:
+        index = bisect.bisect_left(self._sorted, number)
+        return index < len(self._sorted) and self._sorted[index] == number
+
+    def _merge(self) -> None:
+        with self._lock:
+            new = sorted(number for number in self._recent if not self._in_sorted(number))
+            self._sorted = array('q', heapq.merge(self._sorted, new))
+            self._recent.clear()
+
+    def add(self, video_id: str) -> None:
+        """
+        Args:
+            video_id (str): The id of a video that was just stored.
+        """
+        self.add_many([video_id])
+
+    def add_many(self, video_ids: Iterable[str]) -> None:
+        """
+        Args:
+            video_ids (Iterable[str]): The ids of videos that were just stored.
+        """
+        with self._lock:
+            for video_id in video_ids:
+                number = self._number(str(video_id))
+                if number is None:
+                    self._other.add(str(video_id))
+                else:
+                    self._recent.add(number)
+            merge = len(self._recent) >= KNOWN_IDS_MERGE_THRESHOLD
+        if merge:
+            self._merge()
+
+    def __contains__(self, video_id: object) -> bool:
+        number = self._number(str(video_id))
+        with self._lock:
+            if number is None:
+                return str(video_id) in self._other
+            return number in self._recent or self._in_sorted(number)
+
+    def __len__(self) -> int:
+        with self._lock:
+            recent = sum(1 for number in self._recent if not self._in_sorted(number))
+            return len(self._sorted) + recent + len(self._other)
+
+
+def load_known_ids(collection: Collection) -> KnownVideoIds:
+    """
+    Stream the ids of the stored videos from MongoDB.
+
+    Args:
+        collection (Collection): The processed videos collection.
+
+    Returns:
+        KnownVideoIds: The set of stored video ids.
+    """
+    cursor = collection.find({}, {"_id": 0, "video_id": 1})
+    known = KnownVideoIds(document["video_id"] for document in cursor if document.get("video_id"))
+    logger.info("Loaded %d known video ids.", len(known))
+    return known
+
+
+_known_ids: Optional[KnownVideoIds] = None
+_known_ids_lock = threading.Lock()
+
+
+def get_known_ids() -> KnownVideoIds:
+    """
+    Returns:
+        KnownVideoIds: The ids of the stored videos, loaded from MongoDB on first use and
+        kept up to date by the ingestion jobs of this process.
+    """
+    global _known_ids
+    with _known_ids_lock:
+        if _known_ids is None:
+            from mongo import get_collection
+            _known_ids = load_known_ids(get_collection())
+        return _known_ids
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from typing import Any, Dict, Iterator, List, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+LEDGER_PATH = os.getenv("LEDGER_PATH", "ledger.sqlite3")
+
+# Pipeline stages, in order; every stage has a completion timestamp column
+STAGES = ["downloaded", "audio", "transcribed", "scored", "persisted"]
+
+# Columns added after the first release, created on older ledgers when they are opened
+ADDED_COLUMNS = {"segments": "TEXT", "sentiment_source": "TEXT"}
+
+# Stages that can be rerun across the corpus, and the stages they invalidate
+REPROCESS_STAGES = {
+    "transcription": ["transcribed", "scored", "persisted"],
+    "sentiment": ["scored", "persisted"],
+}
+
+
+class Ledger:
+    """
+    Crash-safe record of every video's progress through the ingestion pipeline.
+
+    One SQLite row per video_id stores the metadata, which stages are done and their
+    intermediate outputs (audio hash, language, transcription and its segments, translation,
+    score), so a
+    restarted run only does the missing stages. The database runs in WAL mode, so readers
+    never block the pipeline's writers.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH) -> None:
+        """
+        Args:
+            path (str): The SQLite file. Its directory is created if needed.
+        """
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stage_columns = ", ".join(f"{stage}_at REAL" for stage in STAGES)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                "video_id TEXT PRIMARY KEY, metadata TEXT NOT NULL, video_path TEXT, "
+                "audio_digest TEXT, language TEXT, transcription TEXT, translation TEXT, sentiment_score REAL, "
+                f"error TEXT, updated_at REAL NOT NULL, {stage_columns})"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(videos)")}
+            for name, kind in ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE videos ADD COLUMN {name} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS videos_persisted ON videos (persisted_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns:
+            sqlite3.Connection: The connection of the calling thread (opened on first use).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _update(self, video_id: str, stage: Optional[str], **fields: Any) -> None:
+        assignments = dict(fields, updated_at=time.time(), error=None)
+        if stage is not None:
+            assignments[f"{stage}_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in assignments)
+        with self._connection() as conn:
+            conn.execute(f"UPDATE videos SET {columns} WHERE video_id = ?", (*assignments.values(), video_id))
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Args:
+            video_id (str): The TikTok video id.
+
+        Returns:
+            Optional[Dict[str, Any]]: The ledger entry, with `metadata` decoded, or None.
+        """
+        row = self._connection().execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["metadata"] = json.loads(entry["metadata"])
+        entry["segments"] = json.loads(entry["segments"]) if entry["segments"] else []
+        return entry
+
+    def record_download(self, row: Dict[str, Any], video_path: Optional[str]) -> None:
+        """
+        Register a video (or refresh its metadata) and mark it downloaded when the file exists.
+
+        Args:
+            row (Dict[str, Any]): The metadata row of the video.
+            video_path (Optional[str]): The path of the downloaded video.
+        """
+        now = time.time()
+        downloaded_at = now if video_path and os.path.exists(video_path) else None
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO videos (video_id, metadata, video_path, updated_at, downloaded_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET metadata = excluded.metadata, video_path = excluded.video_path, "
+                "updated_at = excluded.updated_at, downloaded_at = COALESCE(excluded.downloaded_at, downloaded_at)",
+                (row["video_id"], json.dumps(row, ensure_ascii=False), video_path, now, downloaded_at)
+            )
+
+    def record_transcription(
+        self,
+        video_id: str,
+        audio_digest: Optional[str],
+        language: str,
+        transcription: str,
+        segments: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Store the decoded audio hash and the Whisper output.
+        """
+        if audio_digest is not None:
+            self._update(video_id, "audio", audio_digest=audio_digest)
+        self._update(
+            video_id, "transcribed", language=language, transcription=transcription,
+            segments=json.dumps(segments or [], ensure_ascii=False)
+        )
+
+    def record_score(
+        self,
+        video_id: str,
+        translation: Optional[str],
+        sentiment_score: Any,
+        sentiment_source: Optional[str] = None
+    ) -> None:
+        """
+        Store the translation, the sentiment score and the tier that produced it.
+        """
+        self._update(
+            video_id, "scored", translation=translation, sentiment_score=sentiment_score,
+            sentiment_source=sentiment_source
+        )
+
+    def record_persisted(self, video_id: str) -> None:
+        """
+        Mark the video as saved to MongoDB.
+        """
+        self._update(video_id, "persisted")
+
+    def record_error(self, video_id: str, stage: str, error: str) -> None:
+        """
+        Keep the last error of a video; its completed stages stay valid.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE videos SET error = ?, updated_at = ? WHERE video_id = ?",
+                (f"{stage}: {error}", time.time(), video_id)
+            )
+
+    def pending(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields:
+            Dict[str, Any]: Every entry that hasn't reached MongoDB yet.
+        """
+        rows = self._connection().execute(
+            "SELECT * FROM videos WHERE persisted_at IS NULL ORDER BY updated_at"
+        ).fetchall()
+        for row in rows:
+            yield self._to_dict(row)
+
+    def reset_stage(self, stage: str) -> int:
+        """
+        Invalidate one reprocessable stage (and the stages after it) across the corpus,
+        keeping the outputs of the earlier stages.
+
+        Args:
+            stage (str): "transcription" or "sentiment".
+
+        Returns:
+            int: The number of affected videos.
+
+        Raises:
+            ValueError: If the stage can't be reprocessed.
+        """
+        if stage not in REPROCESS_STAGES:
+            raise ValueError(f"Unknown stage '{stage}'. Use one of {', '.join(REPROCESS_STAGES)}.")
+        # Rerunning Whisper only needs the video, rerunning the LLM needs the stored transcription
+        required = "downloaded" if stage == "transcription" else "transcribed"
+        columns = ", ".join(f"{name}_at = NULL" for name in REPROCESS_STAGES[stage])
+        with self._connection() as conn:
+            cursor = conn.execute(f"UPDATE videos SET {columns} WHERE {required}_at IS NOT NULL")
+            return cursor.rowcount
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: The total number of videos and how many completed every stage.
+        """
+        counts = ", ".join(f"COUNT({stage}_at)" for stage in STAGES)
+        row = self._connection().execute(f"SELECT COUNT(*), {counts} FROM videos").fetchone()
+        return dict(zip(["total"] + STAGES, list(row)))
+
+
+_ledger: Optional[Ledger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    """
+    Returns:
+        Ledger: The ledger shared by every stage in this process.
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import httpx
+from dotenv import load_dotenv
+from metrics import LLM_ERRORS, LLM_REQUESTS, LLM_TOKENS
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# The model has to support JSON mode (response_format=json_object)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "2"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Transcriptions shorter than LLM_BATCH_MAX_CHARS are grouped, up to LLM_BATCH_SIZE per request
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "4"))
+LLM_BATCH_MAX_CHARS = int(os.getenv("LLM_BATCH_MAX_CHARS", "1500"))
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.05"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant which translates texts about Raiffeisen Bank into English and "
+    "determines how they impact the company. For every text you receive, translate the same exact "
+    "text in English and rate the impact from 0 to 100. "
+    "0 means the text damages the image or trustability of the company, "
+    "100 means the text improves the image or trustability of the company. "
+    "There might be texts where there are song lyrics or no comprehensible text, "
+    "in this case you should rate the text with 50. "
+    "Answer only with a JSON object of the form "
+    '{"results": [{"id": <text id>, "translation": "<english text>", "score": <integer 0-100>}]}'
+    ", with one entry for every text."
+)
+# Texts the local scorer already rated only need their translation
+TRANSLATION_PROMPT = (
+    "You are a helpful assistant which translates texts into English. For every text you receive, "
+    "translate the same exact text in English. "
+    "Answer only with a JSON object of the form "
+    '{"results": [{"id": <text id>, "translation": "<english text>"}]}'
+    ", with one entry for every text."
+)
+
+
+class LLMError(Exception):
+    """
+    Raised when the LLM request fails for good (after retries) or returns an unusable answer.
+    """
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: allows `rate` requests per second on average and bursts of `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and take it.
+        """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LLMClient:
+    """
+    Asyncio client that gets the English translation and the 0-100 sentiment score of a
+    transcription in a single structured JSON chat completion.
+
+    In-flight requests are capped by a semaphore and paced by a token bucket, 429/5xx
+    answers and timeouts are retried with exponential backoff, and short transcriptions
+    submitted close together through `analyze` are batched into one request.
+
+    The HTTP layer is an `httpx.AsyncClient`, so tests can point `base_url` at a local stub
+    server or pass any `httpx.AsyncBaseTransport` (e.g. `httpx.MockTransport`).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        base_url: str = OPENAI_BASE_URL,
+        model: str = OPENAI_MODEL,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_second: float = LLM_RATE_PER_SECOND,
+        burst: int = LLM_RATE_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        timeout: float = LLM_TIMEOUT,
+        batch_size: int = LLM_BATCH_SIZE,
+        batch_max_chars: int = LLM_BATCH_MAX_CHARS,
+        batch_window: float = LLM_BATCH_WINDOW
+    ) -> None:
+        """
+        Args:
+            api_key (Optional[str]): The OpenAI API key. Defaults to OPENAI_API_KEY.
+            base_url (str): The API root, e.g. a local stub server in tests.
+            model (str): A chat model supporting JSON mode.
+            transport (Optional[httpx.AsyncBaseTransport]): Custom HTTP transport.
+            max_concurrency (int): Maximum number of requests in flight.
+            rate_per_second (float): Average requests per second (0 disables the rate limit).
+            burst (int): Token bucket capacity.
+            max_retries (int): Retries on 429/5xx/timeouts before giving up.
+            backoff_base (float): First backoff delay in seconds, doubled on every retry.
+            timeout (float): Per-request timeout in seconds.
+            batch_size (int): Maximum number of transcriptions per request.
+            batch_max_chars (int): Longer transcriptions are always sent alone.
+            batch_window (float): Seconds `analyze` waits for more short texts to batch.
+        """
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.batch_size = max(1, batch_size)
+        self.batch_max_chars = batch_max_chars
+        self.batch_window = batch_window
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, transport=transport)
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def aclose(self) -> None:
+        """
+        Close the underlying HTTP connections.
+        """
+        await self._http.aclose()
+
+    async def analyze(self, text: str, language: str) -> Dict[str, Any]:
+        """
+        Translate and score one transcription. Short texts are transparently batched with
+        other calls made within `batch_window` seconds.
+
+        Args:
+            text (str): The transcription.
+            language (str): The detected language of the transcription.
+
+        Returns:
+            Dict[str, Any]: {"translation": str, "sentiment_score": int}.
+        """
+        if self.batch_size == 1 or len(text) > self.batch_max_chars:
+            return (await self._request([(text, language)]))[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, language, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await future
+
+    async def translate(self, text: str, language: str) -> str:
+        """
+        Translate one transcription without rating it (not batched).
+
+        Args:
+            text (str): The transcription.
+            language (str): The detected language of the transcription.
+
+        Returns:
+            str: The English translation.
+        """
+        return (await self._request([(text, language)], TRANSLATION_PROMPT, scored=False))[0]["translation"]
+
+    async def analyze_many(self, items: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Translate and score several transcriptions, packing the short ones into batches.
+
+        Args:
+            items (Sequence[Tuple[str, str]]): (transcription, language) pairs.
+
+        Returns:
+            List[Dict[str, Any]]: One result per item, in order.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for index, (text, _) in enumerate(items):
+            if len(text) > self.batch_max_chars:
+                batches.append([index])
+                continue
+            current.append(index)
+            if len(current) == self.batch_size:
+                batches.append(current)
+                current = []
+        if current:
+            batches.append(current)
+
+        answers = await asyncio.gather(*(self._request([items[i] for i in batch]) for batch in batches))
+        results: List[Dict[str, Any]] = [{} for _ in items]
+        for batch, answer in zip(batches, answers):
+            for index, result in zip(batch, answer):
+                results[index] = result
+        return results
+
+    def _flush(self) -> None:
+        """
+        Send the pending short texts as one batch request.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._resolve(pending))
+
+    async def _resolve(self, pending: List[Tuple[str, str, asyncio.Future]]) -> None:
+        """
+        Run a batch request and hand every caller its own result (or the shared error).
+        """
+        try:
+            results = await self._request([(text, language) for text, language, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _request(
+        self,
+        items: Sequence[Tuple[str, str]],
+        prompt: str = SYSTEM_PROMPT,
+        scored: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        One chat completion for a batch of transcriptions.
+
+        Args:
+            items (Sequence[Tuple[str, str]]): (transcription, language) pairs.
+            prompt (str): The system prompt. Defaults to SYSTEM_PROMPT.
+            scored (bool): Whether the answer holds a score besides the translation.
+
+        Returns:
+            List[Dict[str, Any]]: One result per item, in order.
+        """
+        texts = [{"id": i, "language": language, "text": text} for i, (text, language) in enumerate(items)]
+        payload = {
+            "model": self.model,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": json.dumps({"texts": texts}, ensure_ascii=False)},
+            ],
+        }
+        body = await self._post("/chat/completions", payload)
+        return self._parse(body, len(items), scored)
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST with concurrency cap, rate limit and exponential backoff on retryable failures.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            retry_after: Optional[float] = None
+            try:
+                async with self._semaphore:
+                    response = await self._http.post(path, json=payload)
+                if response.status_code < 400:
+                    LLM_REQUESTS.inc(outcome="ok")
+                    body = response.json()
+                    usage = body.get("usage") or {}
+                    for kind in ("prompt_tokens", "completion_tokens"):
+                        LLM_TOKENS.inc(usage.get(kind, 0), kind=kind.split("_")[0])
+                    return body
+                LLM_ERRORS.inc(reason=str(response.status_code))
+                if response.status_code not in RETRYABLE_STATUS:
+                    LLM_REQUESTS.inc(outcome="failed")
+                    raise LLMError(f"LLM request failed with status {response.status_code}: {response.text}")
+                error = LLMError(f"LLM request failed with status {response.status_code}")
+                retry_after = _parse_retry_after(response.headers.get("retry-after"))
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                LLM_ERRORS.inc(reason="timeout" if isinstance(e, httpx.TimeoutException) else "transport")
+                error = LLMError(f"LLM request failed: {e}")
+
+            if attempt == self.max_retries:
+                LLM_REQUESTS.inc(outcome="failed")
+                raise error
+            LLM_REQUESTS.inc(outcome="retried")
+            delay = self.backoff_base * (2 ** attempt)
+            delay = max(delay, retry_after or 0) + random.uniform(0, self.backoff_base)
+            await asyncio.sleep(delay)
+        raise LLMError("LLM request failed")  # Not reached
+
+    @staticmethod
+    def _parse(body: Dict[str, Any], count: int, scored: bool = True) -> List[Dict[str, Any]]:
+        """
+        Validate the structured answer and return it in request order.
+        """
+        try:
+            content = body["choices"][0]["message"]["content"]
+            entries = json.loads(content)["results"]
+            by_id = {int(entry["id"]): entry for entry in entries}
+            results = []
+            for i in range(count):
+                entry = by_id[i]
+                result = {"translation": str(entry["translation"])}
+                if scored:
+                    result["sentiment_score"] = min(100, max(0, int(round(float(entry["score"])))))
+                results.append(result)
+            return results
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            LLM_ERRORS.inc(reason="malformed")
+            raise LLMError(f"Malformed LLM answer: {e}") from e
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: The Retry-After header in seconds, if it is a number.
+    """
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class BackgroundLLMClient:
+    """
+    Runs an `LLMClient` on a private event loop thread so synchronous code (the pipeline's
+    worker threads) can share it, together with its batching, rate limit and concurrency cap.
+    """
+
+    def __init__(self, **client_options: Any) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+        self.client: LLMClient = self._call(self._create(client_options))
+
+    async def _create(self, client_options: Dict[str, Any]) -> LLMClient:
+        return LLMClient(**client_options)  # Built inside the loop that will use it
+
+    def _call(self, coroutine: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def analyze(self, text: str, language: str) -> Dict[str, Any]:
+        """
+        Blocking version of `LLMClient.analyze`.
+        """
+        return self._call(self.client.analyze(text, language))
+
+    def translate(self, text: str, language: str) -> str:
+        """
+        Blocking version of `LLMClient.translate`.
+        """
+        return self._call(self.client.translate(text, language))
+
+    def analyze_many(self, items: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Blocking version of `LLMClient.analyze_many`.
+        """
+        return self._call(self.client.analyze_many(items))
+
+    def close(self) -> None:
+        """
+        Close the client and stop the loop thread.
+        """
+        self._call(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,132 @@
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NEUTRAL_SCORE = 50  # Rating of neutral, incomprehensible or empty text
+
+# Mentions of the bank; text that never mentions it rarely moves its image
+BRAND_KEYWORDS = ["raiffeisen", "raiff", "rbro", "smart mobile"]
+# The videos come from the bank's tag, so "the bank", "my card" or "my account" mean it too
+GENERIC_BANK_TERMS = {
+    "bank", "banks", "banking", "card", "cards", "account", "accounts", "app",
+    "banca", "banci", "bancii", "cardul", "carduri", "cont", "contul", "conturi", "aplicatia",
+}
+
+# English and Romanian opinion words (the corpus is mostly one or the other), without diacritics
+POSITIVE_WORDS = {
+    "best", "better", "great", "good", "love", "loved", "excellent", "amazing", "awesome", "recommend",
+    "recommended", "easy", "fast", "quick", "helpful", "friendly", "happy", "satisfied", "thanks", "thank",
+    "reliable", "safe", "secure", "bonus", "cashback", "free", "reward", "rewards", "win", "perfect",
+    "bun", "buna", "bine", "super", "excelent", "minunat", "recomand", "rapid", "usor", "simplu",
+    "multumit", "multumita", "multumesc", "sigur", "gratuit", "castig", "frumos", "top",
+}
+NEGATIVE_WORDS = {
+    "bad", "worse", "worst", "terrible", "awful", "horrible", "hate", "scam", "scammed", "scammers", "fraud",
+    "stolen", "steal", "cheated", "ripoff", "blocked", "block", "fee", "fees", "slow", "rude", "problem",
+    "problems", "issue", "issues", "complaint", "lost", "angry", "useless", "broken", "error", "disappointed",
+    "avoid", "refund", "charged",
+    "rau", "prost", "proasta", "groaznic", "nasol", "teapa", "tepari", "frauda", "furt", "furat", "inselat",
+    "inselata", "inseala", "blocat", "blocata", "comision", "comisioane", "problema", "probleme", "nemultumit",
+    "nemultumita", "lent", "eroare", "evitati",
+}
+NEGATIONS = {"not", "no", "dont", "don't", "doesnt", "doesn't", "isnt", "isn't", "nu", "nici", "niciodata"}
+# Sponsored posts by or for the bank are promotional by construction
+PROMO_MARKERS = ["#ad", "#sponsored", "#reclama", "#partener", "link in bio", "promo code", "cod promo", "oferta"]
+
+
+def _strip_diacritics(text: str) -> str:
+    # Whisper writes Romanian with diacritics ("bancă", "înșelat"), the lexicons don't
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def local_score(text: str) -> Tuple[int, float]:
+    """
+    Rate a text's impact on the bank with a lexicon and brand-keyword features, on CPU.
+
+    Text that mentions the bank (by name or as "the bank", "my card"...) is rated by the
+    balance of opinion words (a negation flips the next two words) and promotional markers.
+    Text without any opinion word or without a mention is rated neutral with a low
+    confidence: the lexicon can't tell chatter from wording it doesn't know, so the LLM decides.
+
+    Args:
+        text (str): The transcription or its translation.
+
+    Returns:
+        Tuple[int, float]: The rating (0-100, 50 is neutral) and a confidence between 0 and 1.
+    """
+    lowered = _strip_diacritics(text).lower()
+    tokens = re.findall(r"[\w']+", lowered)
+    if not tokens:
+        return NEUTRAL_SCORE, 1.0
+
+    positive = negative = 0
+    for index, token in enumerate(tokens):
+        polarity = 1 if token in POSITIVE_WORDS else -1 if token in NEGATIVE_WORDS else 0
+        if polarity and NEGATIONS.intersection(tokens[max(0, index - 2):index]):
+            polarity = -polarity
+        positive += polarity > 0
+        negative += polarity < 0
+    evidence = positive + negative
+
+    mentions = sum(lowered.count(keyword) for keyword in BRAND_KEYWORDS)
+    mentions += sum(token in GENERIC_BANK_TERMS for token in tokens)
+    if mentions == 0:
+        return NEUTRAL_SCORE, 0.3
+
+    positive += sum(marker in lowered for marker in PROMO_MARKERS)
+    evidence = positive + negative
+    if evidence == 0:
+        return NEUTRAL_SCORE, 0.3
+
+    balance = (positive - negative) / evidence
+    score = int(round(NEUTRAL_SCORE + NEUTRAL_SCORE * balance * min(1.0, evidence / 4)))
+    confidence = abs(balance) * min(1.0, evidence / 3)
+    return max(0, min(100, score)), round(confidence, 3)
+
+
+def _band(score: float) -> str:
+    return "negative" if score < 40 else "positive" if score > 60 else "neutral"
+
+
+def evaluate(
+    samples: Iterable[Dict[str, Any]],
+    thresholds: Iterable[float],
+    tolerance: float = 10
+) -> Dict[str, Any]:
+    """
+    Replay the local scorer on texts the LLM already rated.
+
+    Args:
+        samples (Iterable[Dict[str, Any]]): {"text", "sentiment_score"} dicts, the score
+            coming from the LLM.
+        thresholds (Iterable[float]): Escalation thresholds to report on.
+        tolerance (float): Largest rating difference counted as agreement. Defaults to 10.
+
+    Returns:
+        Dict[str, Any]: The sample count and, per threshold, the escalation rate and, on the
+        texts the local scorer would have settled, the agreement rate (within `tolerance`),
+        the band agreement (negative / neutral / positive) and the mean absolute error.
+    """
+    rated: List[Tuple[int, float, float]] = []
+    for sample in samples:
+        score, confidence = local_score(sample["text"] or "")
+        rated.append((score, confidence, float(sample["sentiment_score"])))
+
+    report: Dict[str, Any] = {"samples": len(rated), "tolerance": tolerance, "thresholds": []}
+    for threshold in thresholds:
+        settled = [(score, llm) for score, confidence, llm in rated if confidence >= threshold]
+        row: Dict[str, Optional[float]] = {
+            "threshold": threshold,
+            "escalation_rate": round(1 - len(settled) / len(rated), 4) if rated else None,
+            "settled": len(settled),
+            "agreement": None,
+            "band_agreement": None,
+            "mean_abs_error": None,
+        }
+        if settled:
+            row["agreement"] = round(sum(abs(score - llm) <= tolerance for score, llm in settled) / len(settled), 4)
+            row["band_agreement"] = round(sum(_band(score) == _band(llm) for score, llm in settled) / len(settled), 4)
+            row["mean_abs_error"] = round(sum(abs(score - llm) for score, llm in settled) / len(settled), 2)
+        report["thresholds"].append(row)
+    return report
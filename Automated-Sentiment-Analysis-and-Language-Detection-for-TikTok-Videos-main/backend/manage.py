@@ -0,0 +1,203 @@
+import os
+import json
+import logging
+import argparse
+from typing import Any, Dict, Iterable, List, Optional
+
+def migrate(args: argparse.Namespace) -> None:
+    """
+    Convert existing documents to native field types and create the indexes.
+    """
+    from mongo import get_collection
+    from persistence import migrate_field_types
+
+    result = migrate_field_types(get_collection())
+    print(f"Removed {result['duplicates_removed']} duplicated documents.")
+    print(f"Converted {result['documents_converted']} documents to native types.")
+
+def rebuild_rollups(args: argparse.Namespace) -> None:
+    """
+    Recompute the sentiment rollups from the stored videos.
+    """
+    from mongo import get_collection
+    from rollups import ROLLUPS_COLLECTION, rebuild_rollups as rebuild
+
+    buckets = rebuild(get_collection(), get_collection(ROLLUPS_COLLECTION))
+    print(f"Rebuilt {buckets} sentiment rollup buckets.")
+
+def _run_pipeline(rows: Iterable[Dict[str, Any]], refresh: Iterable[str] = ()) -> None:
+    """
+    Push ledger entries through the ingestion pipeline, saving every video to MongoDB.
+    """
+    from app import save_to_mongodb
+    from ledger import get_ledger
+    from pipeline import IngestionPipeline
+
+    pipeline = IngestionPipeline(
+        persist=lambda documents: save_to_mongodb(documents, raise_errors=True),
+        ledger=get_ledger(),
+        refresh=refresh
+    )
+    processed = sum(1 for _ in pipeline.run(rows))
+    print(f"Processed {processed} videos, {len(pipeline.errors)} errors.")
+
+def resume(args: argparse.Namespace) -> None:
+    """
+    Finish every video the ledger shows as not yet saved to MongoDB.
+    """
+    from ledger import get_ledger
+
+    ledger = get_ledger()
+    print(f"Ledger: {ledger.summary()}")
+    _run_pipeline(entry["metadata"] for entry in ledger.pending())
+
+def reprocess(args: argparse.Namespace) -> None:
+    """
+    Rerun one stage (and the stages after it) across the whole corpus.
+    """
+    from ledger import get_ledger
+
+    ledger = get_ledger()
+    print(f"Reprocessing the {args.stage} stage of {ledger.reset_stage(args.stage)} videos.")
+    _run_pipeline((entry["metadata"] for entry in ledger.pending()), refresh=[args.stage])
+
+def evaluate_sentiment(args: argparse.Namespace) -> None:
+    """
+    Report how the local sentiment scorer agrees with the LLM ratings stored in MongoDB,
+    and how many videos each escalation threshold would still send to the LLM.
+    """
+    from mongo import get_collection
+    from local_scorer import evaluate
+
+    cursor = get_collection().find(
+        {"sentiment_score": {"$ne": None}, "sentiment_source": {"$ne": "local"}},
+        {"_id": 0, "transcription": 1, "sentence": 1, "sentiment_score": 1}
+    )
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    # Videos stored before transcriptions were kept are replayed on their English translation
+    samples = (
+        {"text": doc.get("transcription") or doc.get("sentence"), "sentiment_score": doc["sentiment_score"]}
+        for doc in cursor
+    )
+    thresholds = [float(value) for value in args.thresholds.split(",") if value.strip()]
+    print(json.dumps(evaluate(samples, thresholds, args.tolerance), indent=2))
+
+def export(args: argparse.Namespace) -> None:
+    """
+    Stream the stored videos as NDJSON or CSV to a file or to stdout.
+    """
+    import sys
+    from mongo import get_collection
+    from export import parse_fields, stream_export
+    from video_queries import build_video_filter
+
+    filters = {
+        "language": args.language,
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+        "sentiment": args.sentiment,
+        "min_score": args.min_score,
+        "max_score": args.max_score,
+    }
+    query = build_video_filter({name: value for name, value in filters.items() if value})
+    fields = parse_fields(args.fields, args.format)
+    compress = args.gzip or bool(args.output and args.output.endswith(".gz"))
+    chunks = stream_export(get_collection(), query, args.format, fields, compress)
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"Wrote {written} bytes to {args.output}.")
+
+def crawl(args: argparse.Namespace) -> None:
+    """
+    Crawl the tags incrementally, each at its own interval, until interrupted (or once with --once).
+    """
+    import time
+    from crawler import CRAWL_TAGS, CrawlScheduler, parse_tags
+    from ingestion import process_job
+    from jobs import JobQueue
+
+    job_queue = JobQueue()
+    options = {"max_videos": args.max_videos, "stop_after_known": args.stop_after_known}
+    scheduler = CrawlScheduler(
+        lambda **params: job_queue.submit(process_job, **params),
+        tags=parse_tags(args.tags or CRAWL_TAGS),
+        **{name: value for name, value in options.items() if value is not None}
+    )
+    if not args.once:
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            scheduler.stop()
+        return
+
+    for job in scheduler.run_pending():
+        while not job.finished:
+            job.wait_events(len(job.events))
+        print(f"{job.params['search_query']}: {job.status} {json.dumps(job.error or job.result)}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Maintenance commands for the TikTok analysis backend.
+    """
+    parser = argparse.ArgumentParser(description="Maintenance commands for the TikTok analysis backend.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert stored fields to native types and create indexes.")
+    migrate_parser.set_defaults(func=migrate)
+
+    rollups_parser = subparsers.add_parser("rebuild-rollups", help="Recompute the sentiment rollups from scratch.")
+    rollups_parser.set_defaults(func=rebuild_rollups)
+
+    resume_parser = subparsers.add_parser("resume", help="Finish the videos left unsaved by an interrupted run.")
+    resume_parser.set_defaults(func=resume)
+
+    reprocess_parser = subparsers.add_parser("reprocess", help="Rerun one pipeline stage across the corpus.")
+    reprocess_parser.add_argument("--stage", required=True, choices=["transcription", "sentiment"])
+    reprocess_parser.set_defaults(func=reprocess)
+
+    evaluate_parser = subparsers.add_parser(
+        "evaluate-sentiment", help="Compare the local sentiment scorer with the stored LLM ratings."
+    )
+    evaluate_parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9", help="Comma separated escalation thresholds.")
+    evaluate_parser.add_argument("--tolerance", type=float, default=10, help="Largest rating difference counted as agreement.")
+    evaluate_parser.add_argument("--limit", type=int, default=0, help="Evaluate at most this many videos (0: all).")
+    evaluate_parser.set_defaults(func=evaluate_sentiment)
+
+    export_parser = subparsers.add_parser("export", help="Stream the stored videos as NDJSON or CSV.")
+    export_parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"])
+    export_parser.add_argument("--output", help="Output file (default: stdout); a .gz name implies --gzip.")
+    export_parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+    export_parser.add_argument("--fields", help="Comma separated fields (default: every field of the format).")
+    export_parser.add_argument("--language")
+    export_parser.add_argument("--date-from", help="ISO 8601 date.")
+    export_parser.add_argument("--date-to", help="ISO 8601 date.")
+    export_parser.add_argument("--sentiment", choices=["negative", "neutral", "positive"])
+    export_parser.add_argument("--min-score")
+    export_parser.add_argument("--max-score")
+    export_parser.set_defaults(func=export)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Crawl the tags incrementally, each at its own interval.")
+    crawl_parser.add_argument("--tags", help="Comma separated 'query[:interval seconds]' entries (default: CRAWL_TAGS).")
+    crawl_parser.add_argument("--max-videos", type=int, help="New videos ingested per crawl at most.")
+    crawl_parser.add_argument("--stop-after-known", type=int, help="Stop scrolling after this many known videos in a row.")
+    crawl_parser.add_argument("--once", action="store_true", help="Crawl every tag once and exit.")
+    crawl_parser.set_defaults(func=crawl)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
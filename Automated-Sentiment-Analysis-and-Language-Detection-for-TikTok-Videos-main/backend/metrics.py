@@ -0,0 +1,268 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+# Videos whose trace spans are kept for /traces/<video_id>
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "1000"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    A named metric with a fixed set of labels, rendered in the Prometheus text format.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """
+        Args:
+            amount (float): The increment. Defaults to 1.
+            **labels: The label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    A distribution of observed values (durations, usually) in cumulative buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # Bucket counts, then +Inf count and sum
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Args:
+            value (float): The observed value.
+            **labels: The label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """
+        Observe the duration of the `with` block.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                total = cumulative + series[len(self.buckets)]
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {total}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {total}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+STAGE_SECONDS = Histogram(
+    "tiktok_stage_seconds",
+    "Duration of the ingestion stages (download, decode, whisper, llm, local_sentiment, mongo_write).",
+    ["stage"]
+)
+STAGE_ERRORS = Counter("tiktok_stage_errors_total", "Failed ingestion stage runs.", ["stage"])
+HTTP_SECONDS = Histogram("tiktok_http_request_seconds", "Duration of the API requests.", ["method", "route", "status"])
+LLM_TOKENS = Counter("tiktok_llm_tokens_total", "Tokens used by the LLM calls.", ["kind"])
+LLM_REQUESTS = Counter("tiktok_llm_requests_total", "LLM HTTP requests by outcome.", ["outcome"])
+LLM_ERRORS = Counter("tiktok_llm_errors_total", "Failed LLM request attempts by reason.", ["reason"])
+
+
+def render() -> str:
+    """
+    Returns:
+        str: Every registered metric in the Prometheus text exposition format.
+    """
+    return "".join(metric.render() for metric in REGISTRY)
+
+
+class Tracer:
+    """
+    Keeps the stage spans of the most recent videos, keyed by video_id.
+    """
+
+    def __init__(self, history: int = TRACE_HISTORY) -> None:
+        """
+        Args:
+            history (int): The number of videos whose spans are kept.
+        """
+        self.history = history
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, video_id: str, span: Dict[str, Any]) -> None:
+        with self._lock:
+            spans = self._traces.pop(video_id, [])
+            spans.append(span)
+            self._traces[video_id] = spans  # Most recently active last
+            while len(self._traces) > self.history:
+                self._traces.popitem(last=False)
+
+    def get(self, video_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns:
+            Optional[List[Dict[str, Any]]]: The spans of the video in start order, or None.
+        """
+        with self._lock:
+            spans = self._traces.get(video_id)
+            return sorted(spans, key=lambda span: span["start"]) if spans is not None else None
+
+
+tracer = Tracer()
+
+
+def record(
+    stage: str,
+    seconds: Optional[float],
+    video_id: Optional[str] = None,
+    error: Optional[str] = None,
+    **attributes: Any
+) -> None:
+    """
+    Record a stage run measured elsewhere (e.g. in a worker process).
+
+    Args:
+        stage (str): The stage name.
+        seconds (Optional[float]): Its duration; None when unknown (only the failure is counted).
+        video_id (Optional[str]): The video it worked on; adds a trace span.
+        error (Optional[str]): The error, if the stage failed.
+        **attributes: Extra JSON-serializable span attributes.
+    """
+    if seconds is not None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if error is not None:
+        STAGE_ERRORS.inc(stage=stage)
+    if video_id is not None:
+        span = {
+            "stage": stage,
+            "start": time.time() - (seconds or 0),
+            "seconds": round(seconds, 6) if seconds is not None else None,
+            **attributes,
+        }
+        if error is not None:
+            span["error"] = error
+        tracer.add(video_id, span)
+        logger.debug("span video_id=%s stage=%s seconds=%s error=%s", video_id, stage, span["seconds"], error)
+
+
+@contextmanager
+def stage(name: str, video_id: Optional[str] = None, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a stage: observes its histogram, counts its failure and adds a trace span.
+
+    Args:
+        name (str): The stage name.
+        video_id (Optional[str]): The video it works on.
+        **attributes: Extra span attributes; the block can add more to the yielded dict.
+
+    Yields:
+        Dict[str, Any]: The span attributes.
+    """
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except Exception as e:
+        record(name, time.perf_counter() - started, video_id, error=str(e), **attributes)
+        raise
+    record(name, time.perf_counter() - started, video_id, **attributes)
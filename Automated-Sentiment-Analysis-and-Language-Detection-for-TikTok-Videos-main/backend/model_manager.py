@@ -0,0 +1,428 @@
+import os
+import gc
+import time
+import logging
+import threading
+import whisper
+import torch
+from dotenv import load_dotenv
+from conversion import SAMPLE_RATE, load_audio, temporary_wav
+from vad import VAD_ENABLED, detect_speech, first_window, voiced_audio, source_time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Comma separated list of Whisper sizes kept resident in every worker (e.g. "base,small")
+WHISPER_MODEL_SIZES = [
+    size.strip() for size in os.getenv("WHISPER_MODEL_SIZES", "base").split(",") if size.strip()
+]
+WHISPER_DEFAULT_MODEL = os.getenv("WHISPER_DEFAULT_MODEL", WHISPER_MODEL_SIZES[0] if WHISPER_MODEL_SIZES else "base")
+# Seconds without a transcription before the models are unloaded (0 disables eviction)
+WHISPER_IDLE_TIMEOUT = float(os.getenv("WHISPER_IDLE_TIMEOUT", "300"))
+
+# Inference backend: "auto" picks CUDA when available, "cpu" forces it
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")
+# "int8" quantizes the linear layers dynamically (CPU only), "none" keeps fp32
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "none").lower()
+# Torch threads per worker process; 0 splits the CPUs evenly between the workers
+WHISPER_INTRA_OP_THREADS = int(os.getenv("WHISPER_INTRA_OP_THREADS", "0"))
+WHISPER_INTER_OP_THREADS = int(os.getenv("WHISPER_INTER_OP_THREADS", "1"))
+
+# Model size policy: "fixed" always uses WHISPER_DEFAULT_MODEL, "auto" picks one per clip
+WHISPER_SIZE_POLICY = os.getenv("WHISPER_SIZE_POLICY", "fixed").lower()
+# Smallest to largest; the first one also runs the language detection of the "auto" policy
+WHISPER_POLICY_SIZES = [
+    size.strip() for size in os.getenv("WHISPER_POLICY_SIZES", "tiny,base,small").split(",") if size.strip()
+]
+# Language probability above which the smallest model is enough...
+WHISPER_POLICY_HIGH_CONFIDENCE = float(os.getenv("WHISPER_POLICY_HIGH_CONFIDENCE", "0.9"))
+# ...and below which the largest one is used, for clips up to WHISPER_POLICY_LARGE_MAX_SECONDS
+WHISPER_POLICY_LOW_CONFIDENCE = float(os.getenv("WHISPER_POLICY_LOW_CONFIDENCE", "0.6"))
+WHISPER_POLICY_LARGE_MAX_SECONDS = float(os.getenv("WHISPER_POLICY_LARGE_MAX_SECONDS", "120"))
+
+
+def configure_threads(intra_op: int = WHISPER_INTRA_OP_THREADS, inter_op: int = WHISPER_INTER_OP_THREADS, workers: int = 1) -> int:
+    """
+    Pin the torch thread pools of the current process, so several workers don't
+    oversubscribe the cores.
+
+    Args:
+        intra_op (int): Threads used inside one operator. 0 gives every worker an even
+            share of the CPUs.
+        inter_op (int): Threads running independent operators. 0 keeps the torch default.
+        workers (int): The number of worker processes sharing the machine.
+
+    Returns:
+        int: The intra-op thread count in effect.
+    """
+    if intra_op <= 0:
+        intra_op = max(1, (os.cpu_count() or 1) // max(1, workers))
+    torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            pass  # Can only be set before the first parallel operator ran in this process
+    return intra_op
+
+
+def quantize_int8(model: Any) -> Any:
+    """
+    Dynamically quantize the linear layers of a Whisper model to int8 for CPU inference.
+
+    Whisper uses its own `nn.Linear` subclass, which torch's dynamic quantization doesn't
+    recognize, so those layers are swapped for plain `nn.Linear` copies first.
+
+    Args:
+        model (Any): A Whisper model on the CPU.
+
+    Returns:
+        Any: The quantized model.
+    """
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                linear.load_state_dict(child.state_dict())
+                setattr(module, name, linear)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def choose_model_size(duration: float, confidence: Optional[float], sizes: List[str] = WHISPER_POLICY_SIZES) -> str:
+    """
+    Model size policy: clips whose language is detected with high confidence are easy
+    enough for the smallest model, uncertain ones get the largest model unless they are
+    long, and everything else uses the middle one.
+
+    Args:
+        duration (float): The clip duration in seconds.
+        confidence (Optional[float]): The probability of the detected language.
+        sizes (List[str]): The candidate sizes, smallest first.
+
+    Returns:
+        str: The Whisper model size.
+    """
+    middle = sizes[len(sizes) // 2]
+    if confidence is None:
+        return middle
+    if confidence >= WHISPER_POLICY_HIGH_CONFIDENCE:
+        return sizes[0]
+    if confidence < WHISPER_POLICY_LOW_CONFIDENCE and duration <= WHISPER_POLICY_LARGE_MAX_SECONDS:
+        return sizes[-1]
+    return middle
+
+
+class WhisperModelManager:
+    """
+    Keeps Whisper models resident in the current process so the weights are loaded
+    once per worker instead of once per video.
+
+    Models are loaded lazily (or eagerly through `warm_up`) and reused by every
+    transcription. When the process stays idle for `idle_timeout` seconds all the
+    models are unloaded to free memory; the next transcription loads them again.
+    """
+
+    def __init__(
+        self,
+        model_sizes: Iterable[str] = tuple(WHISPER_MODEL_SIZES),
+        default_size: str = WHISPER_DEFAULT_MODEL,
+        device: Optional[str] = None,
+        idle_timeout: float = WHISPER_IDLE_TIMEOUT,
+        quantize: str = WHISPER_QUANTIZE,
+        size_policy: str = WHISPER_SIZE_POLICY
+    ) -> None:
+        """
+        Args:
+            model_sizes (Iterable[str]): The Whisper sizes loaded by `warm_up`.
+            default_size (str): The size used when a caller doesn't ask for one.
+            device (Optional[str]): "cuda" or "cpu". Defaults to WHISPER_DEVICE ("auto": CUDA
+                when available).
+            idle_timeout (float): Seconds of inactivity before unloading. 0 disables eviction.
+            quantize (str): "int8" for dynamic int8 linear layers on CPU, "none" for fp32.
+            size_policy (str): "fixed" uses `default_size`, "auto" applies `choose_model_size`
+                to every clip transcribed without an explicit size.
+        """
+        self.default_size = default_size
+        self.device = device or (WHISPER_DEVICE if WHISPER_DEVICE != "auto" else "cuda" if torch.cuda.is_available() else "cpu")
+        self.idle_timeout = idle_timeout
+        self.quantize = quantize if self.device == "cpu" else "none"
+        self.size_policy = size_policy
+        self.model_sizes = list(model_sizes) or [default_size]
+        if size_policy == "auto":
+            self.model_sizes = list(dict.fromkeys(self.model_sizes + WHISPER_POLICY_SIZES))
+
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.RLock()  # Guards the model dict and serializes inference
+        self._active = 0
+        self._last_used = time.monotonic()
+        self._idle_timer: Optional[threading.Timer] = None
+
+    def get_model(self, size: Optional[str] = None) -> Any:
+        """
+        Return the resident model for `size`, loading it on first use.
+
+        Args:
+            size (Optional[str]): The Whisper model size. Defaults to `default_size`.
+
+        Returns:
+            Any: The loaded Whisper model.
+        """
+        size = size or self.default_size
+        with self._lock:
+            model = self._models.get(size)
+            if model is None:
+                model = whisper.load_model(size, device=self.device, in_memory=True)
+                if self.quantize == "int8":
+                    model = quantize_int8(model)
+                self._models[size] = model
+            return model
+
+    def warm_up(self) -> None:
+        """
+        Load every configured model size. Meant to run once when a worker starts.
+        """
+        for size in self.model_sizes:
+            self.get_model(size)
+        self._touch()
+
+    def loaded_sizes(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The model sizes currently resident in memory.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def settings_key(self) -> str:
+        """
+        Returns:
+            str: The settings a transcription depends on (the model size, or the size policy
+            and its thresholds, and the quantization), e.g. "base/none".
+        """
+        if self.size_policy == "auto":
+            size = "auto({}:{}:{}:{})".format(
+                ",".join(WHISPER_POLICY_SIZES), WHISPER_POLICY_HIGH_CONFIDENCE,
+                WHISPER_POLICY_LOW_CONFIDENCE, WHISPER_POLICY_LARGE_MAX_SECONDS
+            )
+        else:
+            size = self.default_size
+        return f"{size}/{self.quantize}"
+
+    def unload(self, size: Optional[str] = None) -> None:
+        """
+        Drop one model (or all of them when `size` is None) and release its memory.
+
+        Args:
+            size (Optional[str]): The model size to unload. Defaults to all sizes.
+        """
+        with self._lock:
+            if size is None:
+                self._models.clear()
+            else:
+                self._models.pop(size, None)
+        gc.collect()
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def transcribe(self, audio: Any, size: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        """
+        Run Whisper on a file path or audio buffer using the resident model.
+
+        Args:
+            audio (Any): A path to an audio file or a float32 audio array.
+            size (Optional[str]): The Whisper model size. Defaults to `default_size`.
+            **options: Extra options forwarded to `model.transcribe`.
+
+        Returns:
+            Dict[str, Any]: The raw Whisper result.
+        """
+        with self._lock:
+            self._active += 1
+            try:
+                model = self.get_model(size)
+                options.setdefault("task", "transcribe")
+                return model.transcribe(audio, **options)
+            finally:
+                self._active -= 1
+                self._touch()
+
+    def detect_language(self, audio: Any, size: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Identify the spoken language from (at most) the first 30 seconds of an audio buffer.
+
+        Args:
+            audio (Any): A float32 audio array.
+            size (Optional[str]): The Whisper model size. Defaults to `default_size`.
+
+        Returns:
+            Tuple[str, float]: The language code and its probability.
+        """
+        with self._lock:
+            self._active += 1
+            try:
+                model = self.get_model(size)
+                window = whisper.pad_or_trim(torch.as_tensor(audio, dtype=torch.float32))
+                mel = whisper.log_mel_spectrogram(window, n_mels=model.dims.n_mels).to(model.device)
+                _, probs = model.detect_language(mel)
+                language = max(probs, key=probs.get)
+                return language, float(probs[language])
+            finally:
+                self._active -= 1
+                self._touch()
+
+    def transcribe_speech(self, audio: Any, size: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        """
+        Transcribe only the speech of an audio buffer.
+
+        A cheap voice activity pass runs first: clips without speech (music, silence) never
+        reach Whisper, the others have their silent and music-only stretches cut out. The
+        language is detected once on the first voiced 30 second window and passed to the
+        transcription, so Whisper doesn't detect it again. Segment timestamps are mapped back
+        onto the original audio.
+
+        Args:
+            audio (Any): A float32 audio array.
+            size (Optional[str]): The Whisper model size. Defaults to `default_size`.
+            **options: Extra options forwarded to `model.transcribe`.
+
+        Returns:
+            Dict[str, Any]: The Whisper result, with a `speech` flag. A clip without speech
+            yields {"language": None, "text": "", "speech": False}.
+        """
+        regions = detect_speech(audio) if VAD_ENABLED else []
+        if VAD_ENABLED and not regions:
+            return {"language": None, "text": "", "segments": [], "speech": False, "model_size": None}
+        if "language" not in options or (size is None and self.size_policy == "auto"):
+            options["language"], size = self.pick_model(audio, regions, size, options.get("language"))
+        if not VAD_ENABLED:
+            return dict(self.transcribe(audio, size=size, **options), speech=True, model_size=size or self.default_size)
+        result = self.transcribe(voiced_audio(audio, regions), size=size, **options)
+        for segment in result.get("segments", []):
+            segment["start"] = source_time(segment["start"], regions)
+            segment["end"] = source_time(segment["end"], regions)
+        return dict(result, speech=True, model_size=size or self.default_size)
+
+    def pick_model(
+        self,
+        audio: Any,
+        regions: List[Tuple[float, float]],
+        size: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Detect the language on the first voiced window and choose the model size.
+
+        With the "auto" policy (and no explicit `size`) the language is detected by the
+        smallest policy model and its confidence drives `choose_model_size`.
+
+        Args:
+            audio (Any): A float32 audio array.
+            regions (List[Tuple[float, float]]): The voiced regions (empty: from the start).
+            size (Optional[str]): An explicit model size, which disables the policy.
+            language (Optional[str]): A known language, kept as is.
+
+        Returns:
+            Tuple[str, str]: The language code and the model size.
+        """
+        auto = size is None and self.size_policy == "auto"
+        probe = WHISPER_POLICY_SIZES[0] if auto else size
+        detected, confidence = self.detect_language(first_window(audio, regions), size=probe)
+        if auto:
+            size = choose_model_size(len(audio) / SAMPLE_RATE, confidence)
+        return language or detected, size or self.default_size
+
+    def transcribe_many(
+        self,
+        paths: Iterable[str],
+        size: Optional[str] = None,
+        use_temp_files: bool = False
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Transcribe a batch of video files with the same resident model.
+
+        The audio is decoded straight into memory and handed to Whisper as a buffer.
+        With `use_temp_files` each video goes through its own temporary WAV instead.
+        Only the voiced audio is transcribed (see `transcribe_speech`).
+
+        Args:
+            paths (Iterable[str]): Paths to the video files.
+            size (Optional[str]): The Whisper model size. Defaults to `default_size`.
+            use_temp_files (bool): Decode through per-job temp WAV files. Defaults to False.
+
+        Returns:
+            List[Tuple[Optional[str], Optional[str]]]: One (language, transcription) pair per
+            path, in the same order. Failed files yield (None, None), files without speech
+            (None, "").
+        """
+        results = []
+        for video_path in paths:
+            try:
+                if use_temp_files:
+                    with temporary_wav(video_path) as wav_file:
+                        aux = self.transcribe_speech(whisper.load_audio(wav_file), size=size)
+                else:
+                    aux = self.transcribe_speech(load_audio(video_path), size=size)
+                results.append((aux["language"], aux["text"]))
+            except Exception as e:
+                logger.error("Error transcribing %s: %s", video_path, e)
+                results.append((None, None))
+        return results
+
+    def _touch(self) -> None:
+        """
+        Record activity and re-arm the idle eviction timer.
+        """
+        self._last_used = time.monotonic()
+        if self.idle_timeout <= 0:
+            return
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(self.idle_timeout, self._evict_if_idle)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _evict_if_idle(self) -> None:
+        """
+        Unload every model if nothing used them during the last `idle_timeout` seconds.
+        """
+        with self._lock:
+            idle_for = time.monotonic() - self._last_used
+            if self._active or not self._models or idle_for < self.idle_timeout:
+                return
+            self._models.clear()
+        gc.collect()
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+
+_manager: Optional[WhisperModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager() -> WhisperModelManager:
+    """
+    Return the per-process model manager, creating it on first use.
+
+    Returns:
+        WhisperModelManager: The manager shared by every transcription in this process.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = WhisperModelManager()
+        return _manager
+
+
+def warm_up_worker(workers: int = 1) -> None:
+    """
+    Worker start hook: pin the torch threads and load the configured Whisper models
+    before the first job arrives. Can be passed as the `initializer` of a process pool.
+
+    Args:
+        workers (int): The number of worker processes sharing the CPUs. Defaults to 1.
+    """
+    configure_threads(workers=workers)
+    get_model_manager().warm_up()
@@ -0,0 +1,49 @@
+import os
+import threading
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+from dotenv import load_dotenv
+from typing import Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+DATABASE_NAME = "tiktok_database"
+TIKTOKS_COLLECTION = "tiktoks"
+
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+def get_database() -> Database:
+    """
+    Returns the application database, connecting on first use.
+
+    A "mongomock://" connection string selects an in-process mongomock client instead of
+    a server (for benchmarks and offline runs; needs the optional mongomock package).
+
+    Raises:
+        ValueError: If MONGODB_CONNECTION_STRING is not set in the .env file.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            connection_string = os.getenv("MONGODB_CONNECTION_STRING")
+            if not connection_string:
+                raise ValueError("MONGODB_CONNECTION_STRING is not set in the .env file.")
+            if connection_string.startswith("mongomock://"):
+                import mongomock
+                _client = mongomock.MongoClient()
+            else:
+                _client = MongoClient(connection_string)
+    return _client[DATABASE_NAME]
+
+def get_collection(name: str = TIKTOKS_COLLECTION) -> Collection:
+    """
+    Args:
+        name (str): The collection name. Defaults to the processed videos collection.
+
+    Returns:
+        Collection: The requested collection.
+    """
+    return get_database()[name]
@@ -0,0 +1,240 @@
+import logging
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, TEXT, UpdateOne, DeleteOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, OperationFailure
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+BULK_BATCH_SIZE = 500
+REVISION_FIELD = "revision"  # Bumped by every upsert, so concurrent rewrites of a video are detected
+DUPLICATE_KEY_ERROR = 11000
+
+logger = logging.getLogger(__name__)
+
+# Native types of the stored fields; pyktok's CSV gives us everything as strings
+INT_FIELDS = [
+    'video_duration',
+    'video_sharecount',
+    'video_commentcount',
+    'video_playcount',
+    'author_followercount',
+    'author_followingcount',
+    'author_heartcount',
+    'author_videocount',
+]
+FLOAT_FIELDS = ['sentiment_score']
+BOOL_FIELDS = ['video_is_ad', 'author_verified']
+DATETIME_FIELDS = ['video_timestamp']
+
+INDEXES = [
+    ([("video_id", ASCENDING)], {"name": "video_id_unique", "unique": True}),
+    # Also serves the keyset pagination of /videos, which sorts on (video_timestamp, video_id)
+    ([("video_timestamp", DESCENDING), ("video_id", DESCENDING)], {"name": "video_timestamp"}),
+    ([("language", ASCENDING)], {"name": "language"}),
+    ([("sentiment_score", ASCENDING)], {"name": "sentiment_score"}),
+    # Full-text search of /search, maintained by MongoDB on every upsert. The translation is
+    # weighted above the original transcription. `language` holds Whisper's ISO codes, which
+    # MongoDB would read as the stemming language (and reject the unsupported ones), so the
+    # override points to a field we never set and every document is stemmed as English.
+    ([("sentence", TEXT), ("transcription", TEXT)], {
+        "name": "text_search",
+        "weights": {"sentence": 2, "transcription": 1},
+        "default_language": "english",
+        "language_override": "text_search_language",
+    }),
+]
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except ValueError:
+            return value
+    return value
+
+
+def _to_float(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return value
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str):
+        if value.isdigit():
+            return _to_datetime(int(value))
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return value
+
+
+def coerce_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert counts, scores, flags and timestamps to native types so they can be sorted
+    and aggregated server-side. Values that can't be parsed are left untouched.
+
+    Args:
+        document (Dict[str, Any]): A processed video document.
+
+    Returns:
+        Dict[str, Any]: The same document with typed fields.
+    """
+    for field in INT_FIELDS:
+        if field in document:
+            document[field] = _to_int(document[field])
+    for field in FLOAT_FIELDS:
+        if field in document:
+            document[field] = _to_float(document[field])
+    for field in BOOL_FIELDS:
+        if field in document:
+            document[field] = _to_bool(document[field])
+    for field in DATETIME_FIELDS:
+        if field in document:
+            document[field] = _to_datetime(document[field])
+    return document
+
+
+def ensure_indexes(collection: Collection) -> None:
+    """
+    Create the unique `video_id` index and the secondary indexes used for sorting and filtering.
+    Creating an index that already exists is a no-op.
+
+    Args:
+        collection (Collection): The processed videos collection.
+    """
+    for keys, options in INDEXES:
+        try:
+            collection.create_index(keys, **options)
+        except OperationFailure as e:
+            # Usually duplicated video_ids left by the old code; `manage.py migrate` removes them
+            logger.warning("Could not create index %s: %s", options['name'], e)
+
+
+def _batches(operations: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    batch: List[Any] = []
+    for operation in operations:
+        batch.append(operation)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _expected_version(stored: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    revision = stored.get(REVISION_FIELD) if stored else None
+    # Videos never written (or written before revisions existed) have no revision
+    return {REVISION_FIELD: revision if revision is not None else {"$exists": False}}
+
+
+def bulk_upsert(
+    collection: Collection,
+    documents: Iterable[Dict[str, Any]],
+    batch_size: int = BULK_BATCH_SIZE,
+    expected: Optional[Mapping[str, Optional[Mapping[str, Any]]]] = None
+) -> Dict[str, Any]:
+    """
+    Upsert documents by `video_id` through unordered bulk writes. Every write bumps the
+    document's `revision`.
+
+    With `expected`, a document is only written if the stored version is still the one
+    given there (None: no stored version); otherwise it would insert a second document with
+    the same `video_id`, which the unique index rejects, and the video is reported as a
+    conflict without being written.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        documents (Iterable[Dict[str, Any]]): The processed video documents.
+        batch_size (int): Operations per `bulk_write` round trip.
+        expected (Optional[Mapping]): The stored version of every video (at least its
+            `revision`), by video_id. Defaults to None (unconditional upserts).
+
+    Returns:
+        Dict[str, Any]: The number of `inserted` and `replaced` documents, and the video ids
+        that were `written`, that hit a `conflict` and that `failed` for another reason.
+    """
+    def operation(document: Dict[str, Any]) -> UpdateOne:
+        video_id = document["video_id"]
+        fields = coerce_document({k: v for k, v in document.items() if k != REVISION_FIELD})
+        query = {"video_id": video_id}
+        if expected is not None:
+            query.update(_expected_version(expected.get(video_id)))
+        return UpdateOne(query, {"$set": fields, "$inc": {REVISION_FIELD: 1}}, upsert=True)
+
+    result: Dict[str, Any] = {"inserted": 0, "replaced": 0, "written": [], "conflicts": [], "failed": []}
+    for batch in _batches(documents, batch_size):
+        try:
+            details = collection.bulk_write([operation(document) for document in batch], ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # With ordered=False the rest of the batch is still written
+            details = e.details
+        errors = {error["index"]: error for error in details.get("writeErrors", [])}
+        for index, document in enumerate(batch):
+            error = errors.get(index)
+            if error is None:
+                result["written"].append(document["video_id"])
+            elif expected is not None and error.get("code") == DUPLICATE_KEY_ERROR:
+                result["conflicts"].append(document["video_id"])
+            else:
+                result["failed"].append(document["video_id"])
+                logger.error("Video %s could not be saved: %s", document["video_id"], error.get("errmsg"))
+        result["inserted"] += details.get("nUpserted", 0)
+        result["replaced"] += details.get("nMatched", 0)
+    return result
+
+
+def migrate_field_types(collection: Collection, batch_size: int = BULK_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Migrate documents written by the old string-only code: drop duplicated `video_id`s
+    (keeping the most recently inserted one), convert every field to its native type and
+    create the indexes.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        batch_size (int): Operations per `bulk_write` round trip.
+
+    Returns:
+        Dict[str, int]: The number of removed duplicates and of converted documents.
+    """
+    duplicates = collection.aggregate([
+        {"$sort": {"_id": DESCENDING}},
+        {"$group": {"_id": "$video_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    deletes = (DeleteOne({"_id": _id}) for group in duplicates for _id in group["ids"][1:])
+    removed = 0
+    for batch in _batches(deletes, batch_size):
+        removed += collection.bulk_write(batch, ordered=False).deleted_count
+
+    fields = INT_FIELDS + FLOAT_FIELDS + BOOL_FIELDS + DATETIME_FIELDS
+    stale = collection.find(
+        {"$or": [{field: {"$type": "string"}} for field in fields]},
+        {field: 1 for field in fields}
+    )
+    updates = (
+        UpdateOne({"_id": document["_id"]}, {"$set": coerce_document({k: v for k, v in document.items() if k != "_id"})})
+        for document in stale
+    )
+    converted = 0
+    for batch in _batches(updates, batch_size):
+        converted += collection.bulk_write(batch, ordered=False).modified_count
+
+    ensure_indexes(collection)
+    return {"duplicates_removed": removed, "documents_converted": converted}
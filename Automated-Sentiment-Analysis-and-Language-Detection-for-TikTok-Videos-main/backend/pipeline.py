@@ -0,0 +1,494 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from conversion import SAMPLE_RATE, load_audio
+from chunking import TRANSCRIBE_CHUNK_THRESHOLD, compact_segments, plan_chunks, transcribe_chunks
+from model_manager import get_model_manager, warm_up_worker
+from vad import VAD_ENABLED, detect_speech
+from ledger import Ledger
+import metrics
+from result_cache import TRANSCRIPTION, ANALYSIS, audio_digest, text_digest, get_result_cache
+from translate_and_sentiment import LLM, score_text
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Concurrency of every stage; the process pool size is also the number of resident Whisper copies
+PIPELINE_TRANSCRIBE_WORKERS = int(os.getenv("PIPELINE_TRANSCRIBE_WORKERS", "2"))
+PIPELINE_LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", "8"))
+PIPELINE_PERSIST_WORKERS = int(os.getenv("PIPELINE_PERSIST_WORKERS", "2"))
+# Finished documents are written in batches of this size, or after this many seconds
+PIPELINE_PERSIST_BATCH_SIZE = int(os.getenv("PIPELINE_PERSIST_BATCH_SIZE", "50"))
+PIPELINE_PERSIST_WINDOW = float(os.getenv("PIPELINE_PERSIST_WINDOW", "1.0"))
+# Capacity of the queues between stages; a full queue blocks the stage in front of it
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+# Columns of the pyktok metadata that are not stored
+USELESS_COLUMNS = [
+    'video_diggcount',
+    'video_description',
+    'video_stickers',
+    'author_diggcount',
+    'poi_name',
+    'poi_address',
+    'poi_city',
+]
+
+_STOP = object()  # End-of-stream marker passed between stages
+
+
+def _transcribe_video(video_path: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Decode and transcribe one video inside a pool worker, using that worker's resident model.
+    Audio that was already transcribed is answered from the result cache.
+
+    Clips longer than TRANSCRIBE_CHUNK_THRESHOLD are not transcribed here: the worker only
+    detects their language and plans the windows, which the caller fans out over the pool.
+
+    Args:
+        video_path (str): The path to the video file.
+        use_cache (bool): Look the audio up in the result cache first. Defaults to True.
+
+    Returns:
+        Dict[str, Any]: The detected `language`, the `transcription`, its `segments`, the
+        `digest` of the decoded audio, the result `cache_key` (the digest and the model
+        settings) and the `timings` of the decode and whisper steps (measured here, recorded
+        by the caller); long clips have `chunks` instead of a transcription. A clip without
+        speech has no language and an empty transcription, a failed one has no transcription
+        at all and an `error`.
+    """
+    timings: Dict[str, float] = {}
+    try:
+        started = time.perf_counter()
+        audio = load_audio(video_path)
+        timings["decode"] = time.perf_counter() - started
+        cache = get_result_cache()
+        manager = get_model_manager()  # Doesn't load any model yet
+        digest = audio_digest(audio)
+        # A different model size or quantization gives a different transcription
+        key = f"{digest}:{manager.settings_key()}"
+        cached = cache.get(TRANSCRIPTION, key) if use_cache else None
+        if cached is not None:
+            return dict(cached, segments=cached.get("segments", []), digest=digest, cache_key=key, timings=timings)
+
+        started = time.perf_counter()
+        if TRANSCRIBE_CHUNK_THRESHOLD > 0 and len(audio) / SAMPLE_RATE > TRANSCRIBE_CHUNK_THRESHOLD:
+            regions = detect_speech(audio) if VAD_ENABLED else []
+            if not VAD_ENABLED or regions:
+                language, size = manager.pick_model(audio, regions)
+                return {
+                    "language": language, "model_size": size, "digest": digest, "cache_key": key, "chunks": plan_chunks(audio),
+                    "timings": dict(timings, language_detection=time.perf_counter() - started),
+                }
+            aux = {"language": None, "text": "", "segments": []}
+        else:
+            aux = manager.transcribe_speech(audio)
+
+        timings["whisper"] = time.perf_counter() - started
+
+        result = {"language": aux["language"], "transcription": aux["text"].strip(), "segments": compact_segments(aux["segments"])}
+        cache.put(TRANSCRIPTION, key, result)
+        return dict(result, digest=digest, cache_key=key, timings=timings)
+    except Exception as e:
+        logger.error("Error transcribing %s: %s", video_path, e)
+        return {"language": None, "transcription": None, "segments": [], "digest": None, "timings": timings, "error": str(e)}
+
+
+def build_document(
+    row: Dict[str, Any],
+    language: str,
+    sentence: Optional[str],
+    score: Any,
+    video_path: str,
+    transcription: Optional[str] = None,
+    segments: Optional[List[Dict[str, Any]]] = None,
+    sentiment_source: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Merge the analysis results into a metadata row and drop the unused columns.
+
+    Args:
+        row (Dict[str, Any]): The metadata row read from the CSV.
+        language (str): The detected language.
+        sentence (Optional[str]): The English translation.
+        score (Any): The sentiment score.
+        video_path (str): The path to the video file.
+        transcription (Optional[str]): The original-language transcription.
+        segments (Optional[List[Dict[str, Any]]]): Its timed segments ({"start", "end", "text"}).
+        sentiment_source (Optional[str]): Which tier rated the video, "local" or "llm".
+
+    Returns:
+        Dict[str, Any]: The document ready to be stored.
+    """
+    row['language'] = language
+    row['sentence'] = sentence
+    row['sentiment_score'] = score
+    row['video_file'] = video_path
+    row['transcription'] = transcription
+    row['segments'] = segments or []
+    row['sentiment_source'] = sentiment_source
+
+    # Remove useless columns from the row
+    for column in USELESS_COLUMNS:
+        row.pop(column, None)
+    return row
+
+
+class IngestionPipeline:
+    """
+    Staged ingestion engine: transcription -> LLM -> persistence.
+
+    Decoding and Whisper run in a process pool, the LLM calls and the database writes
+    run on thread pools. The stages are connected by bounded queues, so a slow stage
+    applies backpressure to the ones in front of it instead of letting work pile up.
+    A failing video is logged and dropped without stopping the others, and finished
+    documents are yielded as soon as they leave the last stage.
+    """
+
+    def __init__(
+        self,
+        transcribe_workers: int = PIPELINE_TRANSCRIBE_WORKERS,
+        llm_workers: int = PIPELINE_LLM_WORKERS,
+        persist_workers: int = PIPELINE_PERSIST_WORKERS,
+        persist_batch_size: int = PIPELINE_PERSIST_BATCH_SIZE,
+        persist_window: float = PIPELINE_PERSIST_WINDOW,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        persist: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        progress: Optional[Callable[[str, str, str], None]] = None,
+        ledger: Optional[Ledger] = None,
+        refresh: Iterable[str] = ()
+    ) -> None:
+        """
+        Args:
+            transcribe_workers (int): Processes used for decoding and Whisper.
+            llm_workers (int): Threads waiting on the translation and sentiment calls.
+            persist_workers (int): Threads used for the database writes.
+            persist_batch_size (int): Documents handed to `persist` at once at most.
+            persist_window (float): Seconds a finished document waits for its batch to fill.
+            queue_size (int): Capacity of every inter-stage queue.
+            persist (Optional[Callable]): Called with batches of finished documents (e.g.
+                `save_to_mongodb`). Defaults to None (documents are only yielded).
+            progress (Optional[Callable]): Called with (video_id, stage, status) whenever a video
+                leaves a stage; status is "done", "skipped" or "failed". Defaults to None.
+            ledger (Optional[Ledger]): Records every finished stage with its output; stages a
+                video already completed are not run again. Defaults to None.
+            refresh (Iterable[str]): Stages ("transcription", "sentiment") recomputed without
+                looking at the result cache. Defaults to none.
+        """
+        self.transcribe_workers = max(1, transcribe_workers)
+        self.llm_workers = max(1, llm_workers)
+        self.persist_workers = max(1, persist_workers)
+        self.persist_batch_size = max(1, persist_batch_size)
+        self.persist_window = max(0.0, persist_window)
+        self.queue_size = max(1, queue_size)
+        self.persist = persist
+        self.progress = progress
+        self.ledger = ledger
+        self.refresh = set(refresh)
+        self.errors: List[Dict[str, str]] = []
+
+        self._errors_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, rows: Iterable[Dict[str, Any]], output_dir: str = 'database') -> Iterator[Dict[str, Any]]:
+        """
+        Push metadata rows through every stage.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): Metadata rows, e.g. a `csv.DictReader`.
+            output_dir (str): The directory containing the video files. Defaults to 'database'.
+
+        Yields:
+            Dict[str, Any]: Every processed document, in completion order.
+        """
+        self._stop.clear()
+        transcribe_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        llm_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        persist_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        done_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.transcribe_workers, initializer=warm_up_worker, initargs=(self.transcribe_workers,)
+        )
+        try:
+            threads = [threading.Thread(target=self._feed, args=(rows, output_dir, transcribe_q), daemon=True)]
+            threads += self._start_stage(
+                "transcribe", lambda item: self._transcribe(pool, item), transcribe_q, llm_q, self.transcribe_workers
+            )
+            threads += self._start_stage("llm", self._analyze, llm_q, persist_q, self.llm_workers)
+            threads += self._start_persist_stage(persist_q, done_q)
+            threads[0].start()
+
+            while True:
+                item = done_q.get()
+                if item is _STOP:
+                    break
+                yield item
+            logger.info("Result cache: %s", get_result_cache().stats())
+        finally:
+            # Also reached when the consumer stops iterating early
+            self._stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """
+        Blocking put that gives up once the pipeline is stopped.
+
+        Returns:
+            bool: False if the pipeline was stopped before the item could be queued.
+        """
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, rows: Iterable[Dict[str, Any]], output_dir: str, outbox: queue.Queue) -> None:
+        """
+        Source stage: wrap every row with the path of its video and its ledger entry.
+        Videos the ledger already shows as persisted are skipped.
+        """
+        try:
+            for row in rows:
+                file_name = f"@{row['author_username']}_video_{row['video_id']}.mp4"
+                item = {"row": row, "video_path": os.path.join(output_dir, file_name), "entry": None}
+                if self.ledger is not None:
+                    self.ledger.record_download(row, item["video_path"])
+                    item["entry"] = self.ledger.get(row["video_id"])
+                    if item["entry"]["persisted_at"] is not None:
+                        self._report(row["video_id"], "ledger", "skipped")
+                        continue
+                if not self._put(outbox, item):
+                    return
+        except Exception as e:
+            self._record_error("-", "feed", e)
+        self._put(outbox, _STOP)
+
+    def _start_stage(
+        self,
+        name: str,
+        work: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        workers: int
+    ) -> List[threading.Thread]:
+        """
+        Start `workers` threads that apply `work` to every item of `inbox`.
+
+        An item whose `work` raises is reported as failed and dropped; `work` returns None for
+        an item it skips on purpose, which is reported as skipped. The last worker to see the
+        end-of-stream marker forwards it to `outbox`.
+        """
+        remaining = [workers]
+        remaining_lock = threading.Lock()
+
+        def loop() -> None:
+            while not self._stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _STOP:
+                    inbox.put(_STOP)  # Let the sibling workers see it too
+                    break
+                video_id = item["row"].get("video_id", "-")
+                try:
+                    result = work(item)
+                except Exception as e:
+                    self._record_error(video_id, name, e)
+                    self._report(video_id, name, "failed")
+                    continue
+                self._report(video_id, name, "done" if result is not None else "skipped")
+                if result is not None and not self._put(outbox, result):
+                    return
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(outbox, _STOP)
+
+        threads = [threading.Thread(target=loop, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _transcribe(self, pool: ProcessPoolExecutor, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transcription stage: decode and run Whisper in the process pool, unless the ledger
+        already holds the transcription. The windows of a long clip are spread over the
+        whole pool and stitched back here. A failed decode or transcription raises, so the
+        video is reported as failed.
+        """
+        entry = item["entry"]
+        if entry is not None and entry["transcribed_at"] is not None:
+            item["language"], item["transcription"] = entry["language"], entry["transcription"]
+            item["segments"] = entry["segments"]
+            return item
+
+        video_id = item["row"]["video_id"]
+        use_cache = "transcription" not in self.refresh
+        result = pool.submit(_transcribe_video, item["video_path"], use_cache).result()
+        for name, seconds in result["timings"].items():
+            metrics.record(name, seconds, video_id)
+        if "error" in result:
+            metrics.record("whisper" if "decode" in result["timings"] else "decode", None, video_id, error=result["error"])
+            raise RuntimeError(result["error"])
+        if "chunks" in result:
+            with metrics.stage("whisper", video_id, chunks=len(result["chunks"])):
+                result["transcription"], result["segments"] = transcribe_chunks(
+                    pool, item["video_path"], result["chunks"], result["language"], result["model_size"]
+                )
+            get_result_cache().put(TRANSCRIPTION, result["cache_key"], {
+                "language": result["language"], "transcription": result["transcription"], "segments": result["segments"]
+            })
+        language, transcription = result["language"], result["transcription"]
+        logger.debug("Video %s: detected language %s, transcription: %s", video_id, language, transcription)
+        item["language"], item["transcription"], item["segments"] = language, transcription, result["segments"]
+        if self.ledger is not None:
+            self.ledger.record_transcription(
+                item["row"]["video_id"], result["digest"], language, transcription, item["segments"]
+            )
+        return item
+
+    def _analyze(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        LLM stage: rate the transcription with the tiered scorer, escalating to one structured
+        LLM call (translation and rating) when the local rating isn't confident, unless the
+        ledger holds the result or the same text was already sent to the LLM. A video the LLM
+        couldn't rate (or translate) fails this stage instead of being stored without a rating.
+        """
+        language, transcription = item["language"], item["transcription"]
+        entry = item["entry"]
+        if entry is not None and entry["scored_at"] is not None:
+            sentence, score, source = entry["translation"], entry["sentiment_score"], entry["sentiment_source"]
+        else:
+            cache = get_result_cache()
+            key = text_digest(transcription)
+            cached = cache.get(ANALYSIS, key) if "sentiment" not in self.refresh else None
+            if cached is not None:
+                sentence, score = cached["translation"], cached["sentiment_score"]
+                source = cached.get("sentiment_source", LLM)
+            else:
+                started = time.perf_counter()
+                sentence, score, source = score_text(transcription, language)
+                metrics.record(
+                    "llm" if source == LLM else "local_sentiment", time.perf_counter() - started, item["row"]["video_id"],
+                    error="no answer from the LLM" if score is None else None
+                )
+                # Local ratings of English text are cheaper than a lookup; the others cost an LLM call
+                if score is not None and (source == LLM or language != "en"):
+                    cache.put(ANALYSIS, key, {
+                        "translation": sentence, "sentiment_score": score, "sentiment_source": source
+                    })
+            if score is None:
+                # Not persisted, so the ledger keeps the video pending for `manage.py resume`
+                raise RuntimeError("No rating from the LLM.")
+            if self.ledger is not None:
+                self.ledger.record_score(item["row"]["video_id"], sentence, score, source)
+        item["document"] = build_document(
+            item["row"], language, sentence, score, item["video_path"], transcription, item["segments"], source
+        )
+        return item
+
+    def _start_persist_stage(self, inbox: queue.Queue, outbox: queue.Queue) -> List[threading.Thread]:
+        """
+        Start the persistence workers. Every worker buffers the finished documents and hands
+        them to `persist` once `persist_batch_size` are waiting, `persist_window` seconds after
+        the first of them arrived, or when the stream ends.
+        """
+        remaining = [self.persist_workers]
+        remaining_lock = threading.Lock()
+
+        def loop() -> None:
+            batch: List[Dict[str, Any]] = []
+            deadline: Optional[float] = None
+            finished = False
+            while not finished and not self._stop.is_set():
+                timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = inbox.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    inbox.put(_STOP)  # Let the sibling workers see it too
+                    finished = True
+                elif item is not None:
+                    batch.append(item)
+                    deadline = deadline or time.monotonic() + self.persist_window
+                if batch and (finished or len(batch) >= self.persist_batch_size or time.monotonic() >= deadline):
+                    if not self._save(batch, outbox):
+                        return
+                    batch, deadline = [], None
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(outbox, _STOP)
+
+        threads = [threading.Thread(target=loop, name=f"persist-{i}", daemon=True) for i in range(self.persist_workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _save(self, batch: List[Dict[str, Any]], outbox: queue.Queue) -> bool:
+        """
+        Persistence stage: hand a batch of finished documents to `persist` in one call, then
+        mark them persisted in the ledger. A failed batch leaves its videos pending.
+
+        Returns:
+            bool: False if the pipeline was stopped before the documents could be forwarded.
+        """
+        documents = [item["document"] for item in batch]
+        if self.persist is not None:
+            started = time.perf_counter()
+            try:
+                self.persist(documents)
+            except Exception as e:
+                for document in documents:
+                    metrics.record("mongo_write", None, document["video_id"], error=str(e))
+                    self._record_error(document["video_id"], "persist", e)
+                    self._report(document["video_id"], "persist", "failed")
+                return True
+            seconds = time.perf_counter() - started
+            for document in documents:
+                metrics.record("mongo_write", seconds, document["video_id"], batch=len(documents))
+                if self.ledger is not None:
+                    self.ledger.record_persisted(document["video_id"])
+        for document in documents:
+            self._report(document["video_id"], "persist", "done")
+            if not self._put(outbox, document):
+                return False
+        return True
+
+    def _report(self, video_id: str, stage: str, status: str) -> None:
+        """
+        Forward a stage transition to the progress callback, never letting it break the pipeline.
+        """
+        if self.progress is None:
+            return
+        try:
+            self.progress(video_id, stage, status)
+        except Exception as e:
+            logger.warning("Error in progress callback: %s", e)
+
+    def _record_error(self, video_id: str, stage: str, error: Exception) -> None:
+        """
+        Log a per-video failure without interrupting the other videos.
+        """
+        logger.error("Error in %s stage for video %s: %s", stage, video_id, error)
+        if self.ledger is not None and video_id != "-":
+            try:
+                self.ledger.record_error(video_id, stage, str(error))
+            except Exception as e:
+                logger.warning("Could not record the error in the ledger: %s", e)
+        with self._errors_lock:
+            self.errors.append({"video_id": video_id, "stage": stage, "error": str(error)})
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from dotenv import load_dotenv
+from typing import Any, Dict, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.01"))  # Seconds between samples
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"  # Start with the process
+PROFILER_MAX_DEPTH = 64
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler that can be switched on and off at runtime.
+
+    A daemon thread periodically snapshots the stack of every other thread of the process
+    and counts identical stacks. Nothing runs while it is stopped, and a running profiler
+    costs one stack walk per thread per interval. The result is in the collapsed-stack
+    format understood by flamegraph tools (speedscope, flamegraph.pl).
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL) -> None:
+        """
+        Args:
+            interval (float): Seconds between two samples.
+        """
+        self.interval = interval
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, reset: bool = True) -> None:
+        """
+        Start sampling (no-op when already running).
+
+        Args:
+            interval (Optional[float]): Seconds between samples. Defaults to the current one.
+            reset (bool): Drop the samples of the previous session. Defaults to True.
+        """
+        with self._lock:
+            if self.running:
+                return
+            if interval:
+                self.interval = max(0.001, interval)
+            if reset:
+                self._stacks.clear()
+                self._samples = 0
+            self._started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling, keeping the collected samples.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                        code = frame.f_code
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                        frame = frame.f_back
+                    self._stacks[";".join(reversed(stack))] += 1
+                self._samples += 1
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """
+        Args:
+            limit (Optional[int]): Keep only the most frequent stacks. Defaults to all.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack.
+        """
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Whether it runs, its interval, the samples and distinct stacks.
+        """
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval": self.interval,
+                "started_at": self._started_at,
+                "samples": self._samples,
+                "stacks": len(self._stacks),
+            }
+
+
+profiler = SamplingProfiler()
+if PROFILER_ENABLED:
+    profiler.start()
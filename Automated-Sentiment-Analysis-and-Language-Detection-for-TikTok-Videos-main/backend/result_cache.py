@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from typing import Any, Dict, Optional
+
+# Load environment variables from .env
+load_dotenv()
+
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join("cache", "results.sqlite3"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Cache layers
+TRANSCRIPTION = "transcription"  # audio hash + model settings -> (language, transcription, segments)
+ANALYSIS = "analysis"            # normalized text hash -> (translation, score, source)
+
+
+def audio_digest(audio: Any) -> str:
+    """
+    Hash a decoded audio buffer, so the same audio is recognized whatever container it came in.
+
+    Args:
+        audio (Any): The decoded audio as a NumPy array.
+
+    Returns:
+        str: The SHA-256 hex digest of the samples.
+    """
+    return hashlib.sha256(audio.tobytes()).hexdigest()
+
+
+def text_digest(text: str) -> str:
+    """
+    Hash a transcription after normalizing case and whitespace.
+
+    Args:
+        text (str): The transcription.
+
+    Returns:
+        str: The SHA-256 hex digest of the normalized text.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of expensive results, stored in a local SQLite file.
+
+    The cache is size bounded: once the stored values exceed `max_bytes` the least recently
+    used entries are evicted. Hit and miss counters are kept in the same file, so they add up
+    across every worker process sharing the cache.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES) -> None:
+        """
+        Args:
+            path (str): The SQLite file. Its directory is created if needed.
+            max_bytes (int): Upper bound for the total size of the stored values.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "layer TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL, PRIMARY KEY (layer, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "layer TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns:
+            sqlite3.Connection: The connection of the calling thread (opened on first use).
+        """
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited through fork must not be reused by the child process
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, layer: str, key: str) -> Optional[Any]:
+        """
+        Look up a value and count the hit or miss.
+
+        Args:
+            layer (str): The cache layer, e.g. TRANSCRIPTION or ANALYSIS.
+            key (str): The content hash.
+
+        Returns:
+            Optional[Any]: The cached value, or None on a miss.
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE layer = ? AND key = ?", (layer, key)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE layer = ? AND key = ?", (time.time(), layer, key)
+                )
+            counter = "hits" if row is not None else "misses"
+            conn.execute(
+                f"INSERT INTO counters (layer, {counter}) VALUES (?, 1) "
+                f"ON CONFLICT(layer) DO UPDATE SET {counter} = {counter} + 1",
+                (layer,)
+            )
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, layer: str, key: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value, evicting the least recently used entries if needed.
+
+        Args:
+            layer (str): The cache layer.
+            key (str): The content hash.
+            value (Any): The value to store.
+        """
+        data = json.dumps(value)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (layer, key, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (layer, key, data, len(data), time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        Drop the least recently used entries until the cache is back under `max_bytes`.
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT layer, key, size FROM entries ORDER BY last_access").fetchall()
+        for layer, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE layer = ? AND key = ?", (layer, key))
+            total -= size
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns:
+            Dict[str, Dict[str, int]]: Hits, misses and stored entries per layer.
+        """
+        with self._connection() as conn:
+            counters = conn.execute("SELECT layer, hits, misses FROM counters").fetchall()
+            entries = dict(conn.execute("SELECT layer, COUNT(*) FROM entries GROUP BY layer").fetchall())
+        return {
+            layer: {"hits": hits, "misses": misses, "entries": entries.get(layer, 0)}
+            for layer, hits, misses in counters
+        }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Returns:
+        ResultCache: The cache shared by every stage in this process.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,257 @@
+from collections import defaultdict
+from datetime import datetime
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+from persistence import BULK_BATCH_SIZE, REVISION_FIELD, bulk_upsert, coerce_document
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+ROLLUPS_COLLECTION = "sentiment_rollups"
+NEGATIVE_THRESHOLD = 40  # Scores below this count as negative
+POSITIVE_THRESHOLD = 60  # Scores above this count as positive
+UPSERT_ATTEMPTS = 5  # Rounds of retries for videos rewritten concurrently by another writer
+
+# Bucket dimensions, in the order they appear in the bucket _id
+DIMENSIONS = {
+    "day": "day",
+    "language": "language",
+    "author": "author_username",
+}
+
+BucketKey = Tuple[str, str, str]
+
+
+def contribution(document: Mapping[str, Any]) -> Optional[Tuple[BucketKey, Dict[str, float]]]:
+    """
+    Compute what one video adds to its (day, language, author) bucket.
+
+    Args:
+        document (Mapping[str, Any]): A processed video document.
+
+    Returns:
+        Optional[Tuple[BucketKey, Dict[str, float]]]: The bucket key and the counters to add,
+        or None if the video has no usable timestamp or score.
+    """
+    document = coerce_document(dict(document))
+    timestamp, score = document.get("video_timestamp"), document.get("sentiment_score")
+    if not isinstance(timestamp, datetime) or not isinstance(score, (int, float)) or isinstance(score, bool):
+        return None
+    key = (timestamp.strftime("%Y-%m-%d"), document.get("language") or "", document.get("author_username") or "")
+    return key, {
+        "count": 1,
+        "score_sum": float(score),
+        "negative_count": int(score < NEGATIVE_THRESHOLD),
+        "positive_count": int(score > POSITIVE_THRESHOLD),
+    }
+
+
+def _bucket_id(key: BucketKey) -> Dict[str, str]:
+    day, language, author = key
+    return {"day": day, "language": language, "author_username": author}
+
+
+def snapshot_contributions(videos: Collection, video_ids: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Read the stored version of the videos about to be upserted, so their old contribution
+    can be subtracted afterwards, and its revision, so the upsert can check it is unchanged.
+
+    Args:
+        videos (Collection): The processed videos collection.
+        video_ids (Iterable[str]): The ids about to be written.
+
+    Returns:
+        List[Dict[str, Any]]: The currently stored documents (only the rollup fields).
+    """
+    return list(videos.find(
+        {"video_id": {"$in": list(video_ids)}},
+        {"_id": 0, "video_id": 1, "video_timestamp": 1, "sentiment_score": 1, "language": 1, "author_username": 1,
+         REVISION_FIELD: 1}
+    ))
+
+
+def update_rollups(rollups: Collection, previous: Iterable[Mapping[str, Any]], current: Iterable[Mapping[str, Any]]) -> None:
+    """
+    Apply an upsert to the pre-aggregated buckets: subtract the old contribution of every
+    re-upserted video and add the new one, in a single bulk write.
+
+    Args:
+        rollups (Collection): The rollups collection.
+        previous (Iterable[Mapping[str, Any]]): The stored documents before the upsert.
+        current (Iterable[Mapping[str, Any]]): The documents that were upserted.
+    """
+    deltas: Dict[BucketKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for documents, sign in ((previous, -1), (current, 1)):
+        for document in documents:
+            part = contribution(document)
+            if part is None:
+                continue
+            key, counters = part
+            for name, value in counters.items():
+                deltas[key][name] += sign * value
+
+    operations = [
+        UpdateOne({"_id": _bucket_id(key)}, {"$inc": dict(counters)}, upsert=True)
+        for key, counters in deltas.items()
+        if any(counters.values())
+    ]
+    if operations:
+        rollups.bulk_write(operations, ordered=False)  # Emptied buckets are skipped by query_rollups
+
+
+def upsert_with_rollups(
+    videos: Collection,
+    rollups: Collection,
+    documents: Iterable[Dict[str, Any]],
+    batch_size: int = BULK_BATCH_SIZE,
+    attempts: int = UPSERT_ATTEMPTS
+) -> Dict[str, Any]:
+    """
+    Upsert videos and move their contribution to the rollups, counting only the writes
+    that went through.
+
+    Every video is written only if it is still the version its old contribution was read
+    from. One rewritten in between by another writer (a sibling persist worker, another job
+    or process) conflicts, and is re-read and retried; so no contribution is ever subtracted
+    or added twice, and a failed write changes no bucket.
+
+    Args:
+        videos (Collection): The processed videos collection.
+        rollups (Collection): The rollups collection.
+        documents (Iterable[Dict[str, Any]]): The processed video documents.
+        batch_size (int): Operations per `bulk_write` round trip.
+        attempts (int): Rounds of writes before giving up on conflicting videos.
+
+    Returns:
+        Dict[str, Any]: The number of `inserted` and `replaced` documents and the ids of the
+        videos that `failed` to be written.
+    """
+    pending = {document["video_id"]: document for document in documents}  # The last version of a repeated video wins
+    inserted = replaced = 0
+    failed: List[str] = []
+    for _ in range(max(1, attempts)):
+        if not pending:
+            break
+        previous = {document["video_id"]: document for document in snapshot_contributions(videos, pending)}
+        result = bulk_upsert(
+            videos, pending.values(), batch_size, expected={video_id: previous.get(video_id) for video_id in pending}
+        )
+        update_rollups(
+            rollups,
+            [previous[video_id] for video_id in result["written"] if video_id in previous],
+            [pending[video_id] for video_id in result["written"]]
+        )
+        inserted, replaced = inserted + result["inserted"], replaced + result["replaced"]
+        failed += result["failed"]
+        pending = {video_id: pending[video_id] for video_id in result["conflicts"]}
+    failed += list(pending)
+    return {"inserted": inserted, "replaced": replaced, "failed": failed}
+
+
+def rebuild_rollups(videos: Collection, rollups: Collection) -> int:
+    """
+    Recompute every bucket from scratch with a server-side aggregation and swap the result
+    in place of the current rollups.
+
+    Args:
+        videos (Collection): The processed videos collection.
+        rollups (Collection): The rollups collection.
+
+    Returns:
+        int: The number of buckets.
+    """
+    staging = f"{rollups.name}_rebuild"
+    videos.aggregate([
+        {"$match": {"video_timestamp": {"$type": "date"}, "sentiment_score": {"$type": "number"}}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$video_timestamp"}},
+                "language": {"$ifNull": ["$language", ""]},
+                "author_username": {"$ifNull": ["$author_username", ""]},
+            },
+            "count": {"$sum": 1},
+            "score_sum": {"$sum": {"$toDouble": "$sentiment_score"}},
+            "negative_count": {"$sum": {"$cond": [{"$lt": ["$sentiment_score", NEGATIVE_THRESHOLD]}, 1, 0]}},
+            "positive_count": {"$sum": {"$cond": [{"$gt": ["$sentiment_score", POSITIVE_THRESHOLD]}, 1, 0]}},
+        }},
+        {"$out": staging},
+    ], allowDiskUse=True)
+
+    database = rollups.database
+    if staging not in database.list_collection_names():
+        rollups.drop()  # No scored videos at all
+        return 0
+    database[staging].rename(rollups.name, dropTarget=True)
+    ensure_rollup_indexes(rollups)
+    return rollups.estimated_document_count()
+
+
+def query_rollups(rollups: Collection, group_by: List[str], args: Mapping[str, str]) -> List[Dict[str, Any]]:
+    """
+    Aggregate the buckets along the requested dimensions.
+
+    Args:
+        rollups (Collection): The rollups collection.
+        group_by (List[str]): Dimensions among "day", "language" and "author".
+        args (Mapping[str, str]): Optional filters: `date_from`, `date_to` (YYYY-MM-DD),
+            `language` and `author`.
+
+    Returns:
+        List[Dict[str, Any]]: One row per group with count, average score and the share of
+        negative and positive videos.
+
+    Raises:
+        ValueError: If a dimension is unknown.
+    """
+    unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by dimension(s): {', '.join(unknown)}. Use {', '.join(DIMENSIONS)}.")
+
+    match: Dict[str, Any] = {"count": {"$gt": 0}}  # Buckets emptied by rewritten videos
+    day: Dict[str, str] = {}
+    if args.get("date_from"):
+        day["$gte"] = args["date_from"][:10]
+    if args.get("date_to"):
+        day["$lte"] = args["date_to"][:10]
+    if day:
+        match["_id.day"] = day
+    if args.get("language"):
+        match["_id.language"] = args["language"]
+    if args.get("author"):
+        match["_id.author_username"] = args["author"]
+
+    group_id = {dimension: f"$_id.{DIMENSIONS[dimension]}" for dimension in group_by} or None
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": group_id,
+            "count": {"$sum": "$count"},
+            "score_sum": {"$sum": "$score_sum"},
+            "negative_count": {"$sum": "$negative_count"},
+            "positive_count": {"$sum": "$positive_count"},
+        }},
+        {"$sort": {f"_id.{dimension}": ASCENDING for dimension in group_by} or {"count": ASCENDING}},
+    ]
+
+    rows = []
+    for group in rollups.aggregate(pipeline):
+        count = group["count"]
+        row = dict(group["_id"] or {})
+        row.update({
+            "count": count,
+            "average_sentiment": round(group["score_sum"] / count, 2) if count else None,
+            "negative_share": round(group["negative_count"] / count, 4) if count else None,
+            "positive_share": round(group["positive_count"] / count, 4) if count else None,
+        })
+        rows.append(row)
+    return rows
+
+
+def ensure_rollup_indexes(rollups: Collection) -> None:
+    """
+    Index the bucket dimensions used as filters.
+
+    Args:
+        rollups (Collection): The rollups collection.
+    """
+    rollups.create_index([("_id.day", ASCENDING)], name="day")
+    rollups.create_index([("_id.language", ASCENDING)], name="language")
+    rollups.create_index([("_id.author_username", ASCENDING)], name="author_username")
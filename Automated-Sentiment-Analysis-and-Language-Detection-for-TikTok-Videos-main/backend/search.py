@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields covered by the `text_search` index (see persistence.INDEXES)
+SEARCH_FIELDS = ("sentence", "transcription")
+SNIPPET_CHARS = 160  # Length of a snippet around the best cluster of matches
+MAX_SEARCH_OFFSET = 1000  # Deeper result pages are not worth a textScore sort
+
+# Suffixes the English stemmer of the text index strips; used to highlight "dividend" for "dividends"
+STEM_SUFFIXES = ("ing", "ies", "es", "ed", "s")
+
+
+def _fold(text: str) -> Tuple[str, List[int]]:
+    """
+    Lowercase a text and strip its diacritics, like the text index does.
+
+    Returns:
+        Tuple[str, List[int]]: The folded text and, per folded character, its index in `text`.
+    """
+    folded: List[str] = []
+    positions: List[int] = []
+    for index, char in enumerate(text):
+        for part in unicodedata.normalize("NFD", char):
+            if unicodedata.combining(part):
+                continue
+            lowered = part.lower()
+            folded.append(lowered)
+            positions.extend([index] * len(lowered))
+    return "".join(folded), positions
+
+
+def _stem(word: str) -> str:
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def parse_terms(text: str) -> List[str]:
+    """
+    Split a search string the way MongoDB's `$search` reads it: quoted phrases and single
+    words, a leading "-" excluding a term.
+
+    Args:
+        text (str): The search string.
+
+    Returns:
+        List[str]: The folded phrases and words to highlight (excluded terms left out).
+    """
+    terms: List[str] = []
+    for phrase, word in re.findall(r'(-?"[^"]+")|(\S+)', text):
+        term = phrase or word
+        if term.startswith("-"):
+            continue
+        term = _fold(term.strip('"'))[0].strip()
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _patterns(terms: List[str]) -> List["re.Pattern[str]"]:
+    patterns = []
+    for term in terms:
+        if " " in term:
+            patterns.append(re.compile(r"\b" + re.escape(term) + r"\b"))
+        else:
+            for word in re.findall(r"\w{2,}", term):
+                patterns.append(re.compile(r"\b" + re.escape(_stem(word)) + r"\w*"))
+    return patterns
+
+
+def highlight(text: str, terms: List[str], width: int = SNIPPET_CHARS) -> Optional[Dict[str, Any]]:
+    """
+    Cut the passage of a text holding the most matches of the search terms.
+
+    Args:
+        text (str): The transcription or translation.
+        terms (List[str]): The terms returned by `parse_terms`.
+        width (int): The snippet length in characters. Defaults to SNIPPET_CHARS.
+
+    Returns:
+        Optional[Dict[str, Any]]: The snippet `text` and its `highlights`, a list of
+        [start, end) character offsets into the snippet; None if no term occurs in the text.
+    """
+    folded, positions = _fold(text)
+    spans = sorted(
+        (positions[match.start()], positions[match.end() - 1] + 1)
+        for pattern in _patterns(terms)
+        for match in pattern.finditer(folded)
+        if match.end() > match.start()
+    )
+    if not spans:
+        return None
+
+    # Anchor the window on the match followed by the most matches within `width`
+    best = max(range(len(spans)), key=lambda i: sum(1 for _, end in spans[i:] if end <= spans[i][0] + width))
+    anchor = spans[best][0]
+    start = max(0, anchor - width // 4)
+    if start > 0:
+        space = text.find(" ", start, anchor)
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(" ", spans[best][1], end)
+        end = space if space != -1 else end
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    offset = len(prefix) - start
+    return {
+        "text": prefix + text[start:end] + suffix,
+        "highlights": [[s + offset, e + offset] for s, e in spans if s >= start and e <= end],
+    }
+
+
+def search_videos(
+    collection: Collection,
+    text: str,
+    query: Dict[str, Any],
+    projection: Dict[str, int],
+    limit: int,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Full-text search over the translations and original transcriptions, ranked by relevance.
+
+    MongoDB matches and ranks the documents on the `text_search` index, which it updates on
+    every upsert, so the cost of a query follows the number of matches rather than the size
+    of the collection.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        text (str): The search string (words, "quoted phrases", -excluded words).
+        query (Dict[str, Any]): Additional filter, e.g. from `build_video_filter`.
+        projection (Dict[str, int]): The returned fields.
+        limit (int): The number of results.
+        offset (int): The number of results skipped. Defaults to 0.
+
+    Returns:
+        List[Dict[str, Any]]: The matching documents, best first, with their relevance `score`
+        and the `snippets` (per field, see `highlight`) of the fields holding a match.
+
+    Raises:
+        ValueError: If the search string is empty or the offset out of range.
+    """
+    if not text.strip():
+        raise ValueError("'q' is required.")
+    if not 0 <= offset <= MAX_SEARCH_OFFSET:
+        raise ValueError(f"'offset' must be between 0 and {MAX_SEARCH_OFFSET}.")
+
+    hidden = [field for field in SEARCH_FIELDS if not projection.get(field)]  # Read for the snippets only
+    projection = dict(projection, score={"$meta": "textScore"}, **{field: 1 for field in SEARCH_FIELDS})
+    documents = (
+        collection.find(dict(query, **{"$text": {"$search": text}}), projection)
+        .sort([("score", {"$meta": "textScore"}), ("video_timestamp", DESCENDING)])
+        .skip(offset)
+        .limit(limit)
+    )
+
+    terms = parse_terms(text)
+    results = []
+    for document in documents:
+        snippets = []
+        for field in SEARCH_FIELDS:
+            snippet = highlight(document.get(field) or "", terms)
+            if snippet is not None:
+                snippets.append(dict(snippet, field=field))
+        for field in hidden:
+            document.pop(field, None)
+        document["score"] = round(document["score"], 4)
+        document["snippets"] = snippets
+        results.append(document)
+    return results
@@ -0,0 +1,83 @@
+import pytest
+
+from local_scorer import NEUTRAL_SCORE, evaluate, local_score
+
+THRESHOLD = 0.8  # SENTIMENT_ESCALATION_THRESHOLD's default
+
+
+@pytest.mark.parametrize("text", [
+    "Banca asta m-a furat, nu mai las niciun leu acolo.",
+    "This bank blocked my card for no reason, terrible.",
+    "Mi-au blocat contul de doua ori luna asta.",
+])
+def test_complaints_about_the_bank_are_not_settled_as_neutral(text):
+    score, confidence = local_score(text)
+
+    assert confidence < THRESHOLD or score < NEUTRAL_SCORE
+
+
+def test_generic_bank_complaint_leans_negative():
+    score, _ = local_score("This bank blocked my card, terrible service.")
+
+    assert score < NEUTRAL_SCORE
+
+
+def test_opinions_without_a_mention_escalate():
+    _, confidence = local_score("I hate this, worst thing ever.")
+
+    assert confidence < THRESHOLD
+
+
+def test_text_without_lexicon_hits_escalates():
+    score, confidence = local_score("Dansam pe melodia asta toata vara")
+
+    assert score == NEUTRAL_SCORE
+    assert confidence < THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "Această bancă m-a înșelat, e o țeapă.",
+    "Banca asta mi-a blocat contul, e o țeapă, m-au înșelat.",
+])
+def test_romanian_with_diacritics_matches_the_lexicons(text):
+    score, _ = local_score(text)
+
+    assert score < NEUTRAL_SCORE
+
+
+@pytest.mark.parametrize("text", [
+    "Scammed again by these guys, never again",
+    "Never trusting these people with my savings again",
+])
+def test_unseen_negative_wording_is_not_settled_as_neutral(text):
+    score, confidence = local_score(text)
+
+    assert confidence < THRESHOLD or score < NEUTRAL_SCORE
+
+
+def test_empty_text_is_neutral():
+    assert local_score("") == (NEUTRAL_SCORE, 1.0)
+
+
+def test_bank_terms_match_whole_words_only():
+    # "context" and "cardboard" are not "cont" and "card": without a mention the opinions escalate
+    assert local_score("Some context about this cardboard box: terrible, awful, broken") == (NEUTRAL_SCORE, 0.3)
+    assert local_score("Some context about this card: terrible, awful, broken")[1] >= THRESHOLD
+
+
+def test_brand_praise_is_positive():
+    score, _ = local_score("Raiffeisen e cea mai buna banca, recomand")
+
+    assert score > NEUTRAL_SCORE
+
+
+def test_evaluate_reports_escalation_per_threshold():
+    samples = [
+        {"text": "Dansam pe melodia asta toata vara", "sentiment_score": 50},
+        {"text": "Banca asta m-a furat, e o teapa, frauda", "sentiment_score": 10},
+    ]
+
+    report = evaluate(samples, [0.5, 1.01])
+
+    assert report["samples"] == 2
+    assert [row["escalation_rate"] for row in report["thresholds"]] == [0.5, 1.0]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from vad import SAMPLE_RATE, detect_speech
+
+
+def formant_voice(seconds: float, syllable_rate: float, seed: int = 0) -> np.ndarray:
+    """
+    A vowel-like harmonic signal (120 Hz pitch, formants around 700 and 1200 Hz) whose
+    loudness is gated at the syllable rate, over a faint noise floor.
+    """
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = np.zeros_like(t)
+    for harmonic in range(1, 26):
+        frequency = 120.0 * harmonic
+        gain = np.exp(-((frequency - 700) / 250) ** 2) + 0.6 * np.exp(-((frequency - 1200) / 300) ** 2) + 0.02
+        voice += gain * np.sin(2 * np.pi * frequency * t)
+    envelope = np.clip(np.sin(2 * np.pi * syllable_rate * t), 0, None) ** 2  # ~1/3 of every cycle voiced
+    noise = np.random.default_rng(seed).normal(0, 1e-3, len(t))
+    return (0.1 * voice * envelope + noise).astype(np.float32)
+
+
+@pytest.mark.parametrize("syllable_rate", [2.0, 3.0, 4.0, 5.0])
+def test_syllable_rate_speech_is_detected(syllable_rate):
+    regions = detect_speech(formant_voice(4.0, syllable_rate))
+
+    assert regions
+    assert sum(end - start for start, end in regions) > 3.0
+
+
+def test_four_hz_voice_is_one_region():
+    regions = detect_speech(formant_voice(4.0, 4.0))
+
+    # 125 ms syllables 250 ms apart are merged into a single phrase
+    assert len(regions) == 1
+
+
+def test_silence_has_no_speech():
+    silence = np.random.default_rng(0).normal(0, 1e-3, 4 * SAMPLE_RATE).astype(np.float32)
+
+    assert detect_speech(silence) == []
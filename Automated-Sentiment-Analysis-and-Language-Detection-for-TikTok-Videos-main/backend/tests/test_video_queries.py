@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import mongomock
+
+from video_queries import CountCache, build_video_filter
+
+
+def make_collection(count=3):
+    collection = mongomock.MongoClient().db.videos
+    collection.insert_many([{"video_id": str(i), "language": "ro"} for i in range(count)])
+    return collection
+
+
+def test_count_cache_is_bounded():
+    cache = CountCache(max_entries=2)
+    collection = make_collection()
+
+    for term in ["a", "b", "c", "d"]:
+        cache.count(collection, {"language": term})
+
+    assert len(cache._counts) == 2
+
+
+def test_count_cache_keeps_recently_used_filters():
+    cache = CountCache(max_entries=2)
+    collection = make_collection()
+
+    cache.count(collection, {"language": "ro"})
+    cache.count(collection, {"language": "en"})
+    cache.count(collection, {"language": "ro"})  # Hit, now the most recent
+    cache.count(collection, {"language": "de"})
+
+    assert set(cache._counts) == {'{"language": "ro"}', '{"language": "de"}'}
+
+
+def test_count_cache_drops_expired_entries():
+    cache = CountCache(ttl=0)
+    collection = make_collection()
+
+    assert cache.count(collection, {"language": "ro"}) == 3
+    collection.insert_one({"video_id": "3", "language": "ro"})
+
+    assert cache.count(collection, {"language": "ro"}) == 4
+    assert len(cache._counts) == 1
+
+
+def test_date_only_date_to_includes_the_whole_day():
+    collection = mongomock.MongoClient().db.videos
+    collection.insert_many([
+        {"video_id": "1", "video_timestamp": datetime(2024, 5, 1, 0, 0)},
+        {"video_id": "2", "video_timestamp": datetime(2024, 5, 1, 23, 59)},
+        {"video_id": "3", "video_timestamp": datetime(2024, 5, 2, 0, 0)},
+    ])
+
+    query = build_video_filter({"date_from": "2024-05-01", "date_to": "2024-05-01"})
+
+    assert sorted(document["video_id"] for document in collection.find(query)) == ["1", "2"]
+
+
+def test_date_to_with_a_time_is_inclusive_of_that_instant():
+    query = build_video_filter({"date_to": "2024-05-01T12:00:00"})
+
+    assert query == {"video_timestamp": {"$lte": datetime(2024, 5, 1, 12, 0)}}
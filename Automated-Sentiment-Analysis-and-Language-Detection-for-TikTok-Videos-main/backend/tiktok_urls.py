@@ -0,0 +1,32 @@
+import re
+from urllib.parse import quote, urlsplit
+from typing import Optional
+
+VIDEO_ID_PATTERN = re.compile(r"/video/(\d+)")
+VIDEO_LINKS_XPATH = '//a[contains(@href, "/video/")]'
+
+def tiktok_search_url(search_query: str) -> str:
+    """
+    Build the TikTok page listing the videos of a search query.
+
+    Args:
+        search_query (str): A hashtag (with or without '#') or free text.
+
+    Returns:
+        str: The tag page for a single-word hashtag, the video search page otherwise.
+    """
+    query = search_query.strip()
+    if re.fullmatch(r"#?\w+", query):
+        return f"https://www.tiktok.com/tag/{quote(query.lstrip('#'))}"
+    return f"https://www.tiktok.com/search/video?q={quote(query)}"
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Args:
+        url (str): A TikTok video URL.
+
+    Returns:
+        Optional[str]: The numeric video id, or None if the URL isn't a video URL.
+    """
+    match = VIDEO_ID_PATTERN.search(urlsplit(url).path)
+    return match.group(1) if match else None
@@ -1,15 +1,19 @@
 import os
-import whisper
-from conversion import convert_mp4_to_wav
-import gc
-import torch
-from typing import Tuple, Optional  # Ensure these are imported
+from concurrent.futures import ProcessPoolExecutor
+from chunking import plan_chunks, transcribe_chunks
+from conversion import load_audio
+from model_manager import get_model_manager, warm_up_worker
+from vad import VAD_ENABLED, detect_speech
+from typing import Any, Dict, Iterable, List, Tuple, Optional  # Ensure these are imported
 
 # Transcribe and detect language
 def transcriere_si_detectie_limbaj(video_link: str, VIDEO_DIR: str = 'database') -> Tuple[Optional[str], Optional[str]]:
     """
     Transcribes the audio from a video file and detects the language used.
 
+    The Whisper model is kept resident by the process-wide model manager, so only the
+    first call in a worker pays for loading the weights.
+
     Args:
         video_link (str): The name of the video file to be processed.
         VIDEO_DIR (str): The directory where the video files are stored. Defaults to 'database'.
@@ -19,32 +23,40 @@ def transcriere_si_detectie_limbaj(video_link: str, VIDEO_DIR: str = 'database')
             - The detected language as a string (e.g., "en" for English), or None if transcription fails.
             - The transcription of the video as a string, or None if transcription fails.
     """ 
-    results = []
-    
-    # Use if CUDA is available
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    
-    # Load the Whisper model
-    whisper_model = whisper.load_model("base", device=device, in_memory=True)
-    
-    try:
-        video_path = os.path.join(VIDEO_DIR, video_link)
-        wav_file = convert_mp4_to_wav(video_path)
-        aux = whisper_model.transcribe(wav_file, task="transcribe")
-        language, transcription = aux["language"], aux["text"]
-
-        results.append({
-            "language_detected": language,
-            "transcription": transcription,
-        })
-    except Exception as e:
-        print(f"Error transcribing {video_link}: {e}")
-
-    # Cleanup
-    del whisper_model
-    gc.collect()
-
-    if results:
-        return results[0]['language_detected'], results[0]['transcription']
-    else:
-        return None, None
+    video_path = os.path.join(VIDEO_DIR, video_link)
+    return get_model_manager().transcribe_many([video_path])[0]
+
+def transcribe_many(paths: Iterable[str], use_temp_files: bool = False) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Transcribes a batch of video files, reusing the same resident Whisper model.
+
+    Args:
+        paths (Iterable[str]): Paths to the video files.
+        use_temp_files (bool): Decode through per-job temp WAV files instead of in-memory buffers.
+
+    Returns:
+        List[Tuple[Optional[str], Optional[str]]]: One (language, transcription) pair per path.
+    """
+    return get_model_manager().transcribe_many(paths, use_temp_files=use_temp_files)
+
+def transcribe_long(video_path: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Long-audio mode: splits a video into overlapping windows cut at pauses and transcribes
+    them in parallel, one resident Whisper model per worker process.
+
+    Args:
+        video_path (str): Path to the video file.
+        workers (Optional[int]): Worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        Dict[str, Any]: The `language`, the stitched `transcription` and its timed `segments`.
+    """
+    audio = load_audio(video_path)
+    regions = detect_speech(audio) if VAD_ENABLED else []
+    if VAD_ENABLED and not regions:
+        return {"language": None, "transcription": "", "segments": []}
+    language, size = get_model_manager().pick_model(audio, regions)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up_worker, initargs=(workers,)) as pool:
+        transcription, segments = transcribe_chunks(pool, video_path, plan_chunks(audio), language, size)
+    return {"language": language, "transcription": transcription, "segments": segments}
@@ -1,107 +1,129 @@
-import openai
 import os
+import logging
+import threading
 from dotenv import load_dotenv
+from llm_client import BackgroundLLMClient
+from local_scorer import NEUTRAL_SCORE, local_score
+from typing import Optional, Tuple
 
 # Load environment variables from .env
 load_dotenv()
 
-# Fetch the API key from the environment
-openai.api_key = os.getenv("OPENAI_API_KEY")
+logger = logging.getLogger(__name__)
+
+# Local ratings at least this confident are kept, the others go to the LLM (above 1: always the LLM)
+SENTIMENT_ESCALATION_THRESHOLD = float(os.getenv("SENTIMENT_ESCALATION_THRESHOLD", "0.8"))
+
+# Where a rating came from
+LOCAL = "local"
+LLM = "llm"
+
+_client: Optional[BackgroundLLMClient] = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> BackgroundLLMClient:
+    """
+    Returns the process-wide LLM client, creating it on first use.
+
+    Every caller shares the same client, so the concurrency cap, the rate limit and the
+    batching of short transcriptions apply across all the pipeline workers.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BackgroundLLMClient()
+        return _client
+
+def analyze_text(text: str, target_language: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Translates the given text into English and rates its impact on Raiffeisen Bank
+    with a single structured LLM call.
+
+    The sentiment rating is between 0 and 100:
+    - 0 indicates the text damages the company's image or trustability.
+    - 100 indicates the text improves the company's image or trustability.
+    - 50 is used for neutral or incomprehensible text.
+
+    Args:
+        text (str): The text to be analyzed.
+        target_language (str): The language of the input text.
+
+    Returns:
+        Tuple[Optional[str], Optional[int]]: The English translation and the rating,
+        or (None, None) if the request fails after all retries. Empty text (a clip without
+        speech) is rated NEUTRAL_SCORE without calling the LLM.
+    """
+    if not text or not text.strip():
+        return "", NEUTRAL_SCORE
+    try:
+        result = get_llm_client().analyze(text, target_language)
+        return result["translation"], result["sentiment_score"]
+    except Exception as e:
+        logger.error("Error in translation and sentiment analysis: %s", e)
+        return None, None
+
+def score_text(
+    text: str,
+    target_language: str,
+    threshold: float = SENTIMENT_ESCALATION_THRESHOLD
+) -> Tuple[Optional[str], Optional[int], str]:
+    """
+    Tiered rating: the local lexicon scorer answers first and the text is escalated to the
+    LLM (translation and rating in one call) only when the local rating isn't confident.
+
+    A locally settled English text is its own translation; other languages still get their
+    translation from the LLM, through a cheaper translation-only call.
+
+    Args:
+        text (str): The text to be analyzed.
+        target_language (str): The language of the input text.
+        threshold (float): The confidence needed to skip the LLM.
+            Defaults to SENTIMENT_ESCALATION_THRESHOLD.
+
+    Returns:
+        Tuple[Optional[str], Optional[int], str]: The English translation, the rating and
+        its source (LOCAL or LLM). The rating is None when the LLM fails, be it for the
+        rating or for the translation of a locally rated text.
+    """
+    if not text or not text.strip():
+        return "", NEUTRAL_SCORE, LOCAL
+    score, confidence = local_score(text)
+    if confidence >= threshold:
+        translation = translate_text(text, target_language)
+        return translation, (score if translation is not None else None), LOCAL
+    translation, score = analyze_text(text, target_language)
+    return translation, score, LLM
 
 def translate_text(text: str, target_language: str) -> str | None:
     """
-    Translates the given text from the specified target language into English.
+    Translates the given text from the specified target language into English, without
+    rating it. English text is returned as is.
     
     Args:
         text (str): The text to be translated.
         target_language (str): The language of the input text.
         
-     Returns:
+    Returns:
         str | None: The translated text in English, or None if an error occurs.
-    
     """
+    if target_language == "en" or not text or not text.strip():
+        return text
     try:
-        # Construct the prompt for translation
-        prompt = (
-            f"Translate the following text from {target_language} in English:\n\n"
-            f"{text}"
-        )
-
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful translator which only translates in English the same exact text. "
-                        f"The text is most probably in {target_language}."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0,
-            max_tokens=1000,
-        )
-
-        # Extract the translated text
-        translated_text = response.choices[0].message.content
-        return translated_text
+        return get_llm_client().translate(text, target_language)
     except Exception as e:
-        print(f"Error in translation: {e}")
+        logger.error("Error in translation: %s", e)
         return None
 
-def get_sentiment(text: str, target_language: str) -> str | None:
+def get_sentiment(text: str, target_language: str) -> int | None:
     """
-    Analyzes the sentiment of the given text and returns a rating between 0 and 100.
-
-     The sentiment rating represents the impact of the text on Raiffeisen Bank:
-    - 0 indicates the text damages the company's image or trustability.
-    - 100 indicates the text improves the company's image or trustability.
-    - 50 is used for neutral or incomprehensible text.
+    Analyzes the sentiment of the given text and returns a rating between 0 and 100,
+    asking the LLM only when the local scorer isn't confident.
 
     Args:
         text (str): The text to be analyzed.
         target_language (str): The language of the input text.
         
     Returns:
-        str | None: A numeric rating (0-100) as a string, or None if an error occurs.
+        int | None: A numeric rating (0-100), or None if an error occurs.
     """
-    try:
-        # Construct the prompt for sentiment analysis
-        prompt = (
-            f"Analyze the sentiment of the following text and return the damage and trustability rating: {text}\n\n"
-        )
-
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful assistant which will determine how the provided texts "
-                        "about Raiffeisen Bank impact the company. You will rate the impact from 0 to 100. "
-                        "0 means the text damages the image or trustability of the company, "
-                        "100 means the text improves the image or trustability of the company. "
-                        "There might be texts where there are song lyrics or no comprehensible text, "
-                        "in this case you should rate the text with 50. "
-                        f"The text is most probably in {target_language}. "
-                        "Your response has to be only a number between 0 and 100, nothing else."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0,
-            max_tokens=1000,
-        )
-
-        # Extract the sentiment rating
-        rated_text = response.choices[0].message.content
-        print("______________________________________________________________________________")
-        print(rated_text)
-        print("______________________________________________________________________________")
-        return rated_text
-    except Exception as e:
-        print(f"Error in sentiment analysis: {e}")
-        return None
+    return score_text(text, target_language)[1]
@@ -0,0 +1,197 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+from typing import List, Tuple
+
+# Load environment variables from .env
+load_dotenv()
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03  # 30 ms analysis frames
+HOP_SECONDS = 0.01    # 10 ms hop
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+# A frame is voiced when its energy is this many dB above the estimated noise floor...
+VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", "12"))
+# ...most of it sits in the speech band...
+VAD_SPEECH_BAND_RATIO = float(os.getenv("VAD_SPEECH_BAND_RATIO", "0.45"))
+# ...and its spectrum isn't noise-like (spectral flatness close to 1)
+VAD_MAX_FLATNESS = float(os.getenv("VAD_MAX_FLATNESS", "0.5"))
+# A clip needs this much voiced audio to be transcribed
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "1.0"))
+# Speech energy is modulated at the syllable rate (2-8 Hz); sustained music much less so
+VAD_MIN_MODULATION = float(os.getenv("VAD_MIN_MODULATION", "0.2"))
+
+SPEECH_BAND = (300.0, 3400.0)
+MERGE_GAP_SECONDS = 0.5     # Closer voiced runs are merged
+MIN_REGION_SECONDS = 0.25   # Shorter regions are dropped, once merged
+PAD_SECONDS = 0.2           # Context kept around every region
+
+
+def _frames(audio: np.ndarray, frame: int, hop: int) -> np.ndarray:
+    """
+    Returns:
+        np.ndarray: A (n_frames, frame) strided view of the audio.
+    """
+    if len(audio) < frame:
+        audio = np.pad(audio, (0, frame - len(audio)))
+    count = 1 + (len(audio) - frame) // hop
+    return np.lib.stride_tricks.as_strided(
+        audio, shape=(count, frame), strides=(audio.strides[0] * hop, audio.strides[0]), writeable=False
+    )
+
+
+def frame_features(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the per-frame features of the detector.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio.
+        sample_rate (int): The sample rate. Defaults to 16000.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Energy in dB, speech-band energy ratio and
+        spectral flatness, one value per 10 ms frame.
+    """
+    frame, hop = int(FRAME_SECONDS * sample_rate), int(HOP_SECONDS * sample_rate)
+    frames = _frames(np.ascontiguousarray(audio, dtype=np.float32), frame, hop) * np.hanning(frame).astype(np.float32)
+
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+    freqs = np.fft.rfftfreq(frame, d=1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+
+    total = power.sum(axis=1)
+    energy_db = 10 * np.log10(total / frame)
+    band_ratio = power[:, band].sum(axis=1) / total
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, band_ratio, flatness
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Returns:
+        List[Tuple[int, int]]: The [start, end) index ranges where `mask` is True.
+    """
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def modulation_ratio(energy_db: np.ndarray) -> float:
+    """
+    Share of the energy envelope's fluctuation that sits at the syllable rate (2-8 Hz).
+
+    Args:
+        energy_db (np.ndarray): Per-frame energy in dB (100 frames per second).
+
+    Returns:
+        float: Between 0 and 1; speech is typically well above music.
+    """
+    if len(energy_db) < 50:
+        return 0.0
+    envelope = energy_db - energy_db.mean()
+    spectrum = np.abs(np.fft.rfft(envelope)) ** 2
+    freqs = np.fft.rfftfreq(len(envelope), d=HOP_SECONDS)
+    fluctuation = spectrum[(freqs > 0.5) & (freqs <= 20)].sum()
+    if fluctuation <= 0:
+        return 0.0
+    return float(spectrum[(freqs >= 2) & (freqs <= 8)].sum() / fluctuation)
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[float, float]]:
+    """
+    Cheap energy / spectral voice activity detector.
+
+    A frame is voiced when it is loud compared to the clip's noise floor, concentrated in the
+    speech band and not noise-like. Voiced runs are cleaned up (close ones merged, short
+    merged regions dropped, a little context added). A clip without enough voiced audio, or whose loudness
+    doesn't move at the syllable rate (sustained music), yields no region.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio.
+        sample_rate (int): The sample rate. Defaults to 16000.
+
+    Returns:
+        List[Tuple[float, float]]: The voiced regions as (start, end) seconds.
+    """
+    if len(audio) == 0:
+        return []
+    energy_db, band_ratio, flatness = frame_features(audio, sample_rate)
+
+    noise_floor = np.percentile(energy_db, 10)
+    voiced = (
+        (energy_db > noise_floor + VAD_ENERGY_MARGIN_DB)
+        & (energy_db > -60)  # Digital silence
+        & (band_ratio > VAD_SPEECH_BAND_RATIO)
+        & (flatness < VAD_MAX_FLATNESS)
+    )
+
+    duration = len(audio) / sample_rate
+    # Syllables are voiced runs of 100-200 ms: merge them into phrases first, and only then
+    # drop what is still too short to be speech (clicks, isolated noises)
+    merged: List[Tuple[float, float]] = []
+    for start, end in _runs(voiced):
+        begin, finish = start * HOP_SECONDS, end * HOP_SECONDS + FRAME_SECONDS
+        if merged and begin - merged[-1][1] <= MERGE_GAP_SECONDS:
+            merged[-1] = (merged[-1][0], finish)
+        else:
+            merged.append((begin, finish))
+    regions = [(start, end) for start, end in merged if end - start >= MIN_REGION_SECONDS]
+
+    speech_seconds = sum(end - start for start, end in regions)
+    if speech_seconds < VAD_MIN_SPEECH_SECONDS or modulation_ratio(energy_db) < VAD_MIN_MODULATION:
+        return []
+    return [(max(0.0, start - PAD_SECONDS), min(duration, end + PAD_SECONDS)) for start, end in regions]
+
+
+def first_window(audio: np.ndarray, regions: List[Tuple[float, float]], seconds: float = 30.0, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    The audio of the first `seconds` of the clip starting at the first voiced region.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio.
+        regions (List[Tuple[float, float]]): The voiced regions.
+        seconds (float): The window length. Defaults to Whisper's 30 s.
+        sample_rate (int): The sample rate. Defaults to 16000.
+
+    Returns:
+        np.ndarray: The window (shorter at the end of the clip).
+    """
+    start = int(regions[0][0] * sample_rate) if regions else 0
+    return audio[start:start + int(seconds * sample_rate)]
+
+
+def voiced_audio(audio: np.ndarray, regions: List[Tuple[float, float]], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Concatenate the voiced regions, dropping the silence and music around them.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio.
+        regions (List[Tuple[float, float]]): The voiced regions.
+        sample_rate (int): The sample rate. Defaults to 16000.
+
+    Returns:
+        np.ndarray: The voiced audio only.
+    """
+    if not regions:
+        return audio[:0]
+    return np.concatenate([audio[int(start * sample_rate):int(end * sample_rate)] for start, end in regions])
+
+
+def source_time(t: float, regions: List[Tuple[float, float]]) -> float:
+    """
+    Map a timestamp of the `voiced_audio` buffer back onto the original clip.
+
+    Args:
+        t (float): Seconds into the concatenated voiced audio.
+        regions (List[Tuple[float, float]]): The voiced regions the buffer was built from.
+
+    Returns:
+        float: Seconds into the original audio.
+    """
+    elapsed = 0.0
+    for start, end in regions:
+        if t <= elapsed + (end - start):
+            return start + (t - elapsed)
+        elapsed += end - start
+    return regions[-1][1] if regions else t
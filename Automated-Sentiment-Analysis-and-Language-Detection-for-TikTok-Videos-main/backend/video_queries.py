@@ -0,0 +1,244 @@
+import json
+import time
+import base64
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+COUNT_CACHE_TTL = 30.0  # Seconds a total count is reused before asking MongoDB again
+COUNT_CACHE_SIZE = 256  # Filters whose count is kept; /search puts free text in the filter
+
+# Score ranges (inclusive) behind the `sentiment` filter
+SENTIMENT_BANDS = {
+    "negative": (0, 39),
+    "neutral": (40, 60),
+    "positive": (61, 100),
+}
+
+# Sort keys of the listing; video_id breaks ties between videos posted in the same second
+SORT_FIELDS = ("video_timestamp", "video_id")
+
+
+def _parse_date(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date, got '{value}'.")
+
+
+def _is_date_only(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def build_video_filter(args: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Translate the query parameters shared by the listing and export endpoints into a MongoDB filter.
+
+    Supported parameters: `language`, `date_from`, `date_to` (ISO 8601), `sentiment`
+    (negative / neutral / positive), `min_score` and `max_score`. A `date_to` without a time
+    includes that whole day, like the day buckets of /analytics.
+
+    Args:
+        args (Mapping[str, str]): The request query parameters.
+
+    Returns:
+        Dict[str, Any]: The MongoDB filter.
+
+    Raises:
+        ValueError: If a parameter has an invalid value.
+    """
+    query: Dict[str, Any] = {}
+
+    if args.get("language"):
+        query["language"] = args["language"]
+
+    timestamp: Dict[str, datetime] = {}
+    if args.get("date_from"):
+        timestamp["$gte"] = _parse_date(args["date_from"], "date_from")
+    if args.get("date_to"):
+        date_to = _parse_date(args["date_to"], "date_to")
+        if _is_date_only(args["date_to"]):
+            timestamp["$lt"] = date_to + timedelta(days=1)  # Up to the end of that day
+        else:
+            timestamp["$lte"] = date_to
+    if timestamp:
+        query["video_timestamp"] = timestamp
+
+    score: Dict[str, float] = {}
+    if args.get("sentiment"):
+        band = SENTIMENT_BANDS.get(args["sentiment"])
+        if band is None:
+            raise ValueError(f"'sentiment' must be one of {', '.join(SENTIMENT_BANDS)}.")
+        score["$gte"], score["$lte"] = band
+    try:
+        if args.get("min_score"):
+            score["$gte"] = max(score.get("$gte", 0), float(args["min_score"]))
+        if args.get("max_score"):
+            score["$lte"] = min(score.get("$lte", 100), float(args["max_score"]))
+    except ValueError:
+        raise ValueError("'min_score' and 'max_score' must be numbers.")
+    if score:
+        query["sentiment_score"] = score
+
+    return query
+
+
+def parse_limit(value: Optional[str]) -> int:
+    """
+    Args:
+        value (Optional[str]): The `limit` query parameter.
+
+    Returns:
+        int: The page size, clamped to 1..MAX_PAGE_SIZE.
+    """
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        return min(max(1, int(value)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("'limit' must be an integer.")
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    """
+    Build the opaque cursor pointing right after `document`.
+
+    Args:
+        document (Dict[str, Any]): The last document of a page.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    timestamp = document.get("video_timestamp")
+    if isinstance(timestamp, datetime):
+        timestamp = {"$date": timestamp.isoformat()}
+    raw = json.dumps([timestamp, document.get("video_id")])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """
+    Args:
+        cursor (str): A cursor returned by `encode_cursor`.
+
+    Returns:
+        Tuple[Any, Any]: The (video_timestamp, video_id) position.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        timestamp, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if isinstance(timestamp, dict) and "$date" in timestamp:
+        timestamp = datetime.fromisoformat(timestamp["$date"])
+    return timestamp, video_id
+
+
+def fetch_page(
+    collection: Collection,
+    query: Dict[str, Any],
+    projection: Dict[str, int],
+    limit: int,
+    cursor: Optional[str] = None,
+    ascending: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page using keyset pagination on the (video_timestamp, video_id) index.
+
+    The sort happens in MongoDB on the index, and every page starts where the previous one
+    ended, so the cost of a page doesn't depend on how deep into the collection it is.
+
+    Args:
+        collection (Collection): The processed videos collection.
+        query (Dict[str, Any]): The filter, e.g. from `build_video_filter`.
+        projection (Dict[str, int]): The returned fields.
+        limit (int): The page size.
+        cursor (Optional[str]): The cursor of the previous page. Defaults to the first page.
+        ascending (bool): Oldest first instead of newest first. Defaults to False.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: The documents and the cursor of the next
+        page (None on the last page).
+    """
+    direction = ASCENDING if ascending else DESCENDING
+    if cursor:
+        timestamp, video_id = decode_cursor(cursor)
+        after = "$gt" if ascending else "$lt"
+        query = {"$and": [query, {"$or": [
+            {"video_timestamp": {after: timestamp}},
+            {"video_timestamp": timestamp, "video_id": {after: video_id}},
+        ]}]}
+
+    projection = dict(projection, video_timestamp=1, video_id=1)
+    documents = list(
+        collection.find(query, projection)
+        .sort([(field, direction) for field in SORT_FIELDS])
+        .limit(limit + 1)  # One extra document tells us whether there is a next page
+    )
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor(documents[-1]) if has_more else None
+    return documents, next_cursor
+
+
+class CountCache:
+    """
+    Caches `count_documents` results per filter for a few seconds, so polling clients don't
+    trigger a full count on every request.
+
+    At most `max_entries` filters are kept, the least recently used being dropped first, and
+    expired counts are dropped when they are looked up, so arbitrary filters (e.g. free-text
+    searches) can't grow the cache without bound.
+    """
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._counts: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, collection: Collection, query: Dict[str, Any]) -> int:
+        """
+        Args:
+            collection (Collection): The collection to count.
+            query (Dict[str, Any]): The filter.
+
+        Returns:
+            int: The (possibly slightly stale) number of matching documents.
+        """
+        key = json.dumps(query, sort_keys=True, default=str)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None:
+                if now - cached[0] < self.ttl:
+                    self._counts.move_to_end(key)
+                    return cached[1]
+                del self._counts[key]
+
+        # The unfiltered count comes from collection metadata instead of a scan
+        total = collection.estimated_document_count() if not query else collection.count_documents(query)
+        with self._lock:
+            self._counts[key] = (now, total)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return total
+
+    def invalidate(self) -> None:
+        """
+        Forget every cached count, e.g. after new videos were stored.
+        """
+        with self._lock:
+            self._counts.clear()
@@ -110,7 +110,7 @@ const DetailsPage: React.FC = () => {
                             <div className="flex justify-between items-center">
                                 <p className="text-gray-600">Is Ad:</p>
                                 <p className="font-medium text-gray-800">
-                                    {videoDetails.video_is_ad === "True" ? "Yes" : "No"}
+                                    {videoDetails.video_is_ad ? "Yes" : "No"}
                                 </p>
                             </div>
                         </CardContent>
@@ -139,7 +139,7 @@ const DetailsPage: React.FC = () => {
                             <div className="flex justify-between items-center">
                                 <p className="text-gray-600">Verified:</p>
                                 <p className="font-medium text-gray-800">
-                                    {videoDetails.author_verified === "True" ? "Yes" : "No"}
+                                    {videoDetails.author_verified ? "Yes" : "No"}
                                 </p>
                             </div>
                         </CardContent>
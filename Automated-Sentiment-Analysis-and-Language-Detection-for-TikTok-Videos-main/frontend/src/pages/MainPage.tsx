@@ -13,11 +13,28 @@ const MainPage: React.FC = () => {
         setResults(data);
     };
 
+    // Fetch the next page of videos and append it to the current results
+    const handleLoadMore = async () => {
+        if (!results?.next_cursor) return;
+        const response = await fetch(
+            `http://127.0.0.1:5000/videos?cursor=${encodeURIComponent(results.next_cursor)}`
+        );
+        if (!response.ok) {
+            console.error("Error fetching more videos. Status:", response.status);
+            return;
+        }
+        const page: ResultsData = await response.json();
+        setResults({
+            ...page,
+            processed_videos: [...results.processed_videos, ...page.processed_videos],
+        });
+    };
+
     return (
         <div className="flex flex-col">
             <Landing />
             <Action onFetchResults={handleFetchResults} />
-            <Results data={results} />
+            <Results data={results} onLoadMore={handleLoadMore} />
         </div>
     );
 };
@@ -8,6 +8,23 @@ interface ActionProps {
     onFetchResults: (data: ResultsData) => void; // Callback to update results in the parent
 }
 
+interface JobStatus {
+    status: "queued" | "running" | "succeeded" | "failed";
+    error: string | null;
+}
+
+// Poll /jobs/<id> until the processing job has finished
+const waitForJob = async (jobId: string): Promise<JobStatus> => {
+    while (true) {
+        const response = await fetch(`http://127.0.0.1:5000/jobs/${jobId}`);
+        const job: JobStatus = await response.json();
+        if (!response.ok || job.status === "succeeded" || job.status === "failed") {
+            return job;
+        }
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+};
+
 const Action: React.FC<ActionProps> = ({ onFetchResults }) => {
     const [videoCount, setVideoCount] = useState<number>(1);
     const [loadingAnalysis, setLoadingAnalysis] = useState<boolean>(false);
@@ -29,6 +46,13 @@ const Action: React.FC<ActionProps> = ({ onFetchResults }) => {
             console.log("Process response body:", responseBody); // Debugging print
     
             if (response.ok) {
+                // The backend queues a job; wait for it to finish before fetching the results
+                const { job_id } = JSON.parse(responseBody);
+                const job = await waitForJob(job_id);
+                if (job.status !== "succeeded") {
+                    alert(`Failed to process videos. ${job.error ?? ""}`);
+                    return;
+                }
                 console.log("Process request succeeded. Fetching processed videos..."); // Debugging print
                 const processedResponse = await fetch("http://127.0.0.1:5000/videos"); // Fetch processed videos
                 const data: ResultsData = await processedResponse.json();
@@ -1,12 +1,14 @@
 import React from "react";
 import { Card, CardHeader, CardContent } from "../components/ui/card";
+import { Button } from "../components/ui/button";
 import { ResultsData } from "../types";
 
 interface ResultsProps {
     data: ResultsData | null;
+    onLoadMore: () => void; // Fetch the next page of videos
 }
 
-export const Results: React.FC<ResultsProps> = ({ data }) => {
+export const Results: React.FC<ResultsProps> = ({ data, onLoadMore }) => {
     // Log the incoming data to check structure
     console.log("Data received in Results component:", data);
 
@@ -44,7 +46,7 @@ export const Results: React.FC<ResultsProps> = ({ data }) => {
         <div id="results-section" className="h-screen bg-gray-100 p-8">
             <h2 className="text-3xl font-bold mb-6 text-center">Results</h2>
             <p className="text-lg mb-4 text-center">
-                Total Videos Processed: {sortedVideos.length}
+                Total Videos Processed: {data.total_videos}
             </p>
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
                 {sortedVideos.map((video, index) => {
@@ -62,10 +64,10 @@ export const Results: React.FC<ResultsProps> = ({ data }) => {
                                     <strong>Author:</strong> {video.author_name || "N/A"} (@{video.author_username || "N/A"})
                                 </p>
                                 <p>
-                                    <strong>Play Count:</strong> {video.video_playcount || "0"}
+                                    <strong>Play Count:</strong> {video.video_playcount ?? 0}
                                 </p>
                                 <p>
-                                    <strong>Sentiment Score:</strong> {video.sentiment_score || "N/A"}
+                                    <strong>Sentiment Score:</strong> {video.sentiment_score ?? "N/A"}
                                 </p>
                                 <p>
                                     <strong>Language:</strong> {video.language || "N/A"}
@@ -85,6 +87,16 @@ export const Results: React.FC<ResultsProps> = ({ data }) => {
                     );
                 })}
             </div>
+            {data.next_cursor && (
+                <div className="flex justify-center mt-6">
+                    <Button
+                        onClick={onLoadMore}
+                        className="bg-blue-500 text-white hover:bg-blue-600 px-6 py-3 rounded-md font-semibold"
+                    >
+                        Load More
+                    </Button>
+                </div>
+            )}
         </div>
     );
 };
@@ -5,27 +5,57 @@ export interface ProcessedVideo {
     };
     video_id: string;
     video_timestamp: string;
-    video_duration: string;
+    video_duration: number;
     video_locationcreated: string;
-    video_sharecount: string;
-    video_commentcount: string;
-    video_playcount: string;
-    video_is_ad: string;
+    video_sharecount: number;
+    video_commentcount: number;
+    video_playcount: number;
+    video_is_ad: boolean;
     author_username: string;
     author_name: string;
-    author_followercount: string;
-    author_followingcount: string;
-    author_heartcount: string;
-    author_videocount: string;
-    author_verified: string;
+    author_followercount: number;
+    author_followingcount: number;
+    author_heartcount: number;
+    author_videocount: number;
+    author_verified: boolean;
     language: string;
     sentence: string;
-    sentiment_score: string;
+    transcription?: string | null;
+    segments?: TranscriptSegment[];
+    sentiment_score: number;
+    sentiment_source?: 'local' | 'llm' | null;
     video_file: string;
 }
 
+export interface TranscriptSegment {
+    start: number;
+    end: number;
+    text: string;
+}
+
 // ResultsData remains the same
 export interface ResultsData {
     total_videos: number;
     processed_videos: ProcessedVideo[];
+    next_cursor: string | null;
+}
+
+export interface SearchSnippet {
+    field: 'sentence' | 'transcription';
+    text: string;
+    highlights: [number, number][]; // [start, end) offsets into text
+}
+
+export interface SearchResult extends Pick<ProcessedVideo,
+    'video_id' | 'video_file' | 'author_name' | 'author_username' | 'video_playcount' |
+    'sentiment_score' | 'language' | 'video_timestamp'> {
+    score: number;
+    snippets: SearchSnippet[];
+}
+
+export interface SearchResponse {
+    query: string;
+    total_results: number;
+    results: SearchResult[];
+    next_offset: number | null;
 }